@@ -14,15 +14,25 @@ import cv2
 import numpy as np
 from PIL import Image, ImageTk
 
+from src.automation.adb_automation import run_adb_automation
+from src.automation.async_engine import BackgroundDraw, DrawPlan
 from src.ui.components import ScrolledFrame
 from src.processing.canny_processor import process_image_for_preview
 from src.processing.trace_extractor import extract_and_normalize_traces
 from src.processing.background_remover import remove_background_from_image
+from src.processing.contour_index import TiledContourIndex
+from src.processing.stroke_set import Stroke, StrokeSet
 from src.utils.history_manager import HistoryManager
+from src.utils.ui_watchdog import MainLoopWatchdog
 from src.ui.main_ui_builder import MainUIBuilder
 from src.ui.canvas_handlers import CanvasInteractionHandler
+from src.ui.stroke_editor import StrokeEditor
+from src.ui.viewport import Viewport
+from src.utils.image_state import ImageState
+from src.utils.brush_utils import diff_rect
 from src.utils.color_utils import get_nearest_palette_color
 from src.utils.curve_utils import catmull_rom_spline
+from src.utils.file_loader import load_traces_data
 
 
 try:
@@ -32,6 +42,40 @@ except ImportError:
     REMBG_AVAILABLE = False
 
 PREVIEW_MAX_SIZE = (800, 800)
+HISTORY_MAX_BYTES = 256 * 1024 * 1024  # Memory budget for undo/redo states
+HISTORY_KEYFRAME_INTERVAL = 10  # Full image snapshot every N history states
+HISTORY_LABEL_REFRESH_MS = 1000  # Compression runs in the background, refresh the label later
+
+# Preview parameters recorded as lightweight undo/redo commands (attribute names of the tk variables)
+PREVIEW_PARAM_VARS = (
+    "edges_var",
+    "threshold_var",
+    "brightness_var",
+    "blur_var",
+    "contour_simplify_epsilon_var",
+    "min_contour_area_var",
+    "preview_line_thickness_var",
+    "spline_segments_var",
+    "traces_only_var",
+)
+# Preview parameters the stroke extraction reads; display-only ones leave stroke edits valid
+STROKE_SET_PARAM_VARS = (
+    "edges_var",
+    "threshold_var",
+    "blur_var",
+    "contour_simplify_epsilon_var",
+    "min_contour_area_var",
+)
+# Sampled colors always mapped to a given palette color
+COLOR_OVERRIDES = {
+    (75, 140, 225): {
+        "page_index": 1,
+        "color_index": 3,
+        "hex_value": "#FFDC4C",
+        "rgb_value": (255, 220, 76),
+        "name": "Yellow",
+    }
+}
 
 
 
@@ -51,10 +95,9 @@ class StrokeExtractorApp(tk.Tk):
         self.grid_rowconfigure(0, weight=0) # Top bar fixed height
         self.grid_rowconfigure(1, weight=1) # Main content (sidebars/canvas) expands
 
-        # images in PIL.Image (or None)
-        self.original_image: Image.Image | None = None
-        self.processed_image: Image.Image | None = None
-        self.display_image: Image.Image | None = None
+        # image layers (source / processed / display) sharing buffers until written;
+        # original_image, processed_image and display_image are zero-copy PIL views of them
+        self.image_state = ImageState()
 
         # editing state
         self.erase_mode = False
@@ -63,11 +106,14 @@ class StrokeExtractorApp(tk.Tk):
         self.last_y = None
         self.crop_rect_id = None
         self.crop_start = None
-        self.x_offset = 0  # Image offset on canvas for centering
+        self.x_offset = 0  # Image offset on canvas (centering and pan)
         self.y_offset = 0
+        self.viewport = Viewport()  # Zoom/pan transform shared by display, brush and crop
 
         # history for undo/redo
-        self.history_manager = HistoryManager()
+        self.history_manager = HistoryManager(
+            max_bytes=HISTORY_MAX_BYTES, keyframe_interval=HISTORY_KEYFRAME_INTERVAL
+        )
 
         # tkinter variables for sliders and checkbox
         self.edges_var = tk.DoubleVar(value=150.0)
@@ -77,11 +123,16 @@ class StrokeExtractorApp(tk.Tk):
         self.eraser_var = tk.IntVar(value=24)
         self.threshold_var = tk.IntVar(value=100)
         self.traces_only_var = tk.BooleanVar(value=True)
-        self.paint_as_traces_var = tk.BooleanVar(value=False)
         self.monochromatic_var = tk.BooleanVar(value=False)
+        self.draw_on_device_var = tk.BooleanVar(value=False)  # Draw with the async engine instead of the subprocess
+        self.background_draw = None  # BackgroundDraw of the running "draw on the phone" job
         self.selected_mono_color_info = None # To store the selected monochromatic color (page, index, hex, rgb)
         self.after_id = None # For debouncing update_preview
         self.processing_thread = None # Initialize processing thread
+        self._committed_params = None # Preview parameters of the last recorded history state
+        self._preview_cache = {} # Downscaled source, grayscale and edge map reused across previews
+        self.stroke_set = None # Strokes being edited in the stroke editor (full resolution)
+        self._stroke_set_source_key = None # Image, edit mask and parameters the strokes were extracted with
 
         self.start_time = 0
         self.elapsed_time_timer_id = None
@@ -94,6 +145,7 @@ class StrokeExtractorApp(tk.Tk):
 
         # Initialize canvas interaction handler
         self.canvas_handler = CanvasInteractionHandler(self)
+        self.stroke_editor = StrokeEditor(self)  # Stroke-level selection/editing mode
 
         # build UI
         self.ui_builder = MainUIBuilder(self)
@@ -104,8 +156,32 @@ class StrokeExtractorApp(tk.Tk):
         self.bind("<Control-y>", self.redo)
         # Bind configure event for canvas to resize/recenter image - Moved here
         self.canvas.bind("<Configure>", self.show_image)
+        # Report Tk event-loop stalls (duration and blocking function) to data/ui_stalls.log
+        self.watchdog = MainLoopWatchdog(self)
+        self.watchdog.start()
         print("StrokeExtractorApp: __init__ finished")
 
+    # ---------- image layers ----------
+    @property
+    def original_image(self) -> Image.Image | None:
+        return self.image_state.view("source")
+
+    @property
+    def processed_image(self) -> Image.Image | None:
+        return self.image_state.view("processed")
+
+    @processed_image.setter
+    def processed_image(self, image):
+        self.image_state.set_image("processed", image)
+
+    @property
+    def display_image(self) -> Image.Image | None:
+        return self.image_state.view("display")
+
+    @display_image.setter
+    def display_image(self, image):
+        self.image_state.set_image("display", image)
+
     def _update_elapsed_time(self):
         if self.start_time > 0:
             elapsed_seconds = int(time.time() - self.start_time)
@@ -121,18 +197,18 @@ class StrokeExtractorApp(tk.Tk):
         if not path:
             return
         try:
-            img = Image.open(path).convert("RGBA")
+            # A single canonical buffer; the processed and display layers share it
+            self.image_state.load(Image.open(path))
         except Exception as e:
             messagebox.showerror("Erro", f"Não foi possível abrir a imagem:\n{e}")
             return
 
-        self.original_image = img.copy()
-        self.processed_image = img.copy()
-        self.display_image = img.copy()
         self.scale_var.set(1.0)  # Reset zoom slider to default
+        self.viewport.reset()
 
         self.history_manager.clear()
-        self._save_state_for_undo()
+        self._save_state_for_undo("source")
+        self._committed_params = self._get_preview_params()
 
         self.update_preview() # Call directly to refresh preview
         self.status_label.config(text=f"Imagem carregada: {path.split('/')[-1]}")
@@ -204,64 +280,11 @@ class StrokeExtractorApp(tk.Tk):
         # draw_automation.py will read it directly.
 
         # --- Step 3: Process image and extract traces ---
-        # Determine which image to use for trace extraction and color sampling
-        if self.paint_as_traces_var.get():
-            # If "Paint as Traces" is active, use the display_image (which includes user edits)
-            image_for_traces = self.display_image.convert("RGB")
-            self.status_label.config(text="Extraindo traços da pintura...")
-        else:
-            # Otherwise, use the original_image
-            image_for_traces = self.original_image.convert("RGB")
-            self.status_label.config(text="Extraindo traços da imagem original...")
-
-        original_img_np = np.array(image_for_traces)
-
-        arr = np.array(image_for_traces)
-        try:
-            gray = cv2.cvtColor(arr, cv2.COLOR_RGBA2GRAY)
-        except Exception:
-            # fallback: convert RGB first
-            gray = cv2.cvtColor(arr[..., :3], cv2.COLOR_RGB2GRAY)
-
-        blur_val = self.blur_var.get()
-        if blur_val > 0:
-            if blur_val % 2 == 0:
-                blur_val += 1
-            gray = cv2.GaussianBlur(gray, (blur_val, blur_val), 0)
-
-        upper = int(self.edges_var.get())
-        lower = int(self.threshold_var.get())
-        edges = cv2.Canny(gray, lower, upper)
-
-        contours, _ = cv2.findContours(edges, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-
-        # Apply contour simplification and filtering
-        filtered_contours = []
-        epsilon_val = self.contour_simplify_epsilon_var.get()
-        min_area_val = self.min_contour_area_var.get()
-
-        for contour in contours:
-            # Filter by minimum area
-            if cv2.contourArea(contour) < min_area_val:
-                continue
-            
-            # Simplify contour if epsilon is greater than 0
-            if epsilon_val > 0:
-                # Calculate epsilon based on contour perimeter
-                perimeter = cv2.arcLength(contour, True)
-                epsilon = epsilon_val * perimeter / 100 # Epsilon as percentage of perimeter
-                approx_contour = cv2.approxPolyDP(contour, epsilon, True)
-                if len(approx_contour) > 1: # Ensure simplified contour has at least 2 points
-                    filtered_contours.append(approx_contour)
-            else:
-                filtered_contours.append(contour)
-
-        if not filtered_contours:
-            messagebox.showinfo(
-                "Nenhum traço",
-                "Nenhum traço foi encontrado com as configurações atuais.",
-            )
+        # Strokes edited in the stroke editor are written as they are; otherwise they are extracted now
+        stroke_set = self._get_stroke_set()
+        if stroke_set is None:
             return
+        strokes = stroke_set.ordered()
 
         # Fixed path for saving traces
         path = "data/traces.json"
@@ -269,56 +292,13 @@ class StrokeExtractorApp(tk.Tk):
         all_raw_points = []
         # Use a dictionary to group traces by color
         grouped_traces_by_color = {} # Key: (page_index, color_index), Value: list of {"path": coords, "original_rgb": original_rgb}
-        
-        total_points = 0
-
-        for contour in filtered_contours: # Iterate through filtered contours
-            total_points += len(contour)
-            # Calculate bounding box for the contour
-            x, y, w, h = cv2.boundingRect(contour)
-            
-            # Sample color at the center of the bounding box
-            center_x = x + w // 2
-            center_y = y + h // 2
-
-            # Ensure coordinates are within image bounds
-            center_x = max(0, min(original_img_np.shape[1] - 1, center_x))
-            center_y = max(0, min(original_img_np.shape[0] - 1, center_y))
-
-            # Get pixel color at the center of the bounding box
-            # original_img_np is already RGB (or RGBA, but we only need RGB)
-            pixel_color = original_img_np[center_y, center_x][:3]
-            original_rgb = (int(pixel_color[0]), int(pixel_color[1]), int(pixel_color[2])) # Ensure it's an RGB tuple
 
+        for stroke in strokes: # Strokes in drawing order
+            nearest_color_info = stroke.color
+            coords = stroke.path()
 
-            # Find the nearest Instagram palette color
-            # Apply color overrides if any
-            color_overrides = {
-                (75, 140, 225): {"page_index": 1, "color_index": 3, "hex_value": "#FFDC4C", "rgb_value": (255, 220, 76), "name": "Yellow"}
-            }
-
-            if original_rgb in color_overrides:
-                nearest_color_info = color_overrides[original_rgb]
-                print(f"DEBUG (save_traces): Color override applied for {original_rgb} -> {nearest_color_info['name']}")
-            elif self.monochromatic_var.get():
-                if self.selected_mono_color_info is None:
-                    messagebox.showwarning("Cor Monocromática", "Selecione uma cor para o modo monocromático.")
-                    return # Exit if no color is selected in monochromatic mode
-                nearest_color_info = self.selected_mono_color_info
-            else:
-                nearest_color_info = get_nearest_palette_color(*original_rgb)
-            
-            print(f"DEBUG (save_traces): Contour original_rgb: {original_rgb} mapped to {nearest_color_info['name']} (Palette RGB: {nearest_color_info['rgb_value']})")
-
-            # Do not simplify contour; use raw contour points
-            # Ensure contour coordinates are integers
-            coords = contour.squeeze().tolist()
-            if not isinstance(coords[0], list):  # Handle single point contours
-                coords = [coords]
-            
             # Collect all raw points to calculate overall bounding box
-            for p in coords:
-                all_raw_points.append(p)
+            all_raw_points.extend(coords)
             
             # Group traces by their palette color
             color_key = (nearest_color_info["page_index"], nearest_color_info["color_index"])
@@ -360,9 +340,9 @@ class StrokeExtractorApp(tk.Tk):
         # 1. Calculate total number of points after spline interpolation
         total_splined_points = 0
         total_strokes = 0
-        for contour in filtered_contours:
+        for stroke in strokes:
             # The number of points from the spline is roughly len(contour) * num_segments
-            splined_contour = catmull_rom_spline(contour.squeeze().tolist(), num_segments=SPLINE_SEGMENTS)
+            splined_contour = catmull_rom_spline(stroke.path(), num_segments=SPLINE_SEGMENTS)
             total_splined_points += len(splined_contour)
             total_strokes += 1
 
@@ -433,7 +413,145 @@ class StrokeExtractorApp(tk.Tk):
         except Exception as e:
             messagebox.showerror("Erro ao salvar traços", str(e))
 
+    def _get_stroke_set(self):
+        """
+        Returns the strokes to save: the set being edited in the stroke editor if it still
+        matches the current image, edits and parameters, otherwise a freshly extracted one.
+        Returns None (after telling the user why) when there is nothing to save.
+        """
+        key = self._stroke_set_key()
+        if self.stroke_set is not None and self._stroke_set_key_matches(key):
+            return self.stroke_set
+        if self.stroke_set is not None and self.stroke_set.version > 0:
+            reason = "A imagem, as edições de borracha ou os parâmetros de extração mudaram desde a edição."
+            if self.stroke_set.image_size != self.original_image.size:
+                # Cropped or replaced: the edited coordinates no longer fit the image
+                messagebox.showwarning(
+                    "Edição de traços", f"{reason}\nAs edições serão descartadas e os traços extraídos de novo."
+                )
+            elif not messagebox.askyesno(
+                "Edição de traços",
+                f"{reason}\nDescartar as edições e extrair os traços de novo? (Não: manter os traços editados)",
+            ):
+                self._stroke_set_source_key = key  # Keep the edited strokes for this state
+                return self.stroke_set
+        stroke_set = self._build_stroke_set()
+        self.stroke_set = stroke_set
+        self._stroke_set_source_key = key
+        self.stroke_editor.reset()  # Selected ids belonged to the previous set
+        if stroke_set is None and self.stroke_editor.active:
+            self.stroke_editor.disable()
+        return stroke_set
+
+    def _stroke_set_key(self):
+        params = {name: getattr(self, name).get() for name in STROKE_SET_PARAM_VARS}
+        params["monochromatic_var"] = self.monochromatic_var.get()
+        params["mono_color"] = dict(self.selected_mono_color_info or {})
+        return self.original_image, self.image_state.mask, params
+
+    def _stroke_set_key_matches(self, key):
+        source, mask, params = self._stroke_set_source_key
+        # Images are compared by identity: layers are replaced, never modified, on edits
+        return source is key[0] and mask is key[1] and params == key[2]
+
+    def _build_stroke_set(self):
+        """Extracts the strokes (full resolution contours with palette colors) from the source layer."""
+        # Traces and colors always come from the source layer (its RGBA buffer is used
+        # directly); eraser/restore edits reach the traces through the mask on the edge map
+        arr = self.image_state.layer("source").array
+        edit_mask = self.image_state.mask
+        self.status_label.config(text="Extraindo traços da imagem...")
+
+        original_img_np = arr
+        try:
+            gray = cv2.cvtColor(arr, cv2.COLOR_RGBA2GRAY)
+        except Exception:
+            # fallback: convert RGB first
+            gray = cv2.cvtColor(arr[..., :3], cv2.COLOR_RGB2GRAY)
+
+        blur_val = self.blur_var.get()
+        if blur_val > 0:
+            if blur_val % 2 == 0:
+                blur_val += 1
+            gray = cv2.GaussianBlur(gray, (blur_val, blur_val), 0)
+
+        upper = int(self.edges_var.get())
+        lower = int(self.threshold_var.get())
+        edges = cv2.Canny(gray, lower, upper)
+        if edit_mask is not None:
+            edges = cv2.bitwise_and(edges, edit_mask)
+
+        contours, _ = cv2.findContours(edges, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+
+        # Apply contour simplification and filtering
+        filtered_contours = []
+        epsilon_val = self.contour_simplify_epsilon_var.get()
+        min_area_val = self.min_contour_area_var.get()
+
+        for contour in contours:
+            # Filter by minimum area
+            if cv2.contourArea(contour) < min_area_val:
+                continue
+            
+            # Simplify contour if epsilon is greater than 0
+            if epsilon_val > 0:
+                # Calculate epsilon based on contour perimeter
+                perimeter = cv2.arcLength(contour, True)
+                epsilon = epsilon_val * perimeter / 100 # Epsilon as percentage of perimeter
+                approx_contour = cv2.approxPolyDP(contour, epsilon, True)
+                if len(approx_contour) > 1: # Ensure simplified contour has at least 2 points
+                    filtered_contours.append(approx_contour)
+            else:
+                filtered_contours.append(contour)
+
+        if not filtered_contours:
+            messagebox.showinfo(
+                "Nenhum traço",
+                "Nenhum traço foi encontrado com as configurações atuais.",
+            )
+            return None
+
+        if self.monochromatic_var.get() and self.selected_mono_color_info is None:
+            messagebox.showwarning("Cor Monocromática", "Selecione uma cor para o modo monocromático.")
+            return None # Exit if no color is selected in monochromatic mode
+
+        strokes = []
+        for contour in filtered_contours: # Iterate through filtered contours
+            # Calculate bounding box for the contour
+            x, y, w, h = cv2.boundingRect(contour)
+            
+            # Sample color at the center of the bounding box
+            center_x = x + w // 2
+            center_y = y + h // 2
+
+            # Ensure coordinates are within image bounds
+            center_x = max(0, min(original_img_np.shape[1] - 1, center_x))
+            center_y = max(0, min(original_img_np.shape[0] - 1, center_y))
+
+            # Get pixel color at the center of the bounding box
+            # original_img_np is already RGB (or RGBA, but we only need RGB)
+            pixel_color = original_img_np[center_y, center_x][:3]
+            original_rgb = (int(pixel_color[0]), int(pixel_color[1]), int(pixel_color[2])) # Ensure it's an RGB tuple
+
+
+            # Find the nearest Instagram palette color (overrides first)
+            if original_rgb in COLOR_OVERRIDES:
+                nearest_color_info = COLOR_OVERRIDES[original_rgb]
+            elif self.monochromatic_var.get():
+                nearest_color_info = self.selected_mono_color_info
+            else:
+                nearest_color_info = get_nearest_palette_color(*original_rgb)
+
+            # Do not simplify contour; use raw contour points
+            strokes.append(Stroke(contour, nearest_color_info, closed=True))  # Contours are closed
+
+        return StrokeSet(strokes, self.original_image.size)
+
     def start_drawing_automation(self):
+        if self.draw_on_device_var.get():
+            self._start_device_draw()
+            return
+
         def _run_automation():
             """Runs the automation in a thread, managing UI updates."""
             self.start_time = time.time()
@@ -469,6 +587,50 @@ class StrokeExtractorApp(tk.Tk):
         # Run the automation in a separate thread to keep the UI responsive
         threading.Thread(target=_run_automation, daemon=True).start()
 
+    def _start_device_draw(self):
+        """
+        Opens the draw screen and draws data/traces.json with the async engine on a background
+        thread; progress shows in the status bar and ESC stops the drawing.
+        """
+        traces_data = load_traces_data()
+        if traces_data is None:
+            messagebox.showerror("Erro", "Não foi possível carregar data/traces.json. Salve os traços primeiro.")
+            return
+        self.start_automation_button.config(state="disabled")
+        self.status_label.config(text="Abrindo a tela de desenho no celular... (ESC para parar)")
+        self.start_time = time.time()
+        self._update_elapsed_time()
+        self.background_draw = BackgroundDraw(
+            DrawPlan(traces_data, self.spline_segments_var.get()),
+            on_progress=self._on_device_draw_progress,
+            on_done=self._on_device_draw_done,
+            schedule=lambda callback: self.after(0, callback),
+            before_draw=run_adb_automation,
+        ).start()
+        self.bind("<Escape>", lambda _: self.background_draw.cancel())
+
+    def _on_device_draw_progress(self, progress):
+        self.status_label.config(
+            text=f"🖌️ {progress.color_name}: {progress.strokes_done}/{progress.total_strokes} traços "
+            f"({progress.fraction:.0%}) — ESC para parar"
+        )
+
+    def _on_device_draw_done(self, _result, error):
+        cancelled = self.background_draw.cancelled.is_set()
+        self.unbind("<Escape>")
+        self.background_draw = None
+        if self.elapsed_time_timer_id:
+            self.after_cancel(self.elapsed_time_timer_id)
+        self.start_time = 0
+        self.start_automation_button.config(state="normal")
+        if error is not None:
+            messagebox.showerror("Erro de Automação", f"O desenho no celular falhou:\n{error}")
+            self.status_label.config(text="Automação de desenho falhou.")
+        elif cancelled:
+            self.status_label.config(text="Desenho interrompido pelo usuário.")
+        else:
+            self.status_label.config(text="Automação de desenho concluída.")
+
     # ---------- processamento / preview ----------
     def update_preview(self, _=None):
         """
@@ -490,83 +652,157 @@ class StrokeExtractorApp(tk.Tk):
 
     def _start_preview_processing_thread(self):
         """Starts the image processing in a separate thread."""
+        self.after_id = None
         if self.processing_thread and self.processing_thread.is_alive():
-            # If a thread is already running, let it finish.
-            # For more advanced cancellation, a threading.Event could be used.
+            # If a thread is already running, let it finish and try again afterwards
+            # so the preview always ends up matching the latest parameters.
             self.status_label.config(text="Processamento em andamento... aguarde.")
+            self.after_id = self.after(250, self._start_preview_processing_thread)
             return
 
+        # Record parameter changes as commands; the preview itself is not stored in history
+        params = self._get_preview_params()
+        if self._committed_params is not None and params != self._committed_params:
+            self.history_manager.save_params(self._committed_params, params)
+        self._committed_params = params
+
         self.status_label.config(text="Processando imagem em segundo plano...")
-        self.processing_thread = threading.Thread(target=self._process_image_for_preview_threaded)
+        # The edit mask is replaced (never modified) by brush strokes, so the worker can read it as is
+        edit_mask = self.image_state.mask
+        self.processing_thread = threading.Thread(
+            target=self._process_image_for_preview_threaded, args=(params, edit_mask)
+        )
         self.processing_thread.daemon = True # Allow the main program to exit even if thread is running
         self.processing_thread.start()
 
-    def _process_image_for_preview_threaded(self):
+    def _get_preview_params(self):
+        """Returns a snapshot of the preview parameters (read on the main thread)."""
+        return {name: getattr(self, name).get() for name in PREVIEW_PARAM_VARS}
+
+    def _apply_preview_params(self, params):
+        """Restores preview parameters from history and recomputes the preview from them."""
+        for name, value in params.items():
+            getattr(self, name).set(value)
+        self._committed_params = self._get_preview_params()
+        self.update_preview()
+
+    def _get_preview_source(self):
+        """
+        Returns the cached downscaled source (PIL image, RGBA array and grayscale) for
+        the current original image, recomputing it only when the original changes.
+        """
+        cache = self._preview_cache
+        source = self.original_image
+        if cache.get("source") is not source:
+            # Resize straight from the source view (same size rule as thumbnail(), without copying it first)
+            ratio = min(1.0, PREVIEW_MAX_SIZE[0] / source.width, PREVIEW_MAX_SIZE[1] / source.height)
+            preview_size = (max(1, round(source.width * ratio)), max(1, round(source.height * ratio)))
+            preview_img = source.resize(preview_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+            arr = np.asarray(preview_img)
+            # convert to gray (cv2 understands RGBA->GRAY with cv2.COLOR_RGBA2GRAY)
+            try:
+                gray = cv2.cvtColor(arr, cv2.COLOR_RGBA2GRAY)
+            except Exception:
+                # fallback: convert RGB first
+                gray = cv2.cvtColor(arr[..., :3], cv2.COLOR_RGB2GRAY)
+            cache = {"source": source, "preview_img": preview_img, "arr": arr, "gray": gray}
+            self._preview_cache = cache
+        return cache
+
+    def _get_preview_edges(self, cache, blur_val, lower, upper):
+        """Returns the Canny edge map for the cached preview source, reusing it when the parameters match."""
+        key = (blur_val, lower, upper)
+        if cache.get("edges_key") != key:
+            gray = cache["gray"]
+            if blur_val > 0:
+                if blur_val % 2 == 0:  # Gaussian blur kernel size must be odd
+                    blur_val += 1
+                gray = cv2.GaussianBlur(gray, (blur_val, blur_val), 0)
+            cache["edges"] = cv2.Canny(gray, lower, upper)
+            cache["edges_key"] = key
+        return cache["edges"]
+
+    def _get_preview_mask(self, cache, edit_mask):
+        """Returns the edit mask scaled to the preview size, reusing it until the mask changes."""
+        if cache.get("edit_mask") is not edit_mask:
+            h, w = cache["gray"].shape[:2]
+            # Nearest neighbour keeps the mask binary
+            cache["preview_mask"] = cv2.resize(edit_mask, (w, h), interpolation=cv2.INTER_NEAREST)
+            cache["edit_mask"] = edit_mask
+        return cache["preview_mask"]
+
+    def _get_preview_contours(self, cache, edges):
+        """
+        Returns the tiled contour index of the (masked) preview edge map. After a brush
+        stroke only the tiles around the changed edges are traced again.
+        """
+        index = cache.get("contour_index")
+        if index is None or cache.get("contours_edges_key") != cache["edges_key"]:
+            index = TiledContourIndex(edges)
+        elif cache["contour_edges"] is not edges:
+            rect = diff_rect(cache["contour_edges"], edges)
+            if rect is not None:
+                index.update(edges, rect)
+        cache["contour_index"] = index
+        cache["contour_edges"] = edges
+        cache["contours_edges_key"] = cache["edges_key"]
+        return index
+
+    def _process_image_for_preview_threaded(self, params, edit_mask=None):
         """
         Wrapper for _process_image_for_preview to be run in a separate thread.
         Updates the UI on the main thread after processing.
         """
-        processed_image = self._process_image_for_preview()
+        processed_image = self._process_image_for_preview(params, edit_mask)
         if processed_image:
             self.after(0, self._update_ui_with_processed_image, processed_image)
         else:
             self.after(0, lambda: self.status_label.config(text="Falha no processamento do preview."))
 
-    def _process_image_for_preview(self):
+    def _process_image_for_preview(self, params, edit_mask=None):
         """
         Performs the heavy image processing for the preview.
+        The edit mask (source resolution), if any, is applied to the edge map.
         Returns the processed PIL Image.
         """
         if self.original_image is None:
             return None
 
         # --- Performance Optimization ---
-        # Create a downscaled version of the image for preview processing
-        preview_img = self.original_image.copy()
-        preview_img.thumbnail(PREVIEW_MAX_SIZE, Image.Resampling.LANCZOS)
-        
-        # always work in numpy (RGBA)
-        arr = np.array(preview_img)
-
-        # convert to gray (cv2 understands RGBA->GRAY with cv2.COLOR_RGBA2GRAY)
-        try:
-            gray = cv2.cvtColor(arr, cv2.COLOR_RGBA2GRAY)
-        except Exception:
-            # fallback: convert RGB first
-            gray = cv2.cvtColor(arr[..., :3], cv2.COLOR_RGB2GRAY)
-
-        blur_val = self.blur_var.get()
-        if blur_val > 0:
-            if blur_val % 2 == 0:  # Gaussian blur kernel size must be odd
-                blur_val += 1
-            gray = cv2.GaussianBlur(gray, (blur_val, blur_val), 0)
+        # Reuse the downscaled source (and its edges) across parameter changes
+        cache = self._get_preview_source()
+        preview_img = cache["preview_img"]
+        arr = cache["arr"]
 
         # thresholds: lower fixed, upper adjustable
-        upper = int(self.edges_var.get())
-        lower = int(self.threshold_var.get())
+        upper = int(params["edges_var"])
+        lower = int(params["threshold_var"])
 
-        edges = cv2.Canny(gray, lower, upper)
+        edges = self._get_preview_edges(cache, params["blur_var"], lower, upper)
+        if edit_mask is not None:
+            # New array: the cached edges stay unmasked for the next parameter change
+            edges = cv2.bitwise_and(edges, self._get_preview_mask(cache, edit_mask))
 
-        if self.traces_only_var.get():
-            # Determine which image to use for trace extraction and color sampling for preview
-            if self.paint_as_traces_var.get():
-                # For "Paint as Traces", we need to use the display_image, but also downscaled
-                image_for_preview_traces = self.display_image.copy()
-                image_for_preview_traces.thumbnail(PREVIEW_MAX_SIZE, Image.Resampling.LANCZOS)
-            else:
-                image_for_preview_traces = preview_img.convert("RGB")
+        if params["traces_only_var"]:
+            # Colors are always sampled from the source; user edits only affect the edges
+            image_for_preview_traces = preview_img.convert("RGB")
 
-            contours, _ = cv2.findContours(edges, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+            # Contours come from the tile index; per-contour results are cached by contour id
+            contour_index = self._get_preview_contours(cache, edges)
 
             # Apply contour simplification and filtering for preview
             filtered_contours = []
-            epsilon_val = self.contour_simplify_epsilon_var.get()
-            min_area_val = self.min_contour_area_var.get()
-            line_thickness = self.preview_line_thickness_var.get()
-
-            for contour in contours:
+            epsilon_val = params["contour_simplify_epsilon_var"]
+            min_area_val = params["min_contour_area_var"]
+            line_thickness = params["preview_line_thickness_var"]
+            spline_segments = params["spline_segments_var"]
+
+            for contour_id, contour in contour_index.items():
+                derived = contour_index.derived.setdefault(contour_id, {})
+                if "area" not in derived:
+                    derived["area"] = cv2.contourArea(contour)
                 # Filter by minimum area
-                if cv2.contourArea(contour) < min_area_val:
+                if derived["area"] < min_area_val:
                     continue
                 
                 # Simplify contour if epsilon is greater than 0
@@ -576,41 +812,34 @@ class StrokeExtractorApp(tk.Tk):
                     epsilon = epsilon_val * perimeter / 100 # Epsilon as percentage of perimeter
                     approx_contour = cv2.approxPolyDP(contour, epsilon, True)
                     if len(approx_contour) > 1: # Ensure simplified contour has at least 2 points
-                        filtered_contours.append(approx_contour)
+                        filtered_contours.append((contour_id, approx_contour))
                 else:
-                    filtered_contours.append(contour)
+                    filtered_contours.append((contour_id, contour))
 
             # Create a blank white image for drawing colored traces
             combined = np.full(image_for_preview_traces.size[::-1] + (4,), 255, dtype=np.uint8) # White RGBA background
             
             original_img_np = np.array(image_for_preview_traces.convert("RGB"))
 
-            for contour in filtered_contours: # Iterate through filtered contours
-                # Apply Catmull-Rom spline for a smoother preview
-                splined_contour = catmull_rom_spline(contour.squeeze().tolist(), num_segments=self.spline_segments_var.get())
-                
-                # Convert splined points to integer format for drawing
-                splined_contour_np = np.array([splined_contour], dtype=np.int32)
+            for contour_id, contour in filtered_contours: # Iterate through filtered contours
+                derived = contour_index.derived[contour_id]
+                spline_key = ("spline", epsilon_val, spline_segments)
+                if spline_key not in derived:
+                    # Apply Catmull-Rom spline for a smoother preview
+                    splined_contour = catmull_rom_spline(contour.squeeze().tolist(), num_segments=spline_segments)
+                    
+                    # Convert splined points to integer format for drawing
+                    derived[spline_key] = np.array([splined_contour], dtype=np.int32)
+                splined_contour_np = derived[spline_key]
 
                 # Determine the color to draw the contour with
                 if self.monochromatic_var.get() and self.selected_mono_color_info:
                     palette_rgb = self.selected_mono_color_info["rgb_value"]
                 else:
-                    # Calculate average color for the current contour from the chosen image
-                    mask = np.zeros(original_img_np.shape[:2], dtype=np.uint8)
-                    cv2.drawContours(mask, [contour], -1, 255, -1) # Draw original contour on mask for color sampling
-                    
-                    # Use the mask to get the mean color of the image within the contour
-                    mean_color_bgr = cv2.mean(original_img_np, mask=mask)[:3]
-                    original_rgb = (int(mean_color_bgr[2]), int(mean_color_bgr[1]), int(mean_color_bgr[0])) # Convert BGR to RGB
-
-                    # Find the nearest Instagram palette color
-                    nearest_color_info = get_nearest_palette_color(*original_rgb)
-                    
-                    if nearest_color_info:
-                        palette_rgb = nearest_color_info["rgb_value"]
-                    else:
-                        palette_rgb = (0, 0, 0) # Default to black if no color info
+                    color_key = ("color", epsilon_val)
+                    if color_key not in derived:
+                        derived[color_key] = self._preview_contour_color(original_img_np, contour)
+                    palette_rgb = derived[color_key]
 
                 # OpenCV uses BGR, so convert RGB to BGR
                 palette_bgr = (palette_rgb[2], palette_rgb[1], palette_rgb[0])
@@ -622,7 +851,7 @@ class StrokeExtractorApp(tk.Tk):
             # make RGBA edge image
             edges_rgba = cv2.cvtColor(edges_inv, cv2.COLOR_GRAY2RGBA)
 
-            brightness = float(self.brightness_var.get())
+            brightness = float(params["brightness_var"])
             # clamp brightness to reasonable range
             brightness = max(0.1, min(3.0, brightness))
 
@@ -643,11 +872,29 @@ class StrokeExtractorApp(tk.Tk):
 
         return Image.fromarray(combined)
 
+    @staticmethod
+    def _preview_contour_color(original_img_np, contour):
+        """Returns the palette color for a preview contour, from the mean image color inside it."""
+        # Calculate average color for the current contour, only within its bounding box
+        x, y, w, h = cv2.boundingRect(contour)
+        mask = np.zeros((h, w), dtype=np.uint8)
+        cv2.drawContours(mask, [contour], -1, 255, -1, offset=(-x, -y)) # Draw contour on mask for color sampling
+        
+        # Use the mask to get the mean color of the image within the contour
+        mean_color_bgr = cv2.mean(original_img_np[y : y + h, x : x + w], mask=mask)[:3]
+        original_rgb = (int(mean_color_bgr[2]), int(mean_color_bgr[1]), int(mean_color_bgr[0])) # Convert BGR to RGB
+
+        # Find the nearest Instagram palette color
+        nearest_color_info = get_nearest_palette_color(*original_rgb)
+        
+        if nearest_color_info:
+            return nearest_color_info["rgb_value"]
+        return (0, 0, 0) # Default to black if no color info
+
     def _update_ui_with_processed_image(self, processed_image):
         """Updates the UI with the processed image on the main thread."""
         self.processed_image = processed_image
-        self.display_image = self.processed_image.copy()
-        self._save_state_for_undo()
+        self.image_state.share("display", "processed")  # Brush feedback copies on write
         self.show_image()
         self.status_label.config(text="Preview atualizado (traços).")
 
@@ -671,14 +918,13 @@ class StrokeExtractorApp(tk.Tk):
             self.original_image.save(buf, format="PNG")
             inp_bytes = buf.getvalue()
             out_bytes = rembg.remove(inp_bytes)
-            img = Image.open(io.BytesIO(out_bytes)).convert("RGBA")
-            self.processed_image = img.copy()
-            self.display_image = img.copy()
-            self.original_image = (
-                img.copy()
-            )  # make background-removed version the new original for further ops
-            self._save_state_for_undo()
-            self.show_image()
+            # make background-removed version the new original for further ops,
+            # keeping the user's edits (same size as before)
+            edit_mask = self.image_state.mask
+            self.image_state.load(Image.open(io.BytesIO(out_bytes)))
+            self.image_state.set_mask(edit_mask)
+            self._save_state_for_undo("source")
+            self.update_preview()
             self.status_label.config(text="Fundo removido.")
         except Exception as e:
             messagebox.showerror("Erro rembg", f"Falha ao remover fundo:\n{e}")
@@ -701,29 +947,25 @@ class StrokeExtractorApp(tk.Tk):
         if img_w <= 0 or img_h <= 0:
             return
 
-        # Calculate base scale to fit image inside canvas
-        scale_w = canvas_w / img_w
-        scale_h = canvas_h / img_h
-        base_scale = min(scale_w, scale_h)
-
-        # Apply user zoom from slider (self.scale_var.get() is the user's multiplier)
-        self.scale = base_scale * self.scale_var.get()
-
-        new_w = max(1, int(img_w * self.scale))
-        new_h = max(1, int(img_h * self.scale))
+        # Fit the image inside the canvas, then apply user zoom from slider and the pan position
+        self.viewport.update(canvas_w, canvas_h, img_w, img_h, self.scale_var.get())
+        self.scale = self.viewport.scale
+        self.x_offset = self.viewport.x_offset
+        self.y_offset = self.viewport.y_offset
 
-        # Calculate offsets to center the image on the canvas
-        self.x_offset = (canvas_w - new_w) // 2
-        self.y_offset = (canvas_h - new_h) // 2
-
-        resized = self.display_image.resize((new_w, new_h), Image.Resampling.LANCZOS)
-        self._tkimg = ImageTk.PhotoImage(resized)
+        # Only the visible region is resampled, so zooming in costs the canvas size
+        # (in stroke editing mode the strokes are shown instead of the preview)
+        image = self.stroke_editor.view() if self.stroke_editor.active else self.display_image
+        visible, position = self.viewport.render(image)
 
         # clear canvas and draw
         self.canvas.delete("all")
         self.canvas.config(width=canvas_w, height=canvas_h)
+        if visible is None:
+            return
+        self._tkimg = ImageTk.PhotoImage(visible)
         self.canvas.create_image(
-            self.x_offset, self.y_offset, anchor="nw", image=self._tkimg
+            position[0], position[1], anchor="nw", image=self._tkimg
         )
         # keep reference to prevent GC
         self.canvas.image = self._tkimg
@@ -735,52 +977,6 @@ class StrokeExtractorApp(tk.Tk):
             text=f"Modo: {'Borracha' if self.erase_mode else 'Restaurar'}"
         )
 
-    def _start_paint(self, event):
-        if not self.display_image:  # Do not allow painting if no image is loaded
-            return
-        self.last_x = event.x
-        self.last_y = event.y
-
-    def _paint(self, event):
-        if self.display_image is None or self.last_x is None or self.last_y is None:
-            return
-
-        # map canvas coords to image coords, accounting for offset and scale
-        ix = int((event.x - self.x_offset) / self.scale)
-        iy = int((event.y - self.y_offset) / self.scale)
-        radius = self.eraser_var.get()
-
-        # ensure we operate on RGBA numpy array
-        img = np.array(self.display_image.convert("RGBA"))
-        h, w = img.shape[:2]
-
-        # Clamp drawing coordinates to image bounds
-        ix = max(0, min(w - 1, ix))
-        iy = max(0, min(h - 1, iy))
-
-        # Create a mask for the circular region
-        mask = np.zeros((h, w), dtype=np.uint8)
-        cv2.circle(mask, (ix, iy), radius, 255, -1)
-
-        if self.erase_mode:
-            # set alpha in circular region to 0
-            img[..., 3] = np.where(mask == 255, 0, img[..., 3])
-        else:
-            # restore: paint white opaque on RGB and alpha=255 in region
-            for c in range(3):
-                img[..., c] = np.where(mask == 255, 255, img[..., c])
-            img[..., 3] = np.where(mask == 255, 255, img[..., 3])
-
-        # update display_image and redraw
-        self.display_image = Image.fromarray(img)
-        self.show_image()
-        self.last_x, self.last_y = event.x, event.y
-
-    def _end_paint(self, _=None):
-        self.last_x = None
-        self.last_y = None
-        self._save_state_for_undo()
-
     # ---------- cropping ----------
     def enable_crop(self):
         if self.display_image is None:
@@ -821,11 +1017,9 @@ class StrokeExtractorApp(tk.Tk):
         x0, x1 = sorted((x0, x1))
         y0, y1 = sorted((y0, y1))
 
-        # convert canvas coords to image coords using scale and offset
-        ix0 = int((x0 - self.x_offset) / self.scale)
-        iy0 = int((y0 - self.y_offset) / self.scale)
-        ix1 = int((x1 - self.x_offset) / self.scale)
-        iy1 = int((y1 - self.y_offset) / self.scale)
+        # convert canvas coords to image coords through the viewport (zoom and pan)
+        ix0, iy0 = map(int, self.viewport.canvas_to_image(x0, y0))
+        ix1, iy1 = map(int, self.viewport.canvas_to_image(x1, y1))
 
         # clamp to image bounds
         if self.display_image is None:
@@ -847,28 +1041,38 @@ class StrokeExtractorApp(tk.Tk):
             self._restore_paint_bindings()
             return
 
-        # crop the PIL image (display_image is PIL)
+        self._apply_crop((ix0, iy0, ix1, iy1))
+
+        # cleanup
+        self.canvas.delete(self.crop_rect_id)
+        self.crop_rect_id = None
+        self.crop_start = None
+        self._restore_paint_bindings()
+
+    def _apply_crop(self, display_rect):
+        """Crops the source to the rect selected on display_image (which may be a downscaled preview)."""
         try:
-            cropped = self.display_image.crop((ix0, iy0, ix1, iy1))
-            self.display_image = cropped.copy()
-            self.processed_image = cropped.copy()
-            self.original_image = (
-                cropped.copy()
-            )  # make crop become new original for further ops
+            # map display coords to source coords
+            ix0, iy0, ix1, iy1 = display_rect
+            sx = self.original_image.width / self.display_image.width
+            sy = self.original_image.height / self.display_image.height
+            source_rect = (int(ix0 * sx), int(iy0 * sy), int(ix1 * sx), int(iy1 * sy))
+            # make crop become new original for further ops: an ROI view of the current buffer,
+            # compacted into its own buffer once the UI is idle
+            self.image_state.crop(source_rect)
+            self.after_idle(self.image_state.commit)
             self.scale_var.set(1.0)  # Reset zoom slider
+            self.viewport.reset()
             self.show_image()
-            self._save_state_for_undo()
+            # source and edit mask are cropped together and undone as one step
+            self._save_state_for_undo("source")
+            self._save_state_for_undo("mask", joined=True)
+            self.update_preview()
             self.status_label.config(text="Imagem cortada.")
         except Exception as e:
             messagebox.showerror("Erro crop", f"Falha no crop: {e}")
             self.status_label.config(text="Crop falhou.")
 
-        # cleanup
-        self.canvas.delete(self.crop_rect_id)
-        self.crop_rect_id = None
-        self.crop_start = None
-        self._restore_paint_bindings()
-
     def _restore_paint_bindings(self):
         # re-bind paint handlers
         self.canvas.bind("<ButtonPress-1>", self.canvas_handler._start_paint)
@@ -881,30 +1085,58 @@ class StrokeExtractorApp(tk.Tk):
         self.status_label.config(text="Modo: Pintura/Borracha")
 
     # ---------- undo/redo ----------
-    def _save_state_for_undo(self):
-        """Salva o estado atual da `display_image` no histórico."""
-        self.history_manager.save_state(self.display_image)
+    def _save_state_for_undo(self, layer="source", dirty_rect=None, joined=False):
+        """Salva no histórico a imagem original ("source") ou a máscara de edição ("mask"), apenas a região alterada."""
+        if layer == "mask":
+            state = self.image_state.mask
+        else:
+            source = self.image_state.layer("source")
+            state = source.array if source else None
+        self.history_manager.save_state(state, dirty_rect, layer=layer, joined=joined)
+        self._update_history_memory_label()
+        self.after(HISTORY_LABEL_REFRESH_MS, self._update_history_memory_label)
+
+    def _update_history_memory_label(self):
+        """Mostra a memória usada pelo histórico de desfazer/refazer."""
+        used_mb = self.history_manager.memory_usage() / (1024 * 1024)
+        budget_mb = self.history_manager.max_bytes / (1024 * 1024)
+        self.history_memory_label.config(text=f"Histórico: {used_mb:.1f} / {budget_mb:.0f} MB")
 
     def undo(self, _=None):
         """Volta para o estado anterior no histórico."""
-        restored_image = self.history_manager.undo()
-        if restored_image:
-            self.display_image = restored_image
-            self.show_image()
+        step = self.history_manager.undo()
+        if step:
+            self._apply_history_step(step)
             self.status_label.config(text="Ação desfeita.")
         else:
             self.status_label.config(text="Nada para desfazer.")
 
     def redo(self, _=None):
         """Refaz uma ação previamente desfeita."""
-        restored_image = self.history_manager.redo()
-        if restored_image:
-            self.display_image = restored_image
-            self.show_image()
+        step = self.history_manager.redo()
+        if step:
+            self._apply_history_step(step)
             self.status_label.config(text="Ação refeita.")
         else:
             self.status_label.config(text="Nada para refazer.")
 
+    def _apply_history_step(self, restored):
+        """Aplica um passo do histórico: imagem original, máscara de edição e/ou parâmetros restaurados."""
+        if "source" in restored:
+            # Shared with the history, no copy; processed and display follow the source
+            self.image_state.set_array("source", restored["source"])
+            self.image_state.share("processed", "source")
+            self.image_state.share("display", "source")
+            self.viewport.reset()
+            self.show_image()
+        if "mask" in restored:
+            self.image_state.set_mask(restored["mask"])
+        if "params" in restored:
+            self._apply_preview_params(restored["params"])
+        else:
+            self.update_preview()
+        self._update_history_memory_label()
+
     # ---------- finish ----------
     def run(self):
         print("StrokeExtractorApp: run method called, entering mainloop...")
@@ -1,75 +1,152 @@
 import subprocess
-import time
 
-from .adb_utils import run_adb_command, get_screen_dump, find_button_coordinates, tap_coordinates, swipe_coordinates, find_color_button_by_properties
+from .adb_utils import run_adb_command, get_ui_snapshot, find_button_coordinates, tap_coordinates, swipe_coordinates, find_all_color_buttons
+from .adb_client import AdbError
+from .device_session import current_session
+from .palette_cache import INSTAGRAM_PACKAGE
+from .wait_utils import (
+    get_focused_window,
+    wait_for_device,
+    wait_for_element,
+    wait_for_focus,
+    wait_for_region_settled,
+    wait_for_screen_change,
+)
 from src.utils.color_utils import INSTAGRAM_PALETTE # Import the palette
 
-# Global state for current color selection
-current_page = 1
-current_color_index = 0
-
 # Palette bounds and swipe coordinates
 PALETTE_BOUNDS_X_START = 352
 PALETTE_BOUNDS_X_END = 981
 PALETTE_BOUNDS_Y_START = 2088
 PALETTE_BOUNDS_Y_END = 2221
 PALETTE_Y_CENTER = (PALETTE_BOUNDS_Y_START + PALETTE_BOUNDS_Y_END) // 2
+PALETTE_RECT = (PALETTE_BOUNDS_X_START, PALETTE_BOUNDS_Y_START, PALETTE_BOUNDS_X_END, PALETTE_BOUNDS_Y_END)
 
 SWIPE_NEXT_PAGE = "800 2150 400 2150 500"
 SWIPE_PREV_PAGE = "400 2150 800 2150 500"
+PAGE_SETTLE_TIMEOUT_S = 1.0  # Longest wait for the pager to stop after a swipe (the fixed sleep it replaced)
+SLIDER_RECT = (0, 800, 90, 1600)  # Stroke width slider on the drawing screen
 
 def select_color(target_page, target_index):
-    global current_page, current_color_index
+    # Palette state lives in the device session of the current thread (one per device)
+    session = current_session()
+    palette_cache = session.palette_cache
 
-    if target_page == current_page and target_index == current_color_index:
+    if target_page == session.current_page and target_index == session.current_color_index:
         print(f"Cor já selecionada: Página {target_page}, Índice {target_index}. Pulando seleção.")
         return
 
     # Navigate to the target page
-    while current_page != target_page:
-        if target_page > current_page:
-            print(f"Deslizando para a próxima página (atual: {current_page})...")
+    while session.current_page != target_page:
+        if target_page > session.current_page:
+            print(f"Deslizando para a próxima página (atual: {session.current_page})...")
             swipe_coordinates(*map(int, SWIPE_NEXT_PAGE.split()))
-            current_page += 1
+            session.current_page += 1
         else: # target_page < current_page
-            print(f"Deslizando para a página anterior (atual: {current_page})...")
+            print(f"Deslizando para a página anterior (atual: {session.current_page})...")
             swipe_coordinates(*map(int, SWIPE_PREV_PAGE.split()))
-            current_page -= 1
-        time.sleep(1) # Wait 1 second after changing page
-
-    # Get fresh screen dump to find the color button dynamically
-    xml_data = get_screen_dump()
-    if not xml_data:
-        print("🚨 Erro: Não foi possível obter o dump da tela para selecionar a cor.")
-        return
+            session.current_page -= 1
+        _wait_for_palette_page(session.current_page)
 
     # Get the content-desc for the target color from the palette
     color_info = INSTAGRAM_PALETTE.get(target_page, [])[target_index]
     target_content_desc = color_info["name"]
 
-    # Find the color button using its content-desc and index
-    color_coords = find_color_button_by_properties(xml_data, target_content_desc, target_index)
+    # Tap straight from the cache; dump the screen only to discover the page or, every
+    # VERIFY_EVERY taps, to check that the palette has not moved (taps are not watched)
+    color_coords = None
+    if not palette_cache.verification_due():
+        color_coords = palette_cache.lookup(target_page, target_index, target_content_desc)
+
+    if color_coords is None:
+        xml_data = get_ui_snapshot()
+        if not xml_data:
+            print("🚨 Erro: Não foi possível obter o dump da tela para selecionar a cor.")
+            return
+        buttons = find_all_color_buttons(xml_data)
+        if buttons and palette_cache.store_page(target_page, buttons):
+            print(f"💾 Coordenadas da página {target_page} da paleta salvas em cache.")
+        color_coords = palette_cache.lookup(target_page, target_index, target_content_desc)
+    else:
+        palette_cache.taps_since_verify += 1
 
     if color_coords:
-        tap_coordinates(color_coords[0], color_coords[1])
-        time.sleep(0.5) # Wait 0.5 seconds after clicking a color
-        current_color_index = target_index
-        print(f"✅ Cor atualizada para Página {current_page}, Índice {current_color_index}.")
+        tap_coordinates(*color_coords)  # `input tap` returns once the tap is injected
+        session.current_color_index = target_index
+        print(f"✅ Cor atualizada para Página {session.current_page}, Índice {session.current_color_index}.")
     else:
         print(f"❌ Não foi possível encontrar a cor '{target_content_desc}' (Página {target_page}, Índice {target_index}).")
 
 
+def visible_palette_page(xml_data):
+    """Palette page shown in a UI dump (the page holding most of its color names), or None."""
+    names = {name for name, _ in find_all_color_buttons(xml_data).values()}
+    matches = {page: len(names & {color["name"] for color in colors}) for page, colors in INSTAGRAM_PALETTE.items()}
+    page = max(matches, key=matches.get)
+    return page if matches[page] else None
+
+
+def sync_palette_page():
+    """
+    Sets the session's palette page to the one on screen instead of trusting remembered
+    state (the app may have been reopened since); if the palette cannot be read, swipes
+    back to the first page. The color index is forgotten, so the next color is tapped.
+    """
+    session = current_session()
+    session.current_color_index = None
+    page = visible_palette_page(get_ui_snapshot())
+    if page is None:
+        print("⚠️ Página da paleta não identificada na tela; voltando para a primeira página.")
+        for _ in range(len(INSTAGRAM_PALETTE) - 1):  # Extra swipes on the first page do nothing
+            swipe_coordinates(*map(int, SWIPE_PREV_PAGE.split()))
+            _wait_for_palette_page(1)
+        page = 1
+    session.current_page = page
+    print(f"🎨 Paleta na página {page}.")
+    return page
+
+
+def _wait_for_palette_page(page):
+    """
+    One check after a page swipe: `input swipe` returns once the drag is over, so only the
+    pager's snap is left; wait for the palette area to stop moving.
+    """
+    try:
+        wait_for_region_settled(PALETTE_RECT, PAGE_SETTLE_TIMEOUT_S)
+    except (AdbError, OSError):
+        # No framebuffer access: wait for the page's first color to show up in the UI dump
+        wait_for_element(content_desc=INSTAGRAM_PALETTE[page][0]["name"], timeout=2.0)
+
+
+def _ensure_instagram_focused():
+    """
+    False if another app is in the foreground and Instagram does not come up. An
+    unreadable focus (e.g. during a transition or an unknown dumpsys format) is let through.
+    """
+    try:
+        focused = get_focused_window()
+        if focused is None or focused.startswith(INSTAGRAM_PACKAGE):
+            return True
+        print(f"⏳ Aguardando o Instagram em primeiro plano (atual: {focused})...")
+        return bool(wait_for_focus(INSTAGRAM_PACKAGE))
+    except (AdbError, OSError):
+        return True
+
+
 def run_adb_automation():
     print("🚀 Iniciando servidor ADB...")
     run_adb_command("adb start-server")
-    time.sleep(1)
+    wait_for_device()
+    if not _ensure_instagram_focused():
+        print("❌ O Instagram não está em primeiro plano. Abra a conversa onde o desenho será enviado.")
+        return False
 
     target_more_resource_id = (
         "com.instagram.android:id/row_thread_composer_button_overflow"
     )
     target_more_content_desc = "More"
 
-    xml_data_initial = get_screen_dump()
+    xml_data_initial = get_ui_snapshot()
 
     if xml_data_initial:
         more_coords = find_button_coordinates(
@@ -80,9 +157,10 @@ def run_adb_automation():
 
         if more_coords:
             tap_coordinates(more_coords[0], more_coords[1])
-            time.sleep(2)
 
-            xml_data_menu_open = get_screen_dump()
+            xml_data_menu_open = wait_for_element(
+                resource_id="com.instagram.android:id/context_menu_item", content_desc="Draw"
+            ) or get_ui_snapshot()
 
             if xml_data_menu_open:
                 target_draw_resource_id = "com.instagram.android:id/context_menu_item"
@@ -96,9 +174,8 @@ def run_adb_automation():
 
                 if draw_coords:
                     tap_coordinates(draw_coords[0], draw_coords[1])
-                    time.sleep(2)
 
-                    xml_data_draw_screen = get_screen_dump()
+                    xml_data_draw_screen = wait_for_element(content_desc="Sharpie Brush") or get_ui_snapshot()
 
                     if xml_data_draw_screen:
                         # --- NEW: Adjust slider first ---
@@ -114,8 +191,12 @@ def run_adb_automation():
                             swipe_end_y,
                             swipe_duration,
                         )
+                        # `input swipe` returns when the gesture ends; wait for the slider to stop moving
+                        try:
+                            wait_for_region_settled(SLIDER_RECT, timeout=1.0)
+                        except (AdbError, OSError):
+                            pass
                         print("✅ Espessura ajustada para o mais fino.")
-                        time.sleep(1)  # Give app time to register swipe
 
                         # --- THEN: Select Sharpie Brush ---
                         target_sharpie_content_desc = "Sharpie Brush"
@@ -127,7 +208,7 @@ def run_adb_automation():
 
                         if sharpie_coords:
                             tap_coordinates(sharpie_coords[0], sharpie_coords[1])
-                            time.sleep(1)
+                            wait_for_screen_change(xml_data_draw_screen.digest, timeout=1.0)
                             print("✅ Pincel Sharpie selecionado.")
                             return True
                         else:
@@ -0,0 +1,284 @@
+import os
+import socket
+import struct
+import subprocess
+import threading
+import time
+
+ADB_SERVER_HOST = "127.0.0.1"
+ADB_SERVER_PORT = int(os.environ.get("ANDROID_ADB_SERVER_PORT", 5037))
+SOCKET_TIMEOUT = 10.0  # Seconds without data before a request is abandoned
+SYNC_CHUNK_SIZE = 64 * 1024  # Maximum DATA payload of the sync protocol
+SYNC_POOL_SIZE = 2  # Idle sync connections kept open per device
+EXIT_STATUS_MARKER = "__insta_draw_exit="  # Echoed with $? after a command run by shell_with_status
+
+
+class AdbError(Exception):
+    """Raised when the adb server or the device rejects a request."""
+
+
+class AdbClient:
+    """
+    Talks to the adb server directly over its socket protocol (the same one the `adb`
+    command line client uses), so each command costs a local TCP round trip instead of
+    spawning an `adb` process. One client per device; sync (file transfer) connections
+    are pooled and reused across pulls/pushes.
+    """
+
+    def __init__(self, serial=None, host=ADB_SERVER_HOST, port=ADB_SERVER_PORT):
+        self.serial = serial  # None: the only connected device (like `adb` without -s)
+        self.host = host
+        self.port = port
+        self._sync_pool = []
+        self._lock = threading.Lock()
+        self._server_started = False
+
+    # ---------- host services ----------
+    def version(self):
+        with self._host_request("host:version") as sock:
+            return int(self._read_length_prefixed(sock), 16)
+
+    def devices(self):
+        """Returns [(serial, state), ...] of the devices known to the server."""
+        with self._host_request("host:devices") as sock:
+            listing = self._read_length_prefixed(sock)
+        return [tuple(line.split("\t", 1)) for line in listing.splitlines() if "\t" in line]
+
+    def start_server(self):
+        """Makes sure the adb server is running (starting it with the `adb` binary if needed)."""
+        try:
+            self.version()
+        except (OSError, AdbError):
+            subprocess.run(["adb", "start-server"], capture_output=True, check=False)
+            self._server_started = True
+
+    def forward(self, local, remote):
+        """Forwards a host socket to a device one, e.g. forward("tcp:27183", "localabstract:scrcpy")."""
+        self._host_command(f"{self._host_prefix()}:forward:{local};{remote}")
+
+    def remove_forward(self, local):
+        self._host_command(f"{self._host_prefix()}:killforward:{local}")
+
+    def _host_command(self, payload):
+        """Host request answered with two statuses: request accepted, then its result."""
+        with self._host_request(payload) as sock:
+            status = self._recv_exact(sock, 4)
+            if status != b"OKAY":
+                raise AdbError(self._read_length_prefixed(sock))
+
+    def _host_prefix(self):
+        return f"host-serial:{self.serial}" if self.serial else "host"
+
+    # ---------- device services ----------
+    def open_shell(self, command):
+        """Starts `command` and returns its socket (stdout stream) for long-running processes."""
+        return self._device_request(f"shell:{command}")
+
+    def shell(self, command):
+        """Runs `command` with the device shell and returns its output (stdout and stderr)."""
+        return self.exec_out(command, service="shell").decode("utf-8", errors="replace")
+
+    def shell_with_status(self, command):
+        """
+        Like shell(), plus the command's exit status. The `shell:` service reports none, so
+        it is echoed after the output and cut off again (works on every Android version).
+        """
+        output = self.shell(f"{command}; echo {EXIT_STATUS_MARKER}$?")
+        output, marker, status = output.rpartition(EXIT_STATUS_MARKER)
+        if not marker or not status.strip().isdigit():
+            raise AdbError(f"Status de saída ausente para: {command}")
+        return output, int(status)
+
+    def exec_out(self, command, service="exec"):
+        """Runs `command` on the device and returns its raw stdout bytes."""
+        sock = self._device_request(f"{service}:{command}")
+        try:
+            return self._read_all(sock)
+        finally:
+            sock.close()
+
+    def pull(self, remote_path, local_path):
+        """Copies a device file to `local_path` over the sync protocol."""
+        data = self.read_file(remote_path)
+        with open(local_path, "wb") as f:
+            f.write(data)
+
+    def read_file(self, remote_path):
+        """Returns the contents of a device file."""
+        with self._sync() as sock:
+            self._sync_send(sock, b"RECV", remote_path.encode("utf-8"))
+            chunks = []
+            while True:
+                ident, length = self._sync_header(sock)
+                if ident == b"DATA":
+                    chunks.append(self._recv_exact(sock, length))
+                elif ident == b"DONE":
+                    return b"".join(chunks)
+                elif ident == b"FAIL":
+                    raise AdbError(self._recv_exact(sock, length).decode("utf-8", errors="replace"))
+                else:
+                    raise AdbError(f"Resposta sync inesperada: {ident!r}")
+
+    def push(self, local_path, remote_path, mode=0o644):
+        """Copies a local file to the device over the sync protocol."""
+        with open(local_path, "rb") as f:
+            data = f.read()
+        self.write_file(remote_path, data, mode)
+
+    def write_file(self, remote_path, data, mode=0o644):
+        with self._sync() as sock:
+            self._sync_send(sock, b"SEND", f"{remote_path},{mode}".encode("utf-8"))
+            for start in range(0, len(data), SYNC_CHUNK_SIZE):
+                self._sync_send(sock, b"DATA", data[start : start + SYNC_CHUNK_SIZE])
+            sock.sendall(b"DONE" + struct.pack("<I", int(time.time())))
+            ident, length = self._sync_header(sock)
+            message = self._recv_exact(sock, length) if length else b""
+            if ident != b"OKAY":
+                raise AdbError(message.decode("utf-8", errors="replace") or f"Falha no envio: {ident!r}")
+
+    def stat(self, remote_path):
+        """Returns (mode, size, mtime) of a device path (all zero if it does not exist)."""
+        with self._sync() as sock:
+            self._sync_send(sock, b"STAT", remote_path.encode("utf-8"))
+            reply = self._recv_exact(sock, 16)  # "STAT" + mode + size + mtime, no length field
+            if reply[:4] != b"STAT":
+                raise AdbError(f"Resposta sync inesperada: {reply[:4]!r}")
+            return struct.unpack("<III", reply[4:])
+
+    def close(self):
+        with self._lock:
+            pool, self._sync_pool = self._sync_pool, []
+        for sock in pool:
+            try:
+                self._sync_send(sock, b"QUIT", b"")
+            except OSError:
+                pass
+            sock.close()
+
+    # ---------- protocol ----------
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=SOCKET_TIMEOUT)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def _request(self, sock, payload):
+        """Sends one length-prefixed request and waits for OKAY."""
+        data = payload.encode("utf-8")
+        sock.sendall(b"%04x" % len(data) + data)
+        status = self._recv_exact(sock, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            raise AdbError(self._read_length_prefixed(sock))
+        raise AdbError(f"Resposta inesperada do servidor adb: {status!r}")
+
+    def _host_request(self, payload):
+        sock = self._connect()
+        try:
+            self._request(sock, payload)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def _device_request(self, payload):
+        """Opens a connection switched to this client's device and starts a service on it."""
+        sock = self._connect()
+        try:
+            transport = f"host:transport:{self.serial}" if self.serial else "host:transport-any"
+            self._request(sock, transport)
+            self._request(sock, payload)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def _sync(self):
+        return _PooledSync(self)
+
+    def _take_sync(self):
+        with self._lock:
+            if self._sync_pool:
+                return self._sync_pool.pop()
+        return self._device_request("sync:")
+
+    def _release_sync(self, sock, healthy):
+        if healthy:
+            with self._lock:
+                if len(self._sync_pool) < SYNC_POOL_SIZE:
+                    self._sync_pool.append(sock)
+                    return
+        sock.close()
+
+    @staticmethod
+    def _sync_send(sock, ident, data):
+        sock.sendall(ident + struct.pack("<I", len(data)) + data)
+
+    def _sync_header(self, sock):
+        header = self._recv_exact(sock, 8)
+        return header[:4], struct.unpack("<I", header[4:])[0]
+
+    def _read_length_prefixed(self, sock):
+        length = int(self._recv_exact(sock, 4), 16)
+        return self._recv_exact(sock, length).decode("utf-8", errors="replace")
+
+    @staticmethod
+    def _recv_exact(sock, size):
+        buf = bytearray()
+        while len(buf) < size:
+            chunk = sock.recv(size - len(buf))
+            if not chunk:
+                raise AdbError("Conexão com o servidor adb encerrada inesperadamente.")
+            buf += chunk
+        return bytes(buf)
+
+    @staticmethod
+    def _read_all(sock):
+        chunks = []
+        while True:
+            chunk = sock.recv(SYNC_CHUNK_SIZE)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+
+class _PooledSync:
+    """Context manager lending a pooled sync connection; broken connections are not returned."""
+
+    def __init__(self, client):
+        self.client = client
+        self.sock = None
+
+    def __enter__(self):
+        self.sock = self.client._take_sync()
+        return self.sock
+
+    def __exit__(self, exc_type, exc, tb):
+        # adbd ends the sync session after a FAIL, so only clean transfers go back to the pool
+        self.client._release_sync(self.sock, exc_type is None)
+        return False
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+_thread_device = threading.local()
+
+
+def set_thread_serial(serial):
+    """Makes `serial` the default device for adb calls made from the current thread."""
+    _thread_device.serial = serial
+
+
+def current_serial():
+    """Default device of the current thread: set_thread_serial, else ANDROID_SERIAL, else None (the only device)."""
+    return getattr(_thread_device, "serial", None) or os.environ.get("ANDROID_SERIAL") or None
+
+
+def get_client(serial=None):
+    """Returns the shared client for a device (default: current_serial())."""
+    serial = serial or current_serial()
+    with _clients_lock:
+        client = _clients.get(serial)
+        if client is None:
+            client = _clients[serial] = AdbClient(serial)
+        return client
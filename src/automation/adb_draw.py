@@ -0,0 +1,166 @@
+import re
+import time
+
+from src.automation.adb_automation import PALETTE_BOUNDS_Y_START, select_color
+from src.automation.adb_client import AdbError, get_client
+from src.automation.adb_utils import get_ui_snapshot
+from src.automation.draw_journal import DrawJournal
+from src.automation.stroke_verifier import verify_and_redraw
+from src.utils.curve_utils import catmull_rom_spline
+
+DEVICE_SCRIPT_PATH = "/data/local/tmp/insta_draw_stroke.sh"
+# Resource ids of the doodle canvas in the Instagram drawing screen (first match wins)
+DRAW_CANVAS_RESOURCE_IDS = (
+    "com.instagram.android:id/drawing_view",
+    "com.instagram.android:id/doodle_view",
+)
+# Without a canvas node, draw between the brush-size slider (left edge) and the palette (bottom)
+FALLBACK_MARGIN_X = 120
+FALLBACK_MARGIN_TOP = 300
+
+
+def get_screen_size(client):
+    """Device screen size from `wm size` (override size wins over the physical one)."""
+    output = client.shell("wm size")
+    sizes = dict(re.findall(r"(\w+) size: (\d+x\d+)", output))
+    size = sizes.get("Override") or sizes.get("Physical")
+    if not size:
+        raise AdbError(f"Não foi possível ler o tamanho da tela: {output.strip()}")
+    width, height = map(int, size.split("x"))
+    return width, height
+
+
+def find_drawing_area(snapshot, screen_size):
+    """Returns the device-pixel drawing rectangle {x, y, width, height} (snapshot: UiSnapshot or None)."""
+    if snapshot is not None:
+        for resource_id in DRAW_CANVAS_RESOURCE_IDS:
+            for node in snapshot.find_all(resource_id=resource_id):
+                if node.bounds:
+                    x0, y0, x1, y1 = node.bounds
+                    print(f"✅ Área de desenho '{resource_id}' encontrada: ({x0}, {y0}) - ({x1}, {y1})")
+                    return {"x": x0, "y": y0, "width": x1 - x0, "height": y1 - y0}
+    width, height = screen_size
+    bottom = min(PALETTE_BOUNDS_Y_START, height)
+    print("⚠️ Nó da área de desenho não encontrado no dump; usando a tela acima da paleta.")
+    return {
+        "x": FALLBACK_MARGIN_X,
+        "y": FALLBACK_MARGIN_TOP,
+        "width": width - 2 * FALLBACK_MARGIN_X,
+        "height": bottom - FALLBACK_MARGIN_TOP,
+    }
+
+
+def fit_to_area(raw_width, raw_height, area):
+    """Scale and offsets that fit the raw traces bounding box centered in `area`."""
+    scale = min(area["width"] / raw_width, area["height"] / raw_height)
+    offset_x = area["x"] + (area["width"] - raw_width * scale) / 2
+    offset_y = area["y"] + (area["height"] - raw_height * scale) / 2
+    return scale, offset_x, offset_y
+
+
+def stroke_to_device_points(path, transform, num_segments=5):
+    """Smooths a trace and maps it to integer device pixels, dropping repeated points."""
+    scale, offset_x, offset_y = transform
+    points = catmull_rom_spline(path, num_segments=num_segments) if len(path) > 1 else path
+    device_points = []
+    for x, y in points:
+        point = (int(offset_x + x * scale), int(offset_y + y * scale))
+        if not device_points or device_points[-1] != point:
+            device_points.append(point)
+    return device_points
+
+
+def build_motionevent_script(points):
+    """Shell script injecting one stroke: DOWN at the first point, MOVE through the rest, UP."""
+    lines = [f"input motionevent DOWN {points[0][0]} {points[0][1]}"]
+    lines += [f"input motionevent MOVE {x} {y}" for x, y in points[1:]]
+    lines.append(f"input motionevent UP {points[-1][0]} {points[-1][1]}")
+    return "\n".join(lines) + "\n"
+
+
+def draw_strokes_with_adb(
+    traces_data, is_cancelled=lambda: False, num_segments=5, serial=None, verify=True, journal=None
+):
+    """
+    Desenha os traços direto no dispositivo: cada traço vira um script de
+    `input motionevent DOWN/MOVE/UP` enviado e executado numa única sessão de shell,
+    sem espelhamento da tela nem mouse do desktop.
+
+    Args:
+        traces_data (dict): Dicionário com 'raw_bbox_width', 'raw_bbox_height' e 'grouped_traces'.
+        is_cancelled (callable): Retorna True quando o desenho deve parar (ex: ESC).
+        num_segments (int): Segmentos da spline Catmull-Rom entre pontos.
+        serial (str): Dispositivo a usar (padrão: ANDROID_SERIAL ou o único conectado).
+        verify (bool): Confere cada cor na tela ao terminar e redesenha só os traços que faltaram.
+        journal (DrawJournal): Diário do progresso; traços já concluídos nele são pulados.
+    """
+    grouped_traces = traces_data["grouped_traces"]
+    if not grouped_traces:
+        print("Nenhum traço para desenhar.")
+        return
+
+    client = get_client(serial)
+    journal = journal or DrawJournal(path=None)
+
+    def draw_stroke(points):
+        client.write_file(DEVICE_SCRIPT_PATH, build_motionevent_script(points).encode("ascii"))
+        output = client.shell(f"sh {DEVICE_SCRIPT_PATH}").strip()
+        if output:
+            # `input motionevent` is silent on success; anything printed is an error/usage text
+            raise AdbError(f"input motionevent falhou: {output.splitlines()[0]}")
+
+    screen_size = get_screen_size(client)
+    area = find_drawing_area(get_ui_snapshot(), screen_size)
+    transform = fit_to_area(traces_data["raw_bbox_width"], traces_data["raw_bbox_height"], area)
+    total_strokes = sum(len(group["paths"]) for group in grouped_traces)
+
+    print(f"\n-------------------------------------------------")
+    print(f"🖌️ INICIANDO DESENHO VIA ADB (input motionevent):")
+    print(f"  Tela do dispositivo: {screen_size[0]}x{screen_size[1]}")
+    print(f"  Área de desenho: X={area['x']}, Y={area['y']}, W={area['width']}, H={area['height']}")
+    print(f"  Escala: {transform[0]:.2f}")
+    print(f"  Número total de traços: {total_strokes}")
+    print(f"-------------------------------------------------")
+
+    total_events = 0
+    drawing_time = 0.0
+    try:
+        for group_index, color_group in enumerate(grouped_traces):
+            if is_cancelled():
+                break
+            if journal.skip(group_index, len(color_group["paths"]) - 1):
+                continue  # Finished before the run was interrupted
+            palette_color_info = color_group["palette_color"]
+            select_color(palette_color_info["page_index"], palette_color_info["color_index"])
+            journal.color_selected(group_index, palette_color_info["page_index"], palette_color_info["color_index"])
+
+            group_events, group_start = 0, time.perf_counter()
+            group_strokes = []
+            for stroke_index, path in enumerate(color_group["paths"]):
+                if is_cancelled():
+                    break
+                if not path or journal.skip(group_index, stroke_index):
+                    continue
+                points = stroke_to_device_points(path, transform, num_segments)
+                journal.stroke_started(group_index, stroke_index)
+                draw_stroke(points)
+                journal.stroke_finished(len(points))
+                group_strokes.append(points)
+                group_events += len(points) + 1  # MOVEs plus DOWN and UP
+            elapsed = time.perf_counter() - group_start
+            if verify and group_strokes and not is_cancelled():
+                verify_and_redraw(group_strokes, palette_color_info["rgb_value"], draw_stroke, serial)
+            total_events += group_events
+            drawing_time += elapsed
+            if elapsed > 0:
+                print(f"  {palette_color_info['name']}: {group_events} eventos, {group_events / elapsed:.0f} eventos/s")
+        if not is_cancelled():
+            journal.finish()
+    finally:
+        journal.close("ESC" if is_cancelled() else None)
+
+    client.shell(f"rm -f {DEVICE_SCRIPT_PATH}")
+    if drawing_time > 0:
+        print(f"📊 {total_events} eventos em {drawing_time:.1f}s ({total_events / drawing_time:.0f} eventos/s)")
+    print("Desenho interrompido pelo usuário." if is_cancelled() else "Desenho concluído!")
+    print(f"-------------------------------------------------\n")
@@ -1,10 +1,34 @@
+import hashlib
 import subprocess
-import time
+import threading
+import shlex
 import xml.etree.ElementTree as ET
 import os
 
+from .adb_client import AdbError, current_serial, get_client
+from .ui_snapshot import get_snapshot
+
+# Set INSTA_DRAW_NATIVE_ADB=0 to always go through the `adb` executable
+USE_NATIVE_ADB = os.environ.get("INSTA_DRAW_NATIVE_ADB", "1") != "0"
+
+_dump_state = threading.local()  # Digest of the most recent UI dump, per thread (like the device serial)
+
 def run_adb_command(command):
     """Executa um comando ADB e retorna sua saída."""
+    if USE_NATIVE_ADB:
+        try:
+            output = _run_native(command)
+        except AdbError as e:
+            print(f"🚨 Erro ao executar comando ADB: {command}")
+            print(f"Stderr: {e}")
+            return None
+        except OSError:
+            output = None  # adb server not reachable: let the adb executable start it
+        if output is not None:
+            return output.replace("\r\n", "\n").strip()
+    serial = current_serial()
+    if serial and command.startswith("adb ") and not command.startswith("adb -s "):
+        command = f"adb -s {shlex.quote(serial)} {command[4:]}"  # Same device as the native path
     try:
         result = subprocess.run(
             command, shell=True, capture_output=True, text=True, check=True
@@ -15,12 +39,75 @@ def run_adb_command(command):
         print(f"Stderr: {e.stderr}")
         return None
 
-def get_screen_dump():
-    """Faz o dump do layout da UI da tela atual para XML e retorna o conteúdo."""
+def _run_native(command):
+    """
+    Runs `adb [-s serial] shell|exec-out|pull|push|start-server ...` through the adb
+    server socket. Returns None for commands it does not handle.
+    """
+    try:
+        args = shlex.split(command)
+    except ValueError:
+        return None  # e.g. unbalanced quotes: let the shell report it, as with the adb executable
+    if not args or args[0] != "adb":
+        return None
+    serial = None
+    if len(args) > 2 and args[1] == "-s":
+        serial, args = args[2], args[:1] + args[3:]
+    if len(args) < 2:
+        return None
+    client = get_client(serial)
+    action, rest = args[1], args[2:]
+    if action == "shell" and rest:
+        # Like the adb executable with check=True: a failing device command is an error, not output
+        output, status = client.shell_with_status(" ".join(rest))
+        if status != 0:
+            raise AdbError(f"status de saída {status}: {output.strip()}")
+        return output
+    if action == "exec-out" and rest:
+        return client.exec_out(" ".join(rest)).decode("utf-8", errors="replace")
+    if action == "pull" and len(rest) == 2:
+        client.pull(rest[0], rest[1])
+        return ""
+    if action == "push" and len(rest) == 2:
+        client.push(rest[0], rest[1])
+        return ""
+    if action == "start-server" and not rest:
+        client.start_server()
+        return ""
+    return None
+
+def get_screen_dump(return_hash=False):
+    """
+    Faz o dump do layout da UI da tela atual para XML e retorna o conteúdo
+    (com `return_hash=True`, retorna (xml, hash) para detectar telas inalteradas).
+    """
     print("📲 Fazendo dump do layout da UI da tela...")
+    xml_data = stream_screen_dump() if USE_NATIVE_ADB else None
+    if xml_data is None:
+        xml_data = _screen_dump_via_file()
+    digest = dump_hash(xml_data) if xml_data else None
+    _dump_state.digest = digest
+    return (xml_data, digest) if return_hash else xml_data
+
+def last_dump_hash():
+    """Digest of the most recent UI dump taken from the current thread (None if none yet)."""
+    return getattr(_dump_state, "digest", None)
+
+def stream_screen_dump():
+    """Dump via `exec-out` direto para a memória, sem arquivos temporários nem espera fixa."""
+    try:
+        raw = get_client().exec_out("uiautomator dump /dev/tty")
+    except (OSError, AdbError):
+        return None
+    # uiautomator appends "UI hierchary dumped to: /dev/tty" after the document
+    start, end = raw.find(b"<?xml"), raw.rfind(b"</hierarchy>")
+    if start < 0 or end < 0:
+        return None
+    return raw[start : end + len(b"</hierarchy>")].decode("utf-8", errors="replace")
+
+def _screen_dump_via_file():
     dump_command = "adb shell uiautomator dump /sdcard/window_dump.xml"
-    run_adb_command(dump_command)
-    time.sleep(1)
+    run_adb_command(dump_command)  # Returns once the file is written
     pull_command = "adb pull /sdcard/window_dump.xml data/window_dump.xml"
     run_adb_command(pull_command)
     try:
@@ -30,99 +117,107 @@ def get_screen_dump():
         print("🚨 Erro: data/window_dump.xml não encontrado localmente após o pull.")
         return None
 
-def find_button_coordinates(xml_data, resource_id=None, content_desc=None, text=None):
-    """Analisa dados XML da UI para encontrar as coordenadas de um elemento."""
-    if not xml_data:
-        return None
+def dump_hash(xml_data):
+    return hashlib.blake2b(xml_data.encode("utf-8"), digest_size=16).hexdigest()
+
+def get_ui_snapshot():
+    """Dump da tela já indexado (UiSnapshot), para várias buscas sobre a mesma tela."""
+    xml_data = get_screen_dump()
+    return _as_snapshot(xml_data) if xml_data else None
+
+def _as_snapshot(xml_data):
     try:
-        root = ET.fromstring(xml_data)
+        return get_snapshot(xml_data)
     except ET.ParseError as e:
         print(f"🚨 Erro ao analisar XML: {e}")
         return None
-    for node in root.iter("node"):
-        match = True
-        if resource_id is not None and node.get("resource-id") != resource_id:
-            match = False
-        if content_desc is not None and node.get("content-desc") != content_desc:
-            match = False
-        if text is not None and node.get("text") != text:
-            match = False
-        if match:
-            bounds_str = node.get("bounds")
-            if bounds_str:
-                bounds_parts = bounds_str.strip("[]").split("][")
-                start_x, start_y = map(int, bounds_parts[0].split(","))
-                end_x, end_y = map(int, bounds_parts[1].split(","))
-                center_x = (start_x + end_x) // 2
-                center_y = (start_y + end_y) // 2
-                print(
-                    f"✅ Elemento '{content_desc or resource_id or text}' encontrado em ({center_x}, {center_y})"
-                )
-                return center_x, center_y
-    print(f"❌ Elemento '{content_desc or resource_id or text}' não encontrado.")
-    return None
 
-def find_color_button_by_properties(xml_data, content_desc, index):
-    """
-    Encontra as coordenadas de um botão de cor dentro da paleta,
-    usando content-desc e o atributo 'index' do nó.
-    """
+def find_button_coordinates(xml_data, resource_id=None, content_desc=None, text=None):
+    """Analisa dados XML da UI (ou um UiSnapshot) para encontrar as coordenadas de um elemento."""
     if not xml_data:
         return None
-    try:
-        root = ET.fromstring(xml_data)
-    except ET.ParseError as e:
-        print(f"🚨 Erro ao analisar XML: {e}")
+    snapshot = _as_snapshot(xml_data)
+    if snapshot is None:
         return None
+    for node in snapshot.find_all(resource_id=resource_id, content_desc=content_desc, text=text):
+        if node.bounds:
+            center_x, center_y = node.center
+            print(
+                f"✅ Elemento '{content_desc or resource_id or text}' encontrado em ({center_x}, {center_y})"
+            )
+            return center_x, center_y
+    print(f"❌ Elemento '{content_desc or resource_id or text}' não encontrado.")
+    return None
 
+def _color_buttons(snapshot):
+    """Color buttons of the visible palette page ({index: node}), or None if the palette is missing."""
+    if "color_buttons" in snapshot.memo:
+        return snapshot.memo["color_buttons"]
+    buttons = None
     # First, find the parent palette node (doodles_colour_palette_tools)
     palette_parent_resource_id = "com.instagram.android:id/doodles_colour_palette_tools"
-    palette_node = None
-    for node in root.iter("node"):
-        if node.get("resource-id") == palette_parent_resource_id:
-            palette_node = node
-            break
-
-    if not palette_node:
-        print(f"❌ Contêiner da paleta de cores '{palette_parent_resource_id}' não encontrado.")
-        return None
+    palette_node = snapshot.find(resource_id=palette_parent_resource_id)
 
     # Now, find the colour_palette_pager within the palette_node
     colour_palette_pager_node = None
-    for node in palette_node.iter("node"):
-        if node.get("resource-id") == "com.instagram.android:id/colour_palette_pager":
-            colour_palette_pager_node = node
-            break
+    if palette_node is None:
+        print(f"❌ Contêiner da paleta de cores '{palette_parent_resource_id}' não encontrado.")
+    else:
+        for node in snapshot.find_all(resource_id="com.instagram.android:id/colour_palette_pager"):
+            if node.is_descendant_of(palette_node):
+                colour_palette_pager_node = node
+                break
+        if colour_palette_pager_node is None:
+            print("❌ Nó 'colour_palette_pager' não encontrado dentro do contêiner da paleta.")
 
-    if not colour_palette_pager_node:
-        print("❌ Nó 'colour_palette_pager' não encontrado dentro do contêiner da paleta.")
-        return None
+    # Find the specific android.view.View (direct child) that contains the color buttons
+    if colour_palette_pager_node is not None:
+        for node in colour_palette_pager_node.children:
+            if node.get("class") == "android.view.View" and not node.get("resource-id") and not node.get("content-desc"):
+                buttons = {
+                    int(child.get("index")): child
+                    for child in node.children
+                    if child.bounds and child.get("index", "").isdigit()
+                }
+                break
+        else:
+            print("❌ Contêiner de botões de cor (android.view.View) não encontrado.")
 
-    # Find the specific android.view.View that contains the color buttons
-    color_buttons_container = None
-    for node in colour_palette_pager_node.findall("node"): # findall for direct children
-        if node.get("class") == "android.view.View" and not node.get("resource-id") and not node.get("content-desc"):
-            color_buttons_container = node
-            break
-    
-    if not color_buttons_container:
-        print("❌ Contêiner de botões de cor (android.view.View) não encontrado.")
+    snapshot.memo["color_buttons"] = buttons
+    return buttons
+
+def find_color_button_by_properties(xml_data, content_desc, index):
+    """
+    Encontra as coordenadas de um botão de cor dentro da paleta,
+    usando content-desc e o atributo 'index' do nó.
+    """
+    if not xml_data:
         return None
+    snapshot = _as_snapshot(xml_data)
+    if snapshot is None:
+        return None
+    buttons = _color_buttons(snapshot)
+    node = buttons.get(index) if buttons else None
+    if node is not None and node.get("content-desc") == content_desc:
+        center_x, center_y = node.center
+        print(
+            f"✅ Cor '{content_desc}' com índice '{index}' encontrada em ({center_x}, {center_y})"
+        )
+        return center_x, center_y
+    return None
 
-    # Now, iterate through the children of the color_buttons_container to find the specific color button
-    for child_node in color_buttons_container.findall("node"): # findall for direct children
-        if child_node.get("content-desc") == content_desc and child_node.get("index") == str(index):
-            bounds_str = child_node.get("bounds")
-            if bounds_str:
-                bounds_parts = bounds_str.strip("[]").split("][")
-                start_x, start_y = map(int, bounds_parts[0].split(","))
-                end_x, end_y = map(int, bounds_parts[1].split(","))
-                center_x = (start_x + end_x) // 2
-                center_y = (start_y + end_y) // 2
-                print(
-                    f"✅ Cor '{content_desc}' com índice '{index}' encontrada em ({center_x}, {center_y})"
-                )
-                return center_x, center_y
+def find_all_color_buttons(xml_data):
+    """
+    Retorna todos os botões de cor da página visível da paleta:
+    {índice: (content-desc, (x, y))}.
+    """
+    if not xml_data:
+        return {}
+    snapshot = _as_snapshot(xml_data)
+    buttons = _color_buttons(snapshot) if snapshot is not None else None
+    if not buttons:
+        return {}
+    return {index: (node.get("content-desc"), node.center) for index, node in buttons.items()}
 
 def tap_coordinates(x, y):
     """Simula um toque nas coordenadas fornecidas."""
@@ -0,0 +1,77 @@
+import asyncio
+import struct
+import time
+
+from .adb_client import ADB_SERVER_HOST, ADB_SERVER_PORT, SYNC_CHUNK_SIZE, AdbError, current_serial
+
+
+class AsyncAdbClient:
+    """asyncio version of the AdbClient device services (shell, exec, file push) over the adb server socket."""
+
+    def __init__(self, serial=None, host=ADB_SERVER_HOST, port=ADB_SERVER_PORT):
+        self.serial = serial or current_serial()
+        self.host = host
+        self.port = port
+
+    async def shell(self, command):
+        """Runs `command` with the device shell and returns its output (stdout and stderr)."""
+        return (await self.exec_out(command, service="shell")).decode("utf-8", errors="replace")
+
+    async def exec_out(self, command, service="exec"):
+        """Runs `command` on the device and returns its raw stdout bytes."""
+        reader, writer = await self._device_request(f"{service}:{command}")
+        try:
+            return await reader.read()
+        finally:
+            writer.close()
+
+    async def write_file(self, remote_path, data, mode=0o644):
+        """Writes `data` to a device file over the sync protocol."""
+        reader, writer = await self._device_request("sync:")
+        try:
+            header = f"{remote_path},{mode}".encode("utf-8")
+            writer.write(b"SEND" + struct.pack("<I", len(header)) + header)
+            for start in range(0, len(data), SYNC_CHUNK_SIZE):
+                chunk = data[start : start + SYNC_CHUNK_SIZE]
+                writer.write(b"DATA" + struct.pack("<I", len(chunk)) + chunk)
+            writer.write(b"DONE" + struct.pack("<I", int(time.time())))
+            await writer.drain()
+            reply = await self._read_exact(reader, 8)
+            length = struct.unpack("<I", reply[4:])[0]
+            if reply[:4] != b"OKAY":
+                message = await self._read_exact(reader, length) if length else b""
+                raise AdbError(message.decode("utf-8", errors="replace") or f"Falha no envio: {reply[:4]!r}")
+            writer.write(b"QUIT" + struct.pack("<I", 0))
+        finally:
+            writer.close()
+
+    async def _device_request(self, payload):
+        """Opens a connection switched to this client's device and starts a service on it."""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            transport = f"host:transport:{self.serial}" if self.serial else "host:transport-any"
+            await self._request(reader, writer, transport)
+            await self._request(reader, writer, payload)
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+
+    async def _request(self, reader, writer, payload):
+        data = payload.encode("utf-8")
+        writer.write(b"%04x" % len(data) + data)
+        await writer.drain()
+        status = await self._read_exact(reader, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            length = int(await self._read_exact(reader, 4), 16)
+            raise AdbError((await self._read_exact(reader, length)).decode("utf-8", errors="replace"))
+        raise AdbError(f"Resposta inesperada do servidor adb: {status!r}")
+
+    @staticmethod
+    async def _read_exact(reader, size):
+        try:
+            return await reader.readexactly(size)
+        except asyncio.IncompleteReadError:
+            raise AdbError("Conexão com o servidor adb encerrada inesperadamente.") from None
@@ -0,0 +1,270 @@
+import asyncio
+import threading
+import time
+
+from src.automation.adb_automation import select_color
+from src.automation.adb_client import AdbError
+from src.automation.adb_draw import (
+    DEVICE_SCRIPT_PATH,
+    build_motionevent_script,
+    find_drawing_area,
+    fit_to_area,
+    get_screen_size,
+    stroke_to_device_points,
+)
+from src.automation.adb_utils import get_ui_snapshot
+from src.automation.async_adb import AsyncAdbClient
+from src.automation.device_session import DeviceSession, current_session, using_session
+from src.automation.draw_journal import DrawJournal
+from src.automation.stroke_verifier import verify_and_redraw
+
+
+class DrawPlan:
+    """
+    Traces to draw (as saved by main.py): color groups in drawing order over a raw bounding
+    box. `skip(group_index, stroke_index)` leaves out strokes already drawn (see DrawJournal).
+    """
+
+    def __init__(self, traces_data, num_segments=5, skip=lambda group_index, stroke_index: False):
+        self.raw_width = traces_data["raw_bbox_width"]
+        self.raw_height = traces_data["raw_bbox_height"]
+        self.num_segments = num_segments
+        self.groups = []  # (group index in traces_data, color group, [(stroke index, path), ...])
+        for group_index, color_group in enumerate(traces_data["grouped_traces"]):
+            paths = [(i, path) for i, path in enumerate(color_group["paths"]) if path and not skip(group_index, i)]
+            if paths:
+                self.groups.append((group_index, color_group, paths))
+
+    @property
+    def total_strokes(self):
+        return sum(len(paths) for _, _, paths in self.groups)
+
+
+class DrawProgress:
+    """Snapshot passed to progress callbacks after each stroke."""
+
+    def __init__(self, total_groups, total_strokes):
+        self.total_groups = total_groups
+        self.total_strokes = total_strokes
+        self.groups_done = 0
+        self.strokes_done = 0
+        self.events = 0
+        self.color_name = None
+        self.elapsed = 0.0
+
+    @property
+    def fraction(self):
+        return self.strokes_done / self.total_strokes if self.total_strokes else 1.0
+
+
+class PreparedGroup:
+    """A color group ready to send: palette position, device points and motionevent script per stroke."""
+
+    def __init__(self, group_index, palette_color, stroke_indices, strokes, scripts, events):
+        self.group_index = group_index
+        self.palette_color = palette_color
+        self.stroke_indices = stroke_indices
+        self.strokes = strokes
+        self.scripts = scripts
+        self.events = events
+
+
+class AsyncDrawEngine:
+    """
+    Draws a DrawPlan with the device waits overlapped with host work: while one color
+    group is being drawn, the next one is smoothed and mapped to device pixels on a worker
+    thread. Everything that touches the device (color selection, strokes, verification)
+    runs one step at a time; select_color caches a whole palette page on its first dump.
+    """
+
+    def __init__(self, serial=None, session=None, on_progress=None, verify=True):
+        self.session = session or DeviceSession(serial)
+        self.client = AsyncAdbClient(self.session.serial)
+        self.on_progress = on_progress
+        self.verify = verify
+
+    async def draw(self, plan, is_cancelled=lambda: False, journal=None):
+        """Draws `plan` and returns its final DrawProgress (partial if cancelled)."""
+        journal = journal or DrawJournal(path=None)
+        progress = DrawProgress(len(plan.groups), plan.total_strokes)
+        if not plan.groups:
+            print("Nenhum traço para desenhar.")
+            journal.finish()
+            journal.close()
+            return progress
+
+        screen_size, snapshot = await asyncio.gather(
+            self._in_session(get_screen_size, self.session.client),
+            self._in_session(get_ui_snapshot),
+        )
+        area = find_drawing_area(snapshot, screen_size)
+        transform = fit_to_area(plan.raw_width, plan.raw_height, area)
+
+        print(f"\n-------------------------------------------------")
+        print(f"🖌️ INICIANDO DESENHO VIA ADB (motor assíncrono):")
+        print(f"  Tela do dispositivo: {screen_size[0]}x{screen_size[1]}")
+        print(f"  Área de desenho: X={area['x']}, Y={area['y']}, W={area['width']}, H={area['height']}")
+        print(f"  Número total de traços: {progress.total_strokes}")
+        print(f"-------------------------------------------------")
+
+        start = time.perf_counter()
+        next_group = asyncio.create_task(self._prepare(plan.groups[0], transform, plan.num_segments))
+        try:
+            for position in range(len(plan.groups)):
+                group = await next_group
+                next_group = None
+                if is_cancelled():
+                    break
+                upcoming = plan.groups[position + 1] if position + 1 < len(plan.groups) else None
+                if upcoming is not None:
+                    next_group = asyncio.create_task(self._prepare(upcoming, transform, plan.num_segments))
+
+                color = group.palette_color
+                await self._in_session(select_color, color["page_index"], color["color_index"])
+                journal.color_selected(group.group_index, color["page_index"], color["color_index"])
+                progress.color_name = color["name"]
+                await self._draw_group(group, progress, is_cancelled, start, journal)
+                if self.verify and group.strokes and not is_cancelled():
+                    await self._verify_group(group)
+                progress.groups_done += 1
+            if not is_cancelled():
+                journal.finish()
+        finally:
+            journal.close("ESC" if is_cancelled() else None)
+            if next_group is not None:
+                next_group.cancel()
+            try:
+                await self.client.shell(f"rm -f {DEVICE_SCRIPT_PATH}")
+            except (AdbError, OSError):
+                pass
+
+        if progress.elapsed > 0:
+            print(f"📊 {progress.events} eventos em {progress.elapsed:.1f}s ({progress.events / progress.elapsed:.0f} eventos/s)")
+        print("Desenho interrompido pelo usuário." if is_cancelled() else "Desenho concluído!")
+        print(f"-------------------------------------------------\n")
+        return progress
+
+    async def _draw_group(self, group, progress, is_cancelled, start, journal):
+        for stroke_index, script, events in zip(group.stroke_indices, group.scripts, group.events):
+            if is_cancelled():
+                return
+            journal.stroke_started(group.group_index, stroke_index)
+            await self._send_script(script)
+            journal.stroke_finished(events - 1)
+            progress.strokes_done += 1
+            progress.events += events
+            progress.elapsed = time.perf_counter() - start
+            if self.on_progress is not None:
+                self.on_progress(progress)
+
+    async def _send_script(self, script):
+        await self.client.write_file(DEVICE_SCRIPT_PATH, script)
+        output = (await self.client.shell(f"sh {DEVICE_SCRIPT_PATH}")).strip()
+        if output:
+            # `input motionevent` is silent on success; anything printed is an error/usage text
+            raise AdbError(f"input motionevent falhou: {output.splitlines()[0]}")
+
+    async def _verify_group(self, group):
+        """Screenshot check of the group just drawn; missed strokes are resent from the loop."""
+        loop = asyncio.get_running_loop()
+
+        def redraw(points):
+            script = build_motionevent_script(points).encode("ascii")
+            asyncio.run_coroutine_threadsafe(self._send_script(script), loop).result()
+
+        rgb = group.palette_color["rgb_value"]
+        await self._in_session(verify_and_redraw, group.strokes, rgb, redraw, self.session.serial)
+
+    async def _prepare(self, plan_group, transform, num_segments):
+        return await asyncio.to_thread(_prepare_group, *plan_group, transform, num_segments)
+
+    async def _in_session(self, func, *args):
+        """Runs a blocking helper on a worker thread bound to this engine's device session."""
+        return await asyncio.to_thread(self._call_in_session, func, *args)
+
+    def _call_in_session(self, func, *args):
+        with using_session(self.session):
+            return func(*args)
+
+
+def _prepare_group(group_index, color_group, paths, transform, num_segments):
+    strokes, scripts, events = [], [], []
+    for _, path in paths:
+        points = stroke_to_device_points(path, transform, num_segments)
+        strokes.append(points)
+        scripts.append(build_motionevent_script(points).encode("ascii"))
+        events.append(len(points) + 1)  # MOVEs plus DOWN and UP
+    stroke_indices = [stroke_index for stroke_index, _ in paths]
+    return PreparedGroup(group_index, color_group["palette_color"], stroke_indices, strokes, scripts, events)
+
+
+class BackgroundDraw:
+    """
+    Runs an AsyncDrawEngine on its own event loop thread so a Tk app stays responsive
+    (main.py's "draw on the phone" mode). Callbacks go through `schedule` (e.g.
+    `lambda callback: root.after(0, callback)`) so they run on the UI thread; `on_done`
+    is always called, with the error if the run failed. `before_draw` (e.g.
+    run_adb_automation) runs first on the same thread and device session; a falsy result
+    ends the run with an error.
+    """
+
+    def __init__(self, plan, serial=None, on_progress=None, on_done=None, schedule=None, before_draw=None):
+        self.plan = plan
+        self.serial = serial
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.before_draw = before_draw
+        self.schedule = schedule or (lambda callback: callback())
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="insta-draw-engine", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _run(self):
+        def report(progress):
+            if self.on_progress is not None:
+                self.schedule(lambda: self.on_progress(progress))
+
+        result, error = None, None
+        try:
+            engine = AsyncDrawEngine(self.serial, on_progress=report)
+            if self.before_draw is not None:
+                with using_session(engine.session):
+                    if not self.before_draw():
+                        raise AdbError("A preparação do dispositivo falhou.")
+            result = asyncio.run(engine.draw(self.plan, is_cancelled=self.cancelled.is_set))
+        except Exception as e:  # Parsing, cv2 or device errors alike: the UI must always hear back
+            error = e
+            print(f"🚨 Erro no desenho: {type(e).__name__}: {e}")
+        finally:
+            if self.on_done is not None:
+                self.schedule(lambda: self.on_done(result, error))
+
+
+def draw_strokes_with_async_engine(
+    traces_data, is_cancelled=lambda: False, num_segments=5, serial=None, verify=True, journal=None
+):
+    """
+    Desenha os traços com o motor assíncrono: igual ao backend adb (`input motionevent`),
+    mas preparando o próximo grupo de cores enquanto o grupo atual é desenhado.
+
+    Args:
+        traces_data (dict): Dicionário com 'raw_bbox_width', 'raw_bbox_height' e 'grouped_traces'.
+        is_cancelled (callable): Retorna True quando o desenho deve parar (ex: ESC).
+        num_segments (int): Segmentos da spline Catmull-Rom entre pontos.
+        serial (str): Dispositivo a usar (padrão: ANDROID_SERIAL ou o único conectado).
+        verify (bool): Confere cada cor na tela ao terminar e redesenha só os traços que faltaram.
+        journal (DrawJournal): Diário do progresso; traços já concluídos nele são pulados.
+    """
+    # Keep the palette state of the calling thread's session (e.g. a DrawingFarm worker)
+    session = current_session()
+    if serial is not None and session.serial != serial:
+        session = DeviceSession(serial)
+    journal = journal or DrawJournal(path=None)
+    plan = DrawPlan(traces_data, num_segments, skip=journal.skip)
+    return asyncio.run(AsyncDrawEngine(session=session, verify=verify).draw(plan, is_cancelled, journal))
@@ -0,0 +1,145 @@
+import argparse
+import queue
+import threading
+import time
+
+from src.automation.adb_automation import run_adb_automation
+from src.automation.adb_client import AdbClient, AdbError
+from src.automation.device_session import DeviceSession, using_session
+from src.utils.file_loader import load_traces_data
+
+MAX_ATTEMPTS = 2  # Tries (on any device) before a job is reported as failed
+
+
+def _draw_function(backend):
+    # Imported lazily: each backend pulls in its own device helpers
+    if backend == "adb":
+        from src.automation.adb_draw import draw_strokes_with_adb
+
+        return draw_strokes_with_adb
+    if backend == "evdev":
+        from src.automation.evdev_draw import draw_strokes_with_evdev
+
+        return draw_strokes_with_evdev
+    if backend == "scrcpy":
+        from src.automation.scrcpy_draw import draw_strokes_with_scrcpy
+
+        return draw_strokes_with_scrcpy
+    if backend == "async":
+        from src.automation.async_engine import draw_strokes_with_async_engine
+
+        return draw_strokes_with_async_engine
+    raise ValueError(f"Backend desconhecido para a fazenda de dispositivos: {backend}")
+
+
+class DevicePool:
+    """Serials of the devices attached to the adb server and ready to use."""
+
+    def __init__(self, client=None):
+        self.client = client or AdbClient()
+
+    def discover(self):
+        try:
+            devices = self.client.devices()
+        except Exception as e:  # Unreachable server, or a listing that does not parse
+            print(f"🚨 Não foi possível listar os dispositivos ADB: {e}")
+            return []
+        for serial, state in devices:
+            if state != "device":
+                print(f"⚠️ Dispositivo {serial} ignorado (estado: {state}).")
+        return [serial for serial, state in devices if state == "device"]
+
+
+class DrawJob:
+    """One drawing to make: its traces (as saved by main.py) and a name for the report."""
+
+    def __init__(self, name, traces_data):
+        self.name = name
+        self.traces_data = traces_data
+        self.serial = None  # Device that drew it
+        self.seconds = None
+        self.error = None
+        self.attempts = 0
+
+
+class DrawingFarm:
+    """
+    Draws several jobs on several devices at once: one worker thread per device, each
+    with its own DeviceSession (connection and palette state), taking the next job from
+    a shared queue as soon as its device is free.
+    """
+
+    def __init__(self, serials, backend="adb"):
+        self.sessions = [DeviceSession(serial) for serial in serials]
+        self.draw = _draw_function(backend)
+        self.cancelled = threading.Event()
+
+    def run(self, jobs):
+        pending = queue.Queue()
+        for job in jobs:
+            pending.put(job)
+        start = time.perf_counter()
+        workers = [
+            threading.Thread(target=self._worker, args=(session, pending), name=f"farm-{session.serial}", daemon=True)
+            for session in self.sessions
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        while not pending.empty():  # Re-queued after every device that could take it had stopped
+            job = pending.get_nowait()
+            job.error = job.error or "nenhum dispositivo disponível"
+
+        elapsed = time.perf_counter() - start
+        done = [job for job in jobs if job.error is None and job.seconds is not None]
+        print(f"\n📊 {len(done)}/{len(jobs)} desenhos em {elapsed:.1f}s com {len(self.sessions)} dispositivo(s)")
+        for job in jobs:
+            status = f"{job.seconds:.1f}s" if job.error is None and job.seconds is not None else f"falhou: {job.error}"
+            print(f"  {job.name} @ {job.serial or '-'}: {status}")
+        return jobs
+
+    def _worker(self, session, pending):
+        with using_session(session):
+            while not self.cancelled.is_set():
+                try:
+                    job = pending.get_nowait()
+                except queue.Empty:
+                    return
+                job.serial = session.serial
+                start = time.perf_counter()
+                try:
+                    # A fresh draw screen starts on the first palette page and color
+                    session.current_page, session.current_color_index = 1, 0
+                    if not run_adb_automation():
+                        raise AdbError("tela de desenho não pôde ser aberta")
+                    self.draw(job.traces_data, is_cancelled=self.cancelled.is_set, serial=session.serial)
+                    job.seconds = time.perf_counter() - start
+                    job.error = None
+                except Exception as e:  # Whatever failed, the job goes back to the queue or into the report
+                    job.attempts += 1
+                    job.error = f"{type(e).__name__}: {e}"
+                    print(f"🚨 [{session.serial}] Falha em {job.name} (tentativa {job.attempts}): {job.error}")
+                    if job.attempts < MAX_ATTEMPTS and not self.cancelled.is_set():
+                        pending.put(job)
+                        print(f"🔁 {job.name} devolvido à fila.")
+                    if isinstance(e, (AdbError, OSError)):
+                        # The device itself is in trouble: leave the rest of the queue to the others
+                        print(f"⚠️ [{session.serial}] Dispositivo retirado da fazenda.")
+                        return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Desenha vários arquivos de traços em vários dispositivos ao mesmo tempo.")
+    parser.add_argument("traces", nargs="+", help="Arquivos de traços (ex: data/traces.json)")
+    parser.add_argument("--backend", choices=("adb", "evdev", "scrcpy", "async"), default="adb")
+    parser.add_argument("--serial", action="append", help="Dispositivo a usar (repetível; padrão: todos os conectados)")
+    args = parser.parse_args()
+
+    serials = args.serial or DevicePool().discover()
+    jobs = [DrawJob(path, data) for path in args.traces if (data := load_traces_data(path))]
+    if not serials:
+        print("❌ Nenhum dispositivo ADB pronto.")
+    elif jobs:
+        print(f"🚀 {len(jobs)} desenho(s) em {len(serials)} dispositivo(s): {', '.join(serials)}")
+        DrawingFarm(serials, args.backend).run(jobs)
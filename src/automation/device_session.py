@@ -0,0 +1,51 @@
+import threading
+from contextlib import contextmanager
+
+from .adb_client import current_serial, get_client, set_thread_serial
+from .palette_cache import PaletteCoordinateCache
+
+_local = threading.local()
+_default_sessions = {}
+_default_lock = threading.Lock()
+
+
+class DeviceSession:
+    """One device being automated: its adb connection and where its palette currently is."""
+
+    def __init__(self, serial=None):
+        self.serial = serial  # None: the implicit device (ANDROID_SERIAL or the only one attached)
+        self.current_page = 1
+        self.current_color_index = 0
+        self.palette_cache = PaletteCoordinateCache(serial=serial)
+
+    @property
+    def client(self):
+        return get_client(self.serial)
+
+    def __repr__(self):
+        return f"DeviceSession({self.serial or 'padrão'})"
+
+
+def current_session():
+    """Session of the current thread (see using_session), or the shared one of its default device."""
+    session = getattr(_local, "session", None)
+    if session is not None:
+        return session
+    serial = current_serial()
+    with _default_lock:
+        if serial not in _default_sessions:
+            _default_sessions[serial] = DeviceSession(serial)
+        return _default_sessions[serial]
+
+
+@contextmanager
+def using_session(session):
+    """Routes adb calls and palette state of the current thread to `session`'s device."""
+    previous = getattr(_local, "session", None)
+    _local.session = session
+    set_thread_serial(session.serial)
+    try:
+        yield session
+    finally:
+        _local.session = previous
+        set_thread_serial(previous.serial if previous is not None else None)
@@ -1,3 +1,5 @@
+import argparse
+import os
 import time
 
 from pynput import keyboard
@@ -6,6 +8,10 @@ from src.utils.curve_utils import catmull_rom_spline
 from src.utils.file_loader import load_drawing_area_coords, load_traces_data
 from src.utils.mouse_utils import disable_mouse, enable_mouse
 from src.automation.adb_automation import select_color # Import select_color
+from src.automation.device_session import current_session
+from src.automation.draw_journal import DrawJournal, restore_palette
+from src.automation.frame_timeline import FrameTimelineCollector
+from src.automation.throttle import AdaptiveThrottle
 
 try:
     import pyautogui
@@ -62,6 +68,12 @@ DRAWING_SPEED = {
 # Default speed setting
 CURRENT_SPEED = "medium"  # Changed default speed to medium for better app stability
 
+# Drawing backends: desktop mouse over the mirrored screen, touch events injected through adb,
+# raw touchscreen events written to /dev/input (rooted devices), scrcpy's control socket, or
+# the adb backend driven by the asyncio engine (next color prepared while the current one draws)
+DRAW_BACKENDS = ("pyautogui", "adb", "evdev", "scrcpy", "async")
+DEFAULT_BACKEND = os.environ.get("INSTA_DRAW_BACKEND", "pyautogui")
+
 
 def draw_strokes_with_pyautogui(
     traces_data,
@@ -69,6 +81,9 @@ def draw_strokes_with_pyautogui(
     speed_level=CURRENT_SPEED,
     strokes_per_chunk=50,
     chunk_break_time=3,
+    journal=None,
+    adaptive=False,
+    frame_stats=None,
 ):
     """
     Desenha os traços na tela do desktop usando pyautogui, escalando-os para a área definida,
@@ -80,6 +95,11 @@ def draw_strokes_with_pyautogui(
         speed_level (str): Nível de velocidade do desenho ('slow', 'medium', 'fast', 'very_fast').
         strokes_per_chunk (int): Número de traços a desenhar antes de uma pausa longa.
         chunk_break_time (int): Duração da pausa em segundos entre os chunks de traços.
+        journal (DrawJournal): Diário do progresso; traços já concluídos nele são pulados.
+        adaptive (bool): Ajusta pausa, duração dos movimentos e pausas longas pelas estatísticas
+            de quadros do app no dispositivo, no lugar dos chunks fixos.
+        frame_stats (callable): Fonte das estatísticas de quadros do ritmo adaptativo (ex:
+            FrameTimelineCollector.frame_stats_reader()), para não zerar os contadores de outra.
     """
     if not PYAUTOGUI_AVAILABLE:
         print("PyAutoGUI não está disponível. Não é possível desenhar.")
@@ -113,9 +133,12 @@ def draw_strokes_with_pyautogui(
     print(f"  Tamanho original dos traços: {raw_bbox_width}x{raw_bbox_height}")
     print(f"  Número total de traços: {total_strokes}") # Updated total strokes
     print(f"  Velocidade de desenho: {speed_level}")
-    print(
-        f"  Pausas a cada {strokes_per_chunk} traços por {chunk_break_time} segundos."
-    )
+    if adaptive:
+        print(f"  Pausas ajustadas pelas estatísticas de quadros do dispositivo.")
+    else:
+        print(
+            f"  Pausas a cada {strokes_per_chunk} traços por {chunk_break_time} segundos."
+        )
     print(f"-------------------------------------------------")
 
     # --- Scaling Logic: Maintain aspect ratio and center ---
@@ -143,8 +166,7 @@ def draw_strokes_with_pyautogui(
         f"  Offsets de centralização: X={center_offset_x:.0f}, Y={center_offset_y:.0f}"
     )
 
-    # Set pyautogui pause based on chosen speed
-    pyautogui.PAUSE = DRAWING_SPEED[speed_level]["pause"]
+    base_pause = DRAWING_SPEED[speed_level]["pause"]
     move_duration = DRAWING_SPEED[speed_level]["duration"]
 
     # IMPORTANT: User must ensure the mirrored Android screen is active and correctly positioned
@@ -158,32 +180,53 @@ def draw_strokes_with_pyautogui(
     print("Pressione ESC no terminal para parar o script a qualquer momento.")
     time.sleep(2)  # Give a short moment for the user to read the warning
 
+    throttle = AdaptiveThrottle(base_pause, move_duration, sample=frame_stats) if adaptive else None
+    if throttle is not None and not throttle.available:
+        # Slow phones still need the fixed breaks when the frame stats cannot guide the pace
+        print(f"  Usando pausas fixas a cada {strokes_per_chunk} traços por {chunk_break_time} segundos.")
+        throttle = None
+
+    journal = journal or DrawJournal(path=None)
+    previous_pause = pyautogui.PAUSE  # Global to pyautogui: put back for whoever uses it next
+    pyautogui.PAUSE = base_pause  # Pause after each pyautogui call, from the chosen speed
     disable_mouse()  # Desabilita o mouse antes de começar a desenhar
     try:
         strokes_drawn_in_chunk = 0
-        for color_group in grouped_traces: # Iterate through color groups
+        for group_index, color_group in enumerate(grouped_traces): # Iterate through color groups
             if cancel_drawing:
                 print("Desenho cancelado pelo usuário.")
                 break
+            if journal.skip(group_index, len(color_group["paths"]) - 1):
+                continue  # Finished before the run was interrupted
 
             # Select the color for the current group
             palette_color_info = color_group["palette_color"]
             target_page = palette_color_info["page_index"]
             target_index = palette_color_info["color_index"]
             select_color(target_page, target_index)
+            journal.color_selected(group_index, target_page, target_index)
 
-            for path in color_group["paths"]: # Iterate through paths within the current color group
+            for stroke_index, path in enumerate(color_group["paths"]): # Iterate through paths within the current color group
                 if cancel_drawing:
                     print("Desenho cancelado pelo usuário.")
                     break
+                if journal.skip(group_index, stroke_index):
+                    continue
 
-                # Introduce a break after a certain number of strokes
-                if strokes_per_chunk > 0 and strokes_drawn_in_chunk >= strokes_per_chunk:
+                # Introduce a break when the device falls behind, or after a certain number of strokes
+                if throttle is not None:
+                    break_time = throttle.next_stroke()
+                    pyautogui.PAUSE, move_duration = throttle.pause, throttle.move_duration
+                elif strokes_per_chunk > 0 and strokes_drawn_in_chunk >= strokes_per_chunk:
+                    break_time = chunk_break_time
+                else:
+                    break_time = 0
+                if break_time:
                     pyautogui.mouseUp()  # Ensure mouse is up before the break
                     print(
-                        f"Pausa de {chunk_break_time} segundos para estabilização do aplicativo..."
+                        f"Pausa de {break_time:.1f} segundos para estabilização do aplicativo..."
                     )
-                    time.sleep(chunk_break_time)
+                    time.sleep(break_time)
                     strokes_drawn_in_chunk = 0  # Reset counter
                     if cancel_drawing:  # Check cancellation again after long break
                         print("Desenho cancelado pelo usuário durante a pausa.")
@@ -195,6 +238,7 @@ def draw_strokes_with_pyautogui(
 
                 if not path:
                     continue
+                journal.stroke_started(group_index, stroke_index)
 
                 # Handle isolated points
                 if len(path) == 1:
@@ -204,6 +248,7 @@ def draw_strokes_with_pyautogui(
                     pyautogui.moveTo(desktop_x, desktop_y, duration=move_duration)
                     pyautogui.click()  # Simulate a small dot
                     time.sleep(0.05)  # Small delay after a click
+                    journal.stroke_finished(1)
                     strokes_drawn_in_chunk += 1
                     continue
 
@@ -212,9 +257,12 @@ def draw_strokes_with_pyautogui(
                 interpolated_path = catmull_rom_spline(
                     path, num_segments=5
                 )  # num_segments reduced to 5 for lower event load
+                # A resumed stroke continues from the point the interrupted run let go of it
+                first_point = min(journal.first_point(group_index, stroke_index), len(interpolated_path) - 1)
+                journal.point = first_point
 
                 # Map the first point to desktop coordinates
-                first_point_norm_x, first_point_norm_y = interpolated_path[0]
+                first_point_norm_x, first_point_norm_y = interpolated_path[first_point]
                 desktop_x = int(
                     overlay_x + center_offset_x + (first_point_norm_x * final_scale)
                 )
@@ -227,7 +275,7 @@ def draw_strokes_with_pyautogui(
                 pyautogui.mouseDown()
 
                 # Drag to all subsequent points
-                for j in range(1, len(interpolated_path)):
+                for j in range(first_point + 1, len(interpolated_path)):
                     if cancel_drawing:
                         break  # Break from inner loop if cancelled
                     current_point_norm_x, current_point_norm_y = interpolated_path[j]
@@ -242,14 +290,22 @@ def draw_strokes_with_pyautogui(
                     pyautogui.dragTo(
                         desktop_x, desktop_y, duration=move_duration
                     )  # duration changed to move_duration
+                    journal.point = j
 
                 pyautogui.mouseUp()
+                if cancel_drawing:
+                    break  # Cut short: not journaled as finished, so a resume redraws it
+                journal.stroke_finished(len(interpolated_path))
                 time.sleep(
                     0.1
                 )  # Small pause between traces to allow application to register (increased from 0.05)
                 strokes_drawn_in_chunk += 1  # Increment after successful stroke
+        if not cancel_drawing:
+            journal.finish()
     finally:
+        pyautogui.PAUSE = previous_pause
         enable_mouse()  # Garante que o mouse seja reabilitado no final
+        journal.close("ESC" if cancel_drawing else None)
 
     if not cancel_drawing:
         print("Desenho concluído!")
@@ -262,16 +318,60 @@ def draw_strokes_with_pyautogui(
 
 
 if __name__ == "__main__":
-    if not PYAUTOGUI_AVAILABLE:
+    parser = argparse.ArgumentParser(description="Desenha data/traces.json no dispositivo.")
+    parser.add_argument("--backend", choices=DRAW_BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--events-per-second", type=int, default=240, help="Taxa de eventos do backend scrcpy")
+    parser.add_argument(
+        "--no-verify", dest="verify", action="store_false", help="Não conferir os traços na tela nos backends de dispositivo"
+    )
+    parser.add_argument(
+        "--fixed-breaks",
+        dest="adaptive",
+        action="store_false",
+        help="Usa pausas fixas a cada 70 traços em vez do ritmo adaptativo (backend pyautogui)",
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="Continua o último desenho interrompido a partir do último traço concluído"
+    )
+    parser.add_argument(
+        "--frame-timeline",
+        action="store_true",
+        help="Grava as estatísticas de quadros do app por traço em data/frame_timeline.json",
+    )
+    args = parser.parse_args()
+
+    if args.backend == "pyautogui" and not PYAUTOGUI_AVAILABLE:
         exit()
 
     traces_file = "data/traces.json"
     drawing_area_coords_file = "data/drawing_area_coords.json"
 
-    drawing_area = load_drawing_area_coords(drawing_area_coords_file)
+    # The device backends find the drawing area on the device itself
+    drawing_area = load_drawing_area_coords(drawing_area_coords_file) if args.backend == "pyautogui" else {}
     traces_data = load_traces_data(traces_file)
 
-    if drawing_area and traces_data:
+    journal = DrawJournal()
+    if traces_data:
+        try:
+            journal.begin(traces_data, resume=args.resume)
+        except ValueError as e:
+            print(f"🚨 {e}")
+            traces_data = None
+    if traces_data and args.resume:
+        if journal.finished:
+            print("✅ Este desenho já foi concluído; nada a retomar.")
+            traces_data = None
+        else:
+            group, stroke = journal.resume_at
+            print(f"↩️ Retomando a partir do grupo {group + 1}, traço {stroke + 1}.")
+            restore_palette(current_session(), journal)
+
+    if drawing_area is not None and traces_data:
+        collector = None
+        if args.frame_timeline:
+            collector = FrameTimelineCollector().start()
+            journal.observers.append(collector)
+
         # Start keyboard listener for ESC key
         listener = None
         if PYNPUT_AVAILABLE:
@@ -284,23 +384,58 @@ if __name__ == "__main__":
             )
 
         try:
-            # You can change the speed_level here: 'slow', 'medium', 'fast', 'very_fast'
-            # 'medium' is a good balance for most applications. If drawings are still
-            # incomplete or "cancelled", try 'slow'.
-            # You can also adjust strokes_per_chunk and chunk_break_time here for stability
-            draw_strokes_with_pyautogui(
-                traces_data,
-                drawing_area,
-                speed_level="medium",
-                strokes_per_chunk=70,
-                chunk_break_time=3,
-            )
+            if args.backend == "adb":
+                from src.automation.adb_draw import draw_strokes_with_adb
+
+                draw_strokes_with_adb(
+                    traces_data, is_cancelled=lambda: cancel_drawing, verify=args.verify, journal=journal
+                )
+            elif args.backend == "evdev":
+                from src.automation.evdev_draw import draw_strokes_with_evdev
+
+                draw_strokes_with_evdev(
+                    traces_data, is_cancelled=lambda: cancel_drawing, verify=args.verify, journal=journal
+                )
+            elif args.backend == "async":
+                from src.automation.async_engine import draw_strokes_with_async_engine
+
+                draw_strokes_with_async_engine(
+                    traces_data, is_cancelled=lambda: cancel_drawing, verify=args.verify, journal=journal
+                )
+            elif args.backend == "scrcpy":
+                from src.automation.scrcpy_draw import draw_strokes_with_scrcpy
+
+                draw_strokes_with_scrcpy(
+                    traces_data,
+                    is_cancelled=lambda: cancel_drawing,
+                    events_per_second=args.events_per_second,
+                    verify=args.verify,
+                    journal=journal,
+                )
+            else:
+                # You can change the speed_level here: 'slow', 'medium', 'fast', 'very_fast'
+                # 'medium' is a good balance for most applications. If drawings are still
+                # incomplete or "cancelled", try 'slow'.
+                # You can also adjust strokes_per_chunk and chunk_break_time here for stability
+                draw_strokes_with_pyautogui(
+                    traces_data,
+                    drawing_area,
+                    speed_level="medium",
+                    strokes_per_chunk=70,
+                    chunk_break_time=3,
+                    journal=journal,
+                    adaptive=args.adaptive,
+                    # Only one sampler may reset the gfxinfo counters: the throttle reads the timeline's
+                    frame_stats=collector.frame_stats_reader() if collector is not None else None,
+                )
         finally:
             if listener:
                 listener.stop()
                 listener.join()  # Ensure the listener thread is properly shut down
             enable_mouse()  # Certifique-se de que o mouse seja reativado
+            if collector is not None:
+                collector.stop()
     else:
         print(
-            "Não foi possível carregar os dados necessários para o desenho no desktop."
+            "Não foi possível carregar os dados necessários para o desenho."
         )
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import time
+
+from src.automation.adb_automation import sync_palette_page
+from src.automation.device_session import using_session
+
+JOURNAL_PATH = "data/draw_journal.jsonl"
+FSYNC_EVERY = 20  # Records written between two fsyncs (each one is still flushed to the OS)
+FSYNC_INTERVAL_S = 1.0  # ... or this long since the last fsync, whichever comes first
+
+
+def plan_digest(traces_data):
+    """Identifies a drawing, so a journal is never resumed with other traces."""
+    encoded = json.dumps(traces_data["grouped_traces"], sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def read_journal(path=JOURNAL_PATH):
+    """Journal records in order; a last line cut by a crash is ignored."""
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return records
+
+
+class DrawJournal:
+    """
+    Append-only log of a drawing run (colors selected, strokes finished, where it stopped),
+    so an interrupted run can continue after the last finished stroke instead of starting
+    over. With path=None nothing is written (executors always get a journal).
+    """
+
+    def __init__(self, path=JOURNAL_PATH, fsync_every=FSYNC_EVERY, fsync_interval=FSYNC_INTERVAL_S):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.resume_at = (0, 0)  # (group, stroke) of the first stroke still to draw
+        self.resume_point = 0  # Points of that stroke drawn before the run stopped (see first_point)
+        self.resume_palette = None  # (page, color index) selected when the run stopped
+        self.finished = False
+        self.point = 0  # Points of the current stroke already sent (updated by the executor)
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._stroke = None  # (group, stroke) started and not yet finished
+        self.observers = []  # Also told about colors and strokes (e.g. FrameTimelineCollector)
+
+    def begin(self, traces_data, resume=False):
+        """
+        Opens the journal for `traces_data`. With resume=True, continues the previous run
+        of the same drawing (see resume_at / resume_palette); otherwise starts a new one,
+        first moving an unfinished previous journal aside (to `<path>.prev`) so it can
+        still be resumed.
+        """
+        if self.path is None:
+            return self
+        digest = plan_digest(traces_data)
+        if resume:
+            self._load(digest)
+            if self.finished:
+                return self  # Nothing left to draw or to journal
+        else:
+            self._rotate_unfinished()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if resume:
+            self._truncate_cut_line()
+        self._file = open(self.path, "a" if resume else "w")
+        if resume:
+            group, stroke = self.resume_at
+            self._write({"event": "resume", "group": group, "stroke": stroke, "point": self.resume_point}, sync=True)
+        else:
+            self._write({"event": "start", "plan": digest, "groups": len(traces_data["grouped_traces"])}, sync=True)
+        return self
+
+    def _load(self, digest):
+        records = read_journal(self.path)
+        start = max((i for i, r in enumerate(records) if r["event"] == "start"), default=None)
+        if start is None or records[start]["plan"] != digest:
+            raise ValueError("O diário de desenho não corresponde a estes traços; não é possível retomar.")
+        for record in records[start + 1 :]:
+            if record["event"] == "stroke":
+                self.resume_at = (record["group"], record["stroke"] + 1)
+                self.resume_point = 0
+            elif record["event"] == "stop" and "group" in record:
+                stopped_at = (record["group"], record["stroke"])
+                if stopped_at >= self.resume_at:  # Strokes in between were empty
+                    self.resume_at, self.resume_point = stopped_at, record["point"]
+            elif record["event"] == "color":
+                self.resume_palette = (record["page"], record["index"])
+            elif record["event"] == "done":
+                self.finished = True
+
+    def _truncate_cut_line(self):
+        """Drops a last line cut by a crash, so the records appended after it can be read back."""
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def _rotate_unfinished(self):
+        records = read_journal(self.path)
+        start = max((i for i, r in enumerate(records) if r["event"] == "start"), default=None)
+        if start is None or any(r["event"] == "done" for r in records[start + 1 :]):
+            return
+        os.replace(self.path, self.path + ".prev")
+        print(f"💾 Diário de um desenho não concluído guardado em {self.path}.prev")
+
+    def skip(self, group_index, stroke_index):
+        """True if this stroke was finished by the run being resumed."""
+        return (group_index, stroke_index) < self.resume_at
+
+    def first_point(self, group_index, stroke_index):
+        """Index of the first point to draw of this stroke: where the resumed run let go of it, else 0."""
+        return self.resume_point if (group_index, stroke_index) == self.resume_at else 0
+
+    def color_selected(self, group_index, page, color_index):
+        self._write({"event": "color", "group": group_index, "page": page, "index": color_index}, sync=True)
+        for observer in self.observers:
+            observer.color_selected(group_index, page, color_index)
+
+    def stroke_started(self, group_index, stroke_index):
+        self._stroke = (group_index, stroke_index)
+        self.point = 0
+        for observer in self.observers:
+            observer.stroke_started(group_index, stroke_index)
+
+    def stroke_finished(self, points):
+        group, stroke = self._stroke
+        self._stroke = None
+        self._write({"event": "stroke", "group": group, "stroke": stroke, "points": points})
+        for observer in self.observers:
+            observer.stroke_finished(group, stroke, points)
+
+    def finish(self):
+        self.finished = True
+        self._write({"event": "done"}, sync=True)
+
+    def close(self, reason=None):
+        """Records where an unfinished run stopped (stroke and point) and closes the file."""
+        if self._file is None:
+            return
+        if not self.finished:
+            record = {"event": "stop", "reason": reason or "interrompido"}
+            if self._stroke is not None:
+                record.update(group=self._stroke[0], stroke=self._stroke[1], point=self.point)
+            self._write(record, sync=True)
+        self._file.close()
+        self._file = None
+
+    def _write(self, record, sync=False):
+        if self._file is None:
+            return
+        record["time"] = round(time.time(), 3)
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        now = time.monotonic()
+        if sync or self._unsynced >= self.fsync_every or now - self._last_sync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._last_sync = now
+
+
+def restore_palette(session, journal):
+    """
+    Puts the session's palette state in line with the device before a resumed run: the
+    page is read from the screen rather than taken from the journal, and the color index
+    is forgotten so the first group taps its color again even if it looks selected.
+    """
+    with using_session(session):
+        page = sync_palette_page()
+    if journal.resume_palette is not None and journal.resume_palette[0] != page:
+        print(f"↩️ A paleta estava na página {journal.resume_palette[0]} quando o desenho parou.")
@@ -0,0 +1,231 @@
+import re
+import struct
+import time
+
+from src.automation.adb_automation import select_color
+from src.automation.adb_client import AdbError, get_client
+from src.automation.adb_draw import find_drawing_area, fit_to_area, get_screen_size, stroke_to_device_points
+from src.automation.adb_utils import get_ui_snapshot
+from src.automation.draw_journal import DrawJournal
+from src.automation.stroke_verifier import verify_and_redraw
+
+DEVICE_STREAM_PATH = "/data/local/tmp/insta_draw_touch.bin"
+DEVICE_PLAYER_PATH = "/data/local/tmp/insta_draw_play.sh"
+POINTS_PER_FRAME = 16  # Touch reports written together, ~2000 points/s at the frame interval below
+FRAME_INTERVAL_S = 0.008  # Pause between frames, like a 120 Hz touch panel
+
+# linux/input-event-codes.h
+EV_SYN, EV_KEY, EV_ABS = 0x00, 0x01, 0x03
+SYN_REPORT = 0x00
+BTN_TOUCH = 0x14A
+ABS_MT_SLOT = 0x2F
+ABS_MT_TOUCH_MAJOR = 0x30
+ABS_MT_POSITION_X = 0x35
+ABS_MT_POSITION_Y = 0x36
+ABS_MT_TRACKING_ID = 0x39
+ABS_MT_PRESSURE = 0x3A
+
+# Replays a touch stream: the DOWN report, then fixed-size frames of MOVE reports with a
+# pause between them, then the remainder (last MOVEs and the UP report). Every dd reads
+# from the same open descriptor, so each one continues where the previous stopped.
+# Args: stream, event node, down bytes, frame bytes, frame count, tail bytes, pause.
+PLAYER_SCRIPT = """exec 3<"$1" 4>"$2" || exit 1
+dd bs=$3 count=1 <&3 >&4 2>/dev/null || { echo "falha ao escrever em $2"; exit 1; }
+i=0
+while [ $i -lt $5 ]; do
+  dd bs=$4 count=1 <&3 >&4 2>/dev/null || { echo "falha ao escrever em $2"; exit 1; }
+  sleep $7
+  i=$((i + 1))
+done
+dd bs=$6 count=1 <&3 >&4 2>/dev/null || { echo "falha ao escrever em $2"; exit 1; }
+"""
+
+
+class TouchDevice:
+    """Touchscreen event node and the ranges of its multitouch axes, from `getevent -p`."""
+
+    def __init__(self, path, name, axes, event_size):
+        self.path = path
+        self.name = name
+        self.axes = axes  # ABS code -> (min, max)
+        self.event_size = event_size  # sizeof(struct input_event) for the device's ABI
+        self._format = "<qqHHi" if event_size == 24 else "<iiHHi"
+
+    def encode(self, events):
+        """Packs (type, code, value) tuples as input_event records (the kernel sets the time)."""
+        return b"".join(struct.pack(self._format, 0, 0, type_, code, value) for type_, code, value in events)
+
+    def to_axis(self, x, y, screen_size):
+        """Screen pixel -> ABS_MT_POSITION_X/Y values."""
+        (x_min, x_max), (y_min, y_max) = self.axes[ABS_MT_POSITION_X], self.axes[ABS_MT_POSITION_Y]
+        ax = x_min + round(x * (x_max - x_min) / max(1, screen_size[0] - 1))
+        ay = y_min + round(y * (y_max - y_min) / max(1, screen_size[1] - 1))
+        return min(max(ax, x_min), x_max), min(max(ay, y_min), y_max)
+
+
+def parse_getevent(output):
+    """Parses `getevent -p` into [(path, name, {abs code: (min, max)}), ...]."""
+    devices = []
+    current = None
+    in_abs = False
+    for line in output.splitlines():
+        added = re.match(r"add device \d+: (\S+)", line)
+        if added:
+            current = [added.group(1), "", {}]
+            devices.append(current)
+            in_abs = False
+            continue
+        if current is None:
+            continue
+        name = re.match(r'\s+name:\s+"(.*)"', line)
+        if name:
+            current[1] = name.group(1)
+            continue
+        if re.match(r"\s+[A-Z]+ \(\w+\):", line):
+            in_abs = "ABS (0003)" in line
+            line = line.split(":", 1)[1]
+        elif re.match(r"\s+\S+:", line) and "value" not in line:
+            in_abs = False
+        if in_abs:
+            axis = re.search(r"([0-9a-f]{4})\s*:\s*value -?\d+, min (-?\d+), max (-?\d+)", line)
+            if axis:
+                current[2][int(axis.group(1), 16)] = (int(axis.group(2)), int(axis.group(3)))
+    return [tuple(device) for device in devices]
+
+
+def find_touch_device(client):
+    """The first input device with multitouch X/Y axes."""
+    abi = client.shell("getprop ro.product.cpu.abi").strip()
+    event_size = 24 if "64" in abi else 16
+    for path, name, axes in parse_getevent(client.shell("getevent -p")):
+        if ABS_MT_POSITION_X in axes and ABS_MT_POSITION_Y in axes:
+            return TouchDevice(path, name, axes, event_size)
+    raise AdbError("Nenhuma tela de toque multitouch encontrada em 'getevent -p'.")
+
+
+def encode_stroke(device, points, screen_size, tracking_id):
+    """
+    Encodes one stroke as multitouch protocol B reports.
+    Returns (down bytes, move bytes, up bytes); each MOVE report has the same size.
+    """
+    x, y = device.to_axis(*points[0], screen_size)
+    down = [(EV_ABS, ABS_MT_SLOT, 0), (EV_ABS, ABS_MT_TRACKING_ID, tracking_id)]
+    if ABS_MT_TOUCH_MAJOR in device.axes:
+        down.append((EV_ABS, ABS_MT_TOUCH_MAJOR, max(1, device.axes[ABS_MT_TOUCH_MAJOR][1] // 20)))
+    if ABS_MT_PRESSURE in device.axes:
+        down.append((EV_ABS, ABS_MT_PRESSURE, max(1, device.axes[ABS_MT_PRESSURE][1] // 2)))
+    down += [
+        (EV_ABS, ABS_MT_POSITION_X, x),
+        (EV_ABS, ABS_MT_POSITION_Y, y),
+        (EV_KEY, BTN_TOUCH, 1),
+        (EV_SYN, SYN_REPORT, 0),
+    ]
+    moves = []
+    for point in points[1:]:
+        x, y = device.to_axis(*point, screen_size)
+        moves += [(EV_ABS, ABS_MT_POSITION_X, x), (EV_ABS, ABS_MT_POSITION_Y, y), (EV_SYN, SYN_REPORT, 0)]
+    up = [(EV_ABS, ABS_MT_TRACKING_ID, -1), (EV_KEY, BTN_TOUCH, 0), (EV_SYN, SYN_REPORT, 0)]
+    return device.encode(down), device.encode(moves), device.encode(up)
+
+
+def draw_strokes_with_evdev(
+    traces_data, is_cancelled=lambda: False, num_segments=5, serial=None, verify=True, journal=None
+):
+    """
+    Desenha os traços escrevendo eventos de toque direto no nó /dev/input da tela
+    (requer root). Cada traço é codificado como um fluxo binário de input_event do
+    protocolo multitouch B, enviado numa única transferência e reproduzido em quadros.
+
+    Args:
+        traces_data (dict): Dicionário com 'raw_bbox_width', 'raw_bbox_height' e 'grouped_traces'.
+        is_cancelled (callable): Retorna True quando o desenho deve parar (ex: ESC).
+        num_segments (int): Segmentos da spline Catmull-Rom entre pontos.
+        serial (str): Dispositivo a usar (padrão: ANDROID_SERIAL ou o único conectado).
+        verify (bool): Confere cada cor na tela ao terminar e redesenha só os traços que faltaram.
+        journal (DrawJournal): Diário do progresso; traços já concluídos nele são pulados.
+    """
+    grouped_traces = traces_data["grouped_traces"]
+    if not grouped_traces:
+        print("Nenhum traço para desenhar.")
+        return
+
+    client = get_client(serial)
+    journal = journal or DrawJournal(path=None)
+    device = find_touch_device(client)
+    # Writing to /dev/input needs root: adbd running as root, or su
+    as_root = client.shell("id -u").strip() == "0"
+    screen_size = get_screen_size(client)
+    area = find_drawing_area(get_ui_snapshot(), screen_size)
+    transform = fit_to_area(traces_data["raw_bbox_width"], traces_data["raw_bbox_height"], area)
+    client.write_file(DEVICE_PLAYER_PATH, PLAYER_SCRIPT.encode("ascii"))
+
+    print(f"\n-------------------------------------------------")
+    print(f"🖌️ INICIANDO DESENHO VIA EVDEV:")
+    print(f"  Tela de toque: {device.name} ({device.path})")
+    print(f"  Eixos X/Y: {device.axes[ABS_MT_POSITION_X]} / {device.axes[ABS_MT_POSITION_Y]}")
+    print(f"  Área de desenho: X={area['x']}, Y={area['y']}, W={area['width']}, H={area['height']}")
+    print(f"  Número total de traços: {sum(len(group['paths']) for group in grouped_traces)}")
+    print(f"-------------------------------------------------")
+
+    tracking_id = 0
+
+    def draw_stroke(points):
+        nonlocal tracking_id
+        down, moves, up = encode_stroke(device, points, screen_size, tracking_id)
+        tracking_id = (tracking_id + 1) % 0xFFFF
+
+        move_size = len(moves) // max(1, len(points) - 1)
+        frame_size = move_size * POINTS_PER_FRAME
+        frames = len(moves) // frame_size if frame_size else 0
+        tail = len(moves) - frames * frame_size + len(up)
+        client.write_file(DEVICE_STREAM_PATH, down + moves + up)
+        command = (
+            f"sh {DEVICE_PLAYER_PATH} {DEVICE_STREAM_PATH} {device.path} "
+            f"{len(down)} {frame_size or 1} {frames} {tail} {FRAME_INTERVAL_S}"
+        )
+        output = client.shell(command if as_root else f"su -c '{command}'").strip()
+        if output:
+            raise AdbError(f"Escrita de eventos falhou: {output.splitlines()[0]}")
+
+    total_points = 0
+    drawing_time = 0.0
+    try:
+        for group_index, color_group in enumerate(grouped_traces):
+            if is_cancelled():
+                break
+            if journal.skip(group_index, len(color_group["paths"]) - 1):
+                continue  # Finished before the run was interrupted
+            palette_color_info = color_group["palette_color"]
+            select_color(palette_color_info["page_index"], palette_color_info["color_index"])
+            journal.color_selected(group_index, palette_color_info["page_index"], palette_color_info["color_index"])
+
+            group_points, group_start = 0, time.perf_counter()
+            group_strokes = []
+            for stroke_index, path in enumerate(color_group["paths"]):
+                if is_cancelled():
+                    break
+                if not path or journal.skip(group_index, stroke_index):
+                    continue
+                points = stroke_to_device_points(path, transform, num_segments)
+                journal.stroke_started(group_index, stroke_index)
+                draw_stroke(points)
+                journal.stroke_finished(len(points))
+                group_strokes.append(points)
+                group_points += len(points)
+            elapsed = time.perf_counter() - group_start
+            if verify and group_strokes and not is_cancelled():
+                verify_and_redraw(group_strokes, palette_color_info["rgb_value"], draw_stroke, serial)
+            total_points += group_points
+            drawing_time += elapsed
+            if elapsed > 0:
+                print(f"  {palette_color_info['name']}: {group_points} pontos, {group_points / elapsed:.0f} pontos/s")
+        if not is_cancelled():
+            journal.finish()
+    finally:
+        journal.close("ESC" if is_cancelled() else None)
+
+    client.shell(f"rm -f {DEVICE_STREAM_PATH} {DEVICE_PLAYER_PATH}")
+    if drawing_time > 0:
+        print(f"📊 {total_points} pontos em {drawing_time:.1f}s ({total_points / drawing_time:.0f} pontos/s)")
+    print("Desenho interrompido pelo usuário." if is_cancelled() else "Desenho concluído!")
+    print(f"-------------------------------------------------\n")
@@ -0,0 +1,712 @@
+import argparse
+import json
+import os
+import random
+import re
+import shlex
+import socketserver
+import struct
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+
+import cv2
+import numpy as np
+
+from src.automation.adb_utils import find_all_color_buttons
+from src.automation.evdev_draw import (
+    ABS_MT_POSITION_X,
+    ABS_MT_POSITION_Y,
+    ABS_MT_TRACKING_ID,
+    BTN_TOUCH,
+    DEVICE_PLAYER_PATH,
+    EV_ABS,
+    EV_KEY,
+    EV_SYN,
+)
+from src.automation.palette_cache import INSTAGRAM_PACKAGE
+from src.automation.scrcpy_draw import TOUCH_EVENT_SIZE, decode_touch_event
+from src.automation.ui_snapshot import UiSnapshot
+from src.utils.color_utils import INSTAGRAM_PALETTE
+
+FAKE_ADB_PORT = 15037
+DEFAULT_DRAW_DUMP = "window_dump.xml"  # Recorded Instagram drawing screen (palette page 2)
+# Seconds each kind of request takes on the emulated phone (before --time-scale)
+DEFAULT_LATENCIES = {"shell": 0.005, "input": 0.02, "dump": 0.4, "screencap": 0.08, "sync": 0.002}
+SMOOTH_INPUT_RATE = 400  # Touch points per second the emulated app renders without jank
+TOUCH_AXIS_MAX = 4095  # Range of the emulated touchscreen's ABS_MT_POSITION_X/Y
+SLIDER_ZONE = (0, 800, 100, 1600)  # Touches starting here on the drawing screen move the stroke width slider
+STROKE_THICKNESS = 6
+PALETTE_DOT_RADIUS = 20
+PALETTE_HIT_RADIUS = 25  # Taps this close to a color button center select it
+SELECTION_RING_COLOR = (60, 60, 60)  # Ring drawn around the selected color button
+FOCUSED_ACTIVITY = f"{INSTAGRAM_PACKAGE}/com.instagram.mainactivity.MainActivity"
+XML_HEADER = "<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>"
+
+_NODE = (
+    '<node index="0" text="" resource-id="{rid}" class="{cls}" package="' + INSTAGRAM_PACKAGE + '" '
+    'content-desc="{desc}" clickable="true" enabled="true" selected="false" bounds="{bounds}" />'
+)
+CHAT_DUMP = (
+    XML_HEADER + '<hierarchy rotation="0"><node index="0" text="" resource-id="" class="android.widget.FrameLayout" '
+    'package="' + INSTAGRAM_PACKAGE + '" content-desc="" bounds="[0,0][1080,2340]">'
+    + _NODE.format(
+        rid="com.instagram.android:id/row_thread_composer_button_overflow",
+        cls="android.widget.ImageView",
+        desc="More",
+        bounds="[944,2112][1043,2171]",
+    )
+    + "</node></hierarchy>"
+)
+MENU_DUMP = (
+    XML_HEADER + '<hierarchy rotation="0"><node index="0" text="" resource-id="" class="android.widget.FrameLayout" '
+    'package="' + INSTAGRAM_PACKAGE + '" content-desc="" bounds="[0,0][1080,2340]">'
+    + "".join(
+        _NODE.format(
+            rid="com.instagram.android:id/context_menu_item",
+            cls="android.widget.LinearLayout",
+            desc=desc,
+            bounds=f"[600,{y}][1040,{y + 120}]",
+        )
+        for desc, y in (("Gallery", 1600), ("Draw", 1720), ("Voice", 1840))
+    )
+    + "</node></hierarchy>"
+)
+
+
+def palette_page_dump(template, page):
+    """The recorded drawing screen with the palette buttons relabeled as `page` of INSTAGRAM_PALETTE."""
+    root = ET.fromstring(template.encode("utf-8"))
+    names = [color["name"] for color in INSTAGRAM_PALETTE[page]]
+    for pager in root.iter("node"):
+        if pager.get("resource-id") != "com.instagram.android:id/colour_palette_pager":
+            continue
+        for container in pager:
+            if container.get("class") != "android.view.View":
+                continue
+            if container.get("resource-id") or container.get("content-desc"):
+                continue
+            buttons = list(container)
+            for position, button in enumerate(buttons):
+                if position < len(names):
+                    button.set("content-desc", names[position])
+                else:
+                    container.remove(button)  # Shorter last page
+    return XML_HEADER + ET.tostring(root, encoding="unicode")
+
+
+class FakeDevice:
+    """
+    An emulated phone showing Instagram: a chat with the More button, its context menu and
+    the drawing screen with a paged color palette. Reacts to `input` taps, swipes and
+    motionevents (and evdev streams) like the app does, draws strokes into a framebuffer
+    served by `screencap`, models latencies and frame stats, and records every touch.
+    """
+
+    def __init__(
+        self,
+        serial="fake-1",
+        draw_dump=DEFAULT_DRAW_DUMP,
+        dump_dir=None,
+        latencies=None,
+        time_scale=1.0,
+        drop_rate=0.0,
+        smooth_rate=SMOOTH_INPUT_RATE,
+        seed=None,
+    ):
+        self.serial = serial
+        self.latencies = dict(DEFAULT_LATENCIES, **(latencies or {}))
+        self.time_scale = time_scale
+        self.drop_rate = drop_rate  # Chance of a stroke being lost even when the app keeps up
+        self.smooth_rate = smooth_rate
+        self.random = random.Random(seed)
+        self.files = {}  # Device path -> bytes (sync protocol, uiautomator/screencap output), guarded by lock
+        self.touches = []  # {"time", "source", "action", "x", "y"}
+        self.lock = threading.RLock()
+
+        self.screen = "chat"
+        self.palette_page = 1
+        self.color = tuple(INSTAGRAM_PALETTE[1][0]["rgb"])
+        self.selected_color = (1, 0)  # (page, index) of the selected palette button
+        self.sharpie_selected = False
+        self._dumps = self._load_dumps(draw_dump, dump_dir)
+        self._snapshots = {}
+        x0, y0, x1, y1 = UiSnapshot(self._dumps[("draw", 1)]).roots[0].bounds
+        self.screen_size = (x1 - x0, y1 - y0)
+        self.canvas = np.full((self.screen_size[1], self.screen_size[0], 3), 255, dtype=np.uint8)
+        self.canvas_rect = self._snapshot("draw", 1).find(resource_id="com.instagram.android:id/drawing_view").bounds
+
+        self._last_point = None  # Position of the finger while a stroke is drawn
+        self._stroke_dropped = False
+        self._recent_points = deque()  # Times of the touch points of the last second
+        self._stats_since = time.monotonic()
+        self._points_since = 0
+
+    # ---------- screens ----------
+    def _load_dumps(self, draw_dump, dump_dir):
+        """Recorded dumps from dump_dir (chat.xml, menu.xml, draw_page_<n>.xml) win over synthesized ones."""
+        with open(draw_dump, "r", encoding="utf-8") as f:
+            template = f.read()
+        dumps = {"chat": CHAT_DUMP, "menu": MENU_DUMP}
+        dumps.update({("draw", page): palette_page_dump(template, page) for page in INSTAGRAM_PALETTE})
+        if dump_dir:
+            names = {"chat.xml": "chat", "menu.xml": "menu"}
+            names.update({f"draw_page_{page}.xml": ("draw", page) for page in INSTAGRAM_PALETTE})
+            for file_name, key in names.items():
+                path = os.path.join(dump_dir, file_name)
+                if os.path.exists(path):
+                    with open(path, "r", encoding="utf-8") as f:
+                        dumps[key] = f.read()
+        return dumps
+
+    def _screen_key(self):
+        return ("draw", self.palette_page) if self.screen == "draw" else self.screen
+
+    def _snapshot(self, *key):
+        key = key if len(key) > 1 else self._screen_key()
+        if key not in self._snapshots:
+            self._snapshots[key] = UiSnapshot(self._dumps[key])
+        return self._snapshots[key]
+
+    def ui_dump(self):
+        xml = self._dumps[self._screen_key()]
+        if self.screen == "draw" and self.sharpie_selected:
+            # Selecting the brush changes the dump, as on the phone
+            xml = re.sub(r'(content-desc="Sharpie Brush"[^>]*?)selected="false"', r'\1selected="true"', xml, count=1)
+        return xml
+
+    def framebuffer(self):
+        """Current screen as an (H, W, 4) RGBA array."""
+        if self.screen == "draw":
+            frame = self.canvas.copy()
+            colors = INSTAGRAM_PALETTE[self.palette_page]
+            for index, (_, center) in find_all_color_buttons(self._snapshot()).items():
+                if index < len(colors):
+                    cv2.circle(frame, center, PALETTE_DOT_RADIUS, colors[index]["rgb"], -1)
+                    if self.selected_color == (self.palette_page, index):
+                        cv2.circle(frame, center, PALETTE_DOT_RADIUS + 4, SELECTION_RING_COLOR, 2)
+        else:
+            frame = np.full_like(self.canvas, 240)
+        return np.dstack([frame, np.full(frame.shape[:2], 255, dtype=np.uint8)])
+
+    # ---------- touches ----------
+    def tap(self, x, y, source="input"):
+        with self.lock:
+            self._record(source, "TAP", x, y)
+            snapshot = self._snapshot()
+            if self.screen == "chat":
+                if self._hit(snapshot.find(content_desc="More"), x, y):
+                    self.screen = "menu"
+            elif self.screen == "menu":
+                self.screen = "draw" if self._hit(snapshot.find(content_desc="Draw"), x, y) else "chat"
+            else:
+                if self._hit(snapshot.find(content_desc="Sharpie Brush"), x, y):
+                    self.sharpie_selected = True
+                    return
+                colors = INSTAGRAM_PALETTE[self.palette_page]
+                for index, (_, (bx, by)) in find_all_color_buttons(snapshot).items():
+                    if index < len(colors) and abs(x - bx) <= PALETTE_HIT_RADIUS and abs(y - by) <= PALETTE_HIT_RADIUS:
+                        self.color = tuple(colors[index]["rgb"])
+                        self.selected_color = (self.palette_page, index)
+                        return
+                self._touch("DOWN", x, y, source, record=False)
+                self._touch("UP", x, y, source, record=False)
+
+    def swipe(self, x1, y1, x2, y2, duration_ms, source="input"):
+        with self.lock:
+            self._record(source, "SWIPE", x1, y1, x2=x2, y2=y2, duration_ms=duration_ms)
+            pager = self._snapshot().find(resource_id="com.instagram.android:id/colour_palette_pager")
+            if self.screen == "draw" and pager is not None and self._hit(pager, x1, y1) and abs(x2 - x1) > 100:
+                step = 1 if x2 < x1 else -1
+                self.palette_page = min(max(1, self.palette_page + step), max(INSTAGRAM_PALETTE))
+            elif self.screen == "draw":
+                self._touch("DOWN", x1, y1, source, record=False)
+                self._touch("MOVE", x2, y2, source, record=False)
+                self._touch("UP", x2, y2, source, record=False)
+        self._wait(duration_ms / 1000)
+
+    def motion(self, action, x, y, source="input"):
+        with self.lock:
+            self._touch(action, x, y, source)
+
+    def _touch(self, action, x, y, source, record=True):
+        if record:
+            self._record(source, action, x, y)
+        now = time.monotonic()
+        self._recent_points.append(now)
+        while self._recent_points and now - self._recent_points[0] > 1.0:
+            self._recent_points.popleft()
+        self._points_since += 1
+        if self.screen != "draw":
+            return
+        if action == "DOWN":
+            # An overloaded app loses strokes: the more over its smooth rate, the likelier
+            overload = max(0.0, len(self._recent_points) / self.smooth_rate - 1.0)
+            on_slider = SLIDER_ZONE[0] <= x < SLIDER_ZONE[2] and SLIDER_ZONE[1] <= y <= SLIDER_ZONE[3]
+            self._stroke_dropped = on_slider or self.random.random() < self.drop_rate + min(0.5, overload / 2)
+            self._last_point = (x, y)
+        if self._last_point is None:
+            return
+        if not self._stroke_dropped and self._in_canvas(x, y) and self._in_canvas(*self._last_point):
+            cv2.line(self.canvas, self._last_point, (x, y), self.color, STROKE_THICKNESS)
+        self._last_point = None if action == "UP" else (x, y)
+
+    def _record(self, source, action, x, y, **extra):
+        record = {"time": round(time.time(), 4), "source": source, "action": action, "x": x, "y": y}
+        self.touches.append(dict(record, **extra))
+
+    def _in_canvas(self, x, y):
+        x0, y0, x1, y1 = self.canvas_rect
+        return x0 <= x < x1 and y0 <= y < y1
+
+    @staticmethod
+    def _hit(node, x, y):
+        if node is None or not node.bounds:
+            return False
+        x0, y0, x1, y1 = node.bounds
+        return x0 <= x <= x1 and y0 <= y <= y1
+
+    def replay_evdev(self, stream, pause_s, frames):
+        """Decodes a multitouch protocol B stream (64-bit input_event records) into touches."""
+        width, height = self.screen_size
+        x = y = 0
+        down, lifting = False, False
+        for offset in range(0, len(stream) - 23, 24):
+            _, _, type_, code, value = struct.unpack_from("<qqHHi", stream, offset)
+            if type_ == EV_ABS and code == ABS_MT_POSITION_X:
+                x = round(value * (width - 1) / TOUCH_AXIS_MAX)
+            elif type_ == EV_ABS and code == ABS_MT_POSITION_Y:
+                y = round(value * (height - 1) / TOUCH_AXIS_MAX)
+            elif (type_ == EV_ABS and code == ABS_MT_TRACKING_ID and value == -1) or (
+                type_ == EV_KEY and code == BTN_TOUCH and value == 0
+            ):
+                lifting = True
+            elif type_ == EV_SYN:
+                if lifting and down:
+                    self.motion("UP", x, y, "evdev")
+                    down = False
+                elif not lifting:
+                    self.motion("MOVE" if down else "DOWN", x, y, "evdev")
+                    down = True
+                lifting = False
+        self._wait(pause_s * frames)
+
+    # ---------- files ----------
+    def read_file(self, path):
+        with self.lock:
+            return self.files.get(path)
+
+    def write_file(self, path, content):
+        with self.lock:
+            self.files[path] = content
+
+    def remove_file(self, path):
+        with self.lock:
+            self.files.pop(path, None)
+
+    # ---------- shell ----------
+    def shell(self, command):
+        """Runs a shell command line as the phone would; returns its output bytes."""
+        return self.run(command)[0]
+
+    def run(self, command):
+        """(output bytes, exit status) of a command line; `a; b` runs both and `$?` is the last status."""
+        output, status = b"", 0
+        for part in command.split(";"):
+            part_output, status = self._run_pipeline(part.replace("$?", str(status)).strip())
+            output += part_output
+        return output, status
+
+    def _run_pipeline(self, command):
+        if "|" in command:  # Only `command | grep text` and `command | tail -c N | head -c N` are used
+            first, *stages = command.split("|")
+            output, status = self._run_pipeline(first.strip())
+            for stage in stages:
+                output, status = self._pipe(shlex.split(stage), output)
+            return output, status
+        args = shlex.split(command)
+        if not args:
+            return b"", 0
+        self._wait(self.latencies["shell"])
+        handler = getattr(self, f"_cmd_{args[0]}", None)
+        if handler is None:
+            return f"/system/bin/sh: {args[0]}: inaccessible or not found\n".encode("utf-8"), 127
+        output = handler(args[1:])  # Output, or (output, status) for failures
+        output, status = output if isinstance(output, tuple) else (output, 0)
+        return (output.encode("utf-8") if isinstance(output, str) else output), status
+
+    def _pipe(self, args, data):
+        if args[0] == "grep":
+            lines = data.decode("utf-8", errors="replace").splitlines(True)
+            matched = "".join(line for line in lines if args[-1] in line).encode("utf-8")
+            return matched, 0 if matched else 1
+        if args[:2] == ["tail", "-c"]:
+            return data[-int(args[2]) :], 0
+        if args[:2] == ["head", "-c"]:
+            return data[: int(args[2])], 0
+        return f"/system/bin/sh: {args[0]}: inaccessible or not found\n".encode("utf-8"), 127
+
+    def _cmd_input(self, args):
+        self._wait(self.latencies["input"])
+        if args[:1] == ["tap"]:
+            self.tap(int(float(args[1])), int(float(args[2])))
+        elif args[:1] == ["swipe"]:
+            x1, y1, x2, y2 = (int(float(v)) for v in args[1:5])
+            self.swipe(x1, y1, x2, y2, int(args[5]) if len(args) > 5 else 300)
+        elif args[:1] == ["motionevent"] and args[1].upper() in ("DOWN", "MOVE", "UP"):
+            self.motion(args[1].upper(), int(float(args[2])), int(float(args[3])))
+        else:
+            return "Usage: input [<source>] <command> [<arg>...]\n", 1
+        return ""
+
+    def _cmd_uiautomator(self, args):
+        if args[:1] != ["dump"]:
+            return "Usage: uiautomator dump [file]\n", 1
+        self._wait(self.latencies["dump"])
+        path = args[1] if len(args) > 1 else "/sdcard/window_dump.xml"
+        with self.lock:
+            xml = self.ui_dump()
+        if path == "/dev/tty":
+            return f"{xml}UI hierchary dumped to: /dev/tty\n"
+        self.write_file(path, xml.encode("utf-8"))
+        return f"UI hierchary dumped to: {path}\n"
+
+    def _cmd_screencap(self, args):
+        self._wait(self.latencies["screencap"])
+        with self.lock:
+            frame = self.framebuffer()
+        if "-p" in args:
+            png = cv2.imencode(".png", cv2.cvtColor(frame, cv2.COLOR_RGBA2BGRA))[1].tobytes()
+            paths = [arg for arg in args if arg != "-p"]
+            if not paths:
+                return png
+            self.write_file(paths[0], png)
+            return b""
+        height, width = frame.shape[:2]
+        return struct.pack("<IIII", width, height, 1, 0) + frame.tobytes()
+
+    def _cmd_wm(self, args):
+        return f"Physical size: {self.screen_size[0]}x{self.screen_size[1]}\n"
+
+    def _cmd_getprop(self, args):
+        props = {"ro.serialno": self.serial, "ro.product.cpu.abi": "arm64-v8a", "ro.product.model": "Fake Insta-Draw"}
+        return props.get(args[0], "") + "\n" if args else ""
+
+    def _cmd_id(self, args):
+        return "2000\n" if args == ["-u"] else "uid=2000(shell) gid=2000(shell)\n"
+
+    def _cmd_su(self, args):
+        return self.run(args[-1]) if args[:1] == ["-c"] else b""
+
+    def _cmd_getevent(self, args):
+        return (
+            'add device 1: /dev/input/event2\n  name:     "fake_touchscreen"\n  events:\n'
+            "    KEY (0001): 014a\n"
+            f"    ABS (0003): 0035  : value 0, min 0, max {TOUCH_AXIS_MAX}, fuzz 0, flat 0, resolution 0\n"
+            f"                0036  : value 0, min 0, max {TOUCH_AXIS_MAX}, fuzz 0, flat 0, resolution 0\n"
+            "                0039  : value 0, min 0, max 65535, fuzz 0, flat 0, resolution 0\n"
+        )
+
+    def _cmd_dumpsys(self, args):
+        if args[:1] == ["window"]:
+            return f"  mCurrentFocus=Window{{1a2b3c u0 {FOCUSED_ACTIVITY}}}\n"
+        if args[:1] == ["package"]:
+            return "    versionName=300.0.0.0.0-fake\n"
+        if args[:1] == ["gfxinfo"]:
+            return self._gfxinfo(reset="reset" in args)
+        return ""
+
+    def _gfxinfo(self, reset):
+        """Frame stats that degrade once the input rate goes over what the app renders smoothly."""
+        with self.lock:
+            now = time.monotonic()
+            elapsed = max(1e-3, now - self._stats_since)
+            overload = min(1.0, max(0.0, self._points_since / elapsed / self.smooth_rate - 1.0))
+            if reset:
+                self._stats_since, self._points_since = now, 0
+        frames = int(elapsed * 60)
+        janky = int(frames * (0.02 + 0.6 * overload))
+        return (
+            f"Graphics info for pid 4242 [{INSTAGRAM_PACKAGE}]\n"
+            f"Total frames rendered: {frames}\n"
+            f"Janky frames: {janky} ({100 * janky / max(1, frames):.2f}%)\n"
+            f"50th percentile: {int(8 + 10 * overload)}ms\n"
+            f"90th percentile: {int(14 + 50 * overload)}ms\n"
+            f"95th percentile: {int(18 + 70 * overload)}ms\n"
+            f"99th percentile: {int(24 + 100 * overload)}ms\n"
+        )
+
+    def _cmd_sh(self, args):
+        script = self.read_file(args[0]) if args else None
+        if script is None:
+            return f"sh: {args[0] if args else ''}: No such file or directory\n", 127
+        if args[0] == DEVICE_PLAYER_PATH:  # The evdev player: stream, node, down, frame, frames, tail, pause
+            self.replay_evdev(self.read_file(args[1]) or b"", float(args[7]), int(args[5]))
+            return ""
+        return b"".join(self.shell(line) for line in script.decode("utf-8").splitlines() if line.strip())
+
+    def _cmd_rm(self, args):
+        for path in args:
+            if not path.startswith("-"):
+                self.remove_file(path)
+        return ""
+
+    def _cmd_cat(self, args):
+        contents = [self.read_file(path) for path in args]
+        missing = [path for path, content in zip(args, contents) if content is None]
+        output = b"".join(content for content in contents if content is not None)
+        if missing:
+            return output + f"cat: {missing[0]}: No such file or directory\n".encode("utf-8"), 1
+        return output
+
+    def _cmd_echo(self, args):
+        return " ".join(args) + "\n"
+
+    def _wait(self, seconds):
+        if seconds > 0 and self.time_scale > 0:
+            time.sleep(seconds * self.time_scale)
+
+    def save_touches(self, path):
+        with open(path, "w") as f:
+            for touch in self.touches:
+                f.write(json.dumps(touch) + "\n")
+
+
+class _AdbRequestHandler(socketserver.BaseRequestHandler):
+    """One client connection: host requests, or a transport switch followed by one device service."""
+
+    def handle(self):
+        device = None
+        try:
+            while True:
+                request = self._read_request()
+                if request.startswith("host:transport"):
+                    device = self.server.find_device(request)
+                    if device is None:
+                        return self._fail(f"device '{request.rsplit(':', 1)[-1]}' not found")
+                    self.request.sendall(b"OKAY")
+                elif device is None:
+                    return self._host_service(request)
+                else:
+                    return self._device_service(device, request)
+        except (EOFError, OSError):
+            pass
+
+    def _host_service(self, request):
+        if request == "host:version":
+            return self._okay_with("0029")
+        if request in ("host:devices", "host:devices-l"):
+            return self._okay_with("".join(f"{serial}\tdevice\n" for serial in self.server.devices))
+        # No port forwarding: point scrcpy_draw's control_address at a ScrcpyControlRecorder instead
+        return self._fail(f"unsupported by the fake device: {request}")
+
+    def _device_service(self, device, request):
+        service, _, command = request.partition(":")
+        if service in ("shell", "exec"):
+            self.request.sendall(b"OKAY")
+            self.request.sendall(device.shell(command))
+        elif service == "sync":
+            self.request.sendall(b"OKAY")
+            self._sync(device)
+        else:
+            self._fail(f"unknown service: {service}")
+
+    def _sync(self, device):
+        while True:
+            ident, data = self._read_sync()
+            device._wait(device.latencies["sync"])
+            if ident == b"QUIT":
+                return
+            if ident == b"STAT":
+                content = device.read_file(data.decode("utf-8"))
+                mode, size = (0o100644, len(content)) if content is not None else (0, 0)
+                self.request.sendall(b"STAT" + struct.pack("<III", mode, size, int(time.time())))
+            elif ident == b"RECV":
+                content = device.read_file(data.decode("utf-8"))
+                if content is None:
+                    return self._sync_fail("No such file or directory")
+                for start in range(0, len(content), 64 * 1024):
+                    chunk = content[start : start + 64 * 1024]
+                    self.request.sendall(b"DATA" + struct.pack("<I", len(chunk)) + chunk)
+                self.request.sendall(b"DONE" + struct.pack("<I", 0))
+            elif ident == b"SEND":
+                path = data.decode("utf-8").rsplit(",", 1)[0]
+                chunks = []
+                while True:
+                    ident, chunk = self._read_sync()
+                    if ident == b"DONE":
+                        break
+                    chunks.append(chunk)
+                device.write_file(path, b"".join(chunks))
+                self.request.sendall(b"OKAY" + struct.pack("<I", 0))
+            else:
+                return self._sync_fail(f"unknown sync request {ident!r}")
+
+    def _read_request(self):
+        return self._recv(int(self._recv(4), 16)).decode("utf-8")
+
+    def _read_sync(self):
+        header = self._recv(8)
+        length = struct.unpack("<I", header[4:])[0]
+        # DONE carries an mtime, not a length
+        return header[:4], (b"" if header[:4] == b"DONE" else self._recv(length))
+
+    def _recv(self, size):
+        buf = bytearray()
+        while len(buf) < size:
+            chunk = self.request.recv(size - len(buf))
+            if not chunk:
+                raise EOFError
+            buf += chunk
+        return bytes(buf)
+
+    def _okay_with(self, text):
+        data = text.encode("utf-8")
+        self.request.sendall(b"OKAY" + b"%04x" % len(data) + data)
+
+    def _fail(self, message):
+        data = message.encode("utf-8")
+        self.request.sendall(b"FAIL" + b"%04x" % len(data) + data)
+
+    def _sync_fail(self, message):
+        data = message.encode("utf-8")
+        self.request.sendall(b"FAIL" + struct.pack("<I", len(data)) + data)
+
+
+class FakeAdbServer(socketserver.ThreadingTCPServer):
+    """Serves FakeDevices over the adb server protocol, so AdbClient (and `adb -P`) talk to them unchanged."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, devices, host="127.0.0.1", port=FAKE_ADB_PORT):
+        super().__init__((host, port), _AdbRequestHandler)
+        self.devices = {device.serial: device for device in devices}
+        self._thread = None
+
+    def find_device(self, request):
+        if request == "host:transport-any":
+            return next(iter(self.devices.values())) if len(self.devices) == 1 else None
+        return self.devices.get(request.rsplit(":", 1)[-1])
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-adb", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _ScrcpyControlHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.request.sendall(b"\x00")  # scrcpy-server's dummy byte: the socket is ready
+        buf = b""
+        while True:
+            try:
+                chunk = self.request.recv(4096)
+            except OSError:
+                return
+            if not chunk:
+                return
+            buf += chunk
+            while len(buf) >= TOUCH_EVENT_SIZE:
+                message, buf = buf[:TOUCH_EVENT_SIZE], buf[TOUCH_EVENT_SIZE:]
+                self.server.record(decode_touch_event(message))
+
+
+class ScrcpyControlRecorder(socketserver.ThreadingTCPServer):
+    """
+    Stand-in for scrcpy-server's control socket (see scrcpy_draw.ScrcpyControl): greets
+    each connection with the dummy byte, decodes the INJECT_TOUCH_EVENT messages into
+    `events` and, given a FakeDevice, plays them on it as touches.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+    ACTIONS = {0: "DOWN", 1: "UP", 2: "MOVE"}
+
+    def __init__(self, device=None, host="127.0.0.1", port=0):
+        super().__init__((host, port), _ScrcpyControlHandler)
+        self.device = device
+        self.events = []
+        self._lock = threading.Lock()
+
+    @property
+    def address(self):
+        return self.server_address[:2]
+
+    def record(self, event):
+        with self._lock:
+            self.events.append(event)
+        if self.device is not None:
+            # Positions refer to the video size (the screen rounded down to multiples of 8)
+            width, height = event["screen_size"]
+            x = round(event["x"] * self.device.screen_size[0] / width)
+            y = round(event["y"] * self.device.screen_size[1] / height)
+            self.device.motion(self.ACTIONS[event["action"]], x, y, "scrcpy")
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="fake-scrcpy", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def _parse_latencies(text):
+    latencies = {}
+    for item in filter(None, (text or "").split(",")):
+        name, _, value = item.partition("=")
+        latencies[name.strip()] = float(value)
+    return latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor adb falso com um Instagram emulado para testes sem celular.")
+    parser.add_argument("--port", type=int, default=FAKE_ADB_PORT)
+    parser.add_argument("--devices", type=int, default=1, help="Quantidade de dispositivos emulados")
+    parser.add_argument("--dump", default=DEFAULT_DRAW_DUMP, help="Dump gravado da tela de desenho")
+    parser.add_argument("--dump-dir", help="Dumps gravados: chat.xml, menu.xml, draw_page_<n>.xml")
+    parser.add_argument("--latency", help="Latências em segundos, ex: dump=0.8,screencap=0.2,input=0.05")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiplica todas as latências (0: sem espera)")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Chance de um traço se perder")
+    parser.add_argument("--smooth-rate", type=int, default=SMOOTH_INPUT_RATE, help="Pontos/s sem jank")
+    parser.add_argument("--touch-log", help="Grava os toques recebidos (JSON lines) ao encerrar")
+    parser.add_argument("--save-screen", help="Salva a tela final (PNG) ao encerrar")
+    args = parser.parse_args()
+
+    devices = [
+        FakeDevice(
+            f"fake-{n + 1}",
+            draw_dump=args.dump,
+            dump_dir=args.dump_dir,
+            latencies=_parse_latencies(args.latency),
+            time_scale=args.time_scale,
+            drop_rate=args.drop_rate,
+            smooth_rate=args.smooth_rate,
+        )
+        for n in range(args.devices)
+    ]
+    server = FakeAdbServer(devices, port=args.port)
+    print(f"📱 Servidor adb falso na porta {args.port} com {', '.join(server.devices)}.")
+    print(f"   Use: ANDROID_ADB_SERVER_PORT={args.port} python -m src.automation.adb_automation")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for device in devices:
+            suffix = f"-{device.serial}" if len(devices) > 1 else ""
+            if args.touch_log:
+                root, ext = os.path.splitext(args.touch_log)
+                device.save_touches(f"{root}{suffix}{ext}")
+            if args.save_screen:
+                root, ext = os.path.splitext(args.save_screen)
+                frame = device.framebuffer()
+                cv2.imwrite(f"{root}{suffix}{ext}", cv2.cvtColor(frame, cv2.COLOR_RGBA2BGRA))
+        print(f"\n📊 Toques registrados: {', '.join(f'{d.serial}={len(d.touches)}' for d in devices)}")
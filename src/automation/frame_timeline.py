@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+from .adb_client import AdbError, current_serial
+from .palette_cache import INSTAGRAM_PACKAGE
+from .throttle import MIN_FRAMES, OVERLOADED_JANK, FrameStats, sample_frame_stats
+
+FRAME_TIMELINE_PATH = "data/frame_timeline.json"
+SAMPLE_INTERVAL_S = 0.5
+RATE_BUCKET = 50  # Points per second per bucket of the rate vs jank summary
+
+
+class FrameTimelineCollector:
+    """
+    Samples the app's frame stats (`dumpsys gfxinfo <pkg> reset`) on a background thread
+    while a drawing runs, and records when each stroke was drawn. Counters are also reset
+    on every color change, so no sample spans two color groups. Attach it to the run's
+    DrawJournal (journal.observers) to get the stroke events.
+    """
+
+    def __init__(
+        self, path=FRAME_TIMELINE_PATH, package=INSTAGRAM_PACKAGE, serial=None, interval=SAMPLE_INTERVAL_S
+    ):
+        self.path = path
+        self.package = package
+        self.serial = serial or current_serial()
+        self.interval = interval
+        self.samples = []  # {"start", "end", "frames", "janky", "p50_ms", "p90_ms", "p99_ms"}
+        self.strokes = []  # {"group", "stroke", "start", "end", "points"}
+        self._stroke_start = None
+        self._window_start = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            self._sample()  # Discards whatever the app rendered before the run
+        self._thread = threading.Thread(target=self._run, name="frame-timeline", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops sampling, takes a last sample and writes the timeline file."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            self._sample()
+        self.save()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                self._sample()
+
+    def _sample(self):
+        try:
+            stats = sample_frame_stats(self.package, self.serial)
+        except (AdbError, OSError) as e:
+            print(f"⚠️ Falha ao ler as estatísticas de quadros: {e}")
+            return
+        now = time.time()
+        if self._window_start is not None:
+            self.samples.append(
+                {
+                    "start": self._window_start,
+                    "end": now,
+                    "frames": stats.frames,
+                    "janky": stats.janky,
+                    "p50_ms": stats.p50_ms,
+                    "p90_ms": stats.p90_ms,
+                    "p99_ms": stats.p99_ms,
+                }
+            )
+        self._window_start = now
+
+    def frame_stats_reader(self):
+        """
+        A FrameStats source for AdaptiveThrottle that shares this collector's counters: each
+        call takes a sample and merges those recorded since the previous call (percentiles
+        are the worst sample's).
+        """
+        seen = len(self.samples)
+
+        def read():
+            nonlocal seen
+            with self._lock:
+                self._sample()
+                window, seen = self.samples[seen:], len(self.samples)
+            return FrameStats(
+                sum(sample["frames"] for sample in window),
+                sum(sample["janky"] for sample in window),
+                max((sample["p50_ms"] for sample in window), default=0),
+                max((sample["p90_ms"] for sample in window), default=0),
+                max((sample["p99_ms"] for sample in window), default=0),
+            )
+
+        return read
+
+    # ---------- DrawJournal observer ----------
+    def color_selected(self, group_index, page, color_index):
+        with self._lock:
+            self._sample()
+
+    def stroke_started(self, group_index, stroke_index):
+        self._stroke_start = time.time()
+
+    def stroke_finished(self, group_index, stroke_index, points):
+        self.strokes.append(
+            {
+                "group": group_index,
+                "stroke": stroke_index,
+                "start": self._stroke_start,
+                "end": time.time(),
+                "points": points,
+            }
+        )
+
+    # ---------- output ----------
+    def save(self):
+        timeline = {
+            "package": self.package,
+            "serial": self.serial,
+            "samples": correlate(self.samples, self.strokes),
+            "strokes": self.strokes,
+        }
+        timeline["summary"] = summarize(timeline["samples"])
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(timeline, f, indent=2)
+        knee = timeline["summary"]["drop_rate"]
+        suffix = f" (quedas a partir de ~{knee} pontos/s)" if knee is not None else ""
+        print(f"📈 Linha do tempo de quadros salva em {self.path}{suffix}")
+
+
+def correlate(samples, strokes):
+    """
+    Adds to each sample the strokes drawn during it and the input rate (points per second,
+    strokes counted in proportion to their overlap with the sample).
+    """
+    correlated = []
+    for sample in samples:
+        start, end = sample["start"], sample["end"]
+        points, indices = 0.0, []
+        for stroke in strokes:
+            overlap = min(end, stroke["end"]) - max(start, stroke["start"])
+            if overlap <= 0 and not start <= stroke["end"] <= end:
+                continue
+            duration = stroke["end"] - stroke["start"]
+            points += stroke["points"] * (min(1.0, overlap / duration) if duration > 0 else 1.0)
+            indices.append([stroke["group"], stroke["stroke"]])
+        span = end - start
+        correlated.append(
+            dict(
+                sample,
+                strokes=indices,
+                rate=round(points / span, 1) if span > 0 else 0.0,
+                jank=round(sample["janky"] / sample["frames"], 3) if sample["frames"] else 0.0,
+            )
+        )
+    return correlated
+
+
+def summarize(samples, bucket=RATE_BUCKET):
+    """Jank ratio per input rate bucket, and the lowest rate at which the app drops frames."""
+    buckets = {}
+    for sample in samples:
+        if not sample["strokes"]:
+            continue
+        entry = buckets.setdefault(int(sample["rate"] // bucket) * bucket, {"frames": 0, "janky": 0})
+        entry["frames"] += sample["frames"]
+        entry["janky"] += sample["janky"]
+    by_rate = []
+    for rate, entry in sorted(buckets.items()):
+        jank = round(entry["janky"] / entry["frames"], 3) if entry["frames"] else 0.0
+        by_rate.append({"rate": rate, "frames": entry["frames"], "jank": jank})
+    drop_rate = next(
+        (row["rate"] for row in by_rate if row["frames"] >= MIN_FRAMES and row["jank"] >= OVERLOADED_JANK), None
+    )
+    return {"by_rate": by_rate, "drop_rate": drop_rate}
+
+
+def load_timeline(path=FRAME_TIMELINE_PATH):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resume uma linha do tempo de quadros gravada durante um desenho.")
+    parser.add_argument("path", nargs="?", default=FRAME_TIMELINE_PATH)
+    args = parser.parse_args()
+
+    timeline = load_timeline(args.path)
+    print(f"📊 {len(timeline['samples'])} amostras, {len(timeline['strokes'])} traços ({timeline['package']})")
+    for row in timeline["summary"]["by_rate"]:
+        print(f"  {row['rate']:>5}+ pontos/s: {row['jank']:.0%} de quadros com jank ({row['frames']} quadros)")
+    drop_rate = timeline["summary"]["drop_rate"]
+    if drop_rate is not None:
+        print(f"⚠️ O app começa a perder quadros por volta de {drop_rate} pontos/s.")
+    else:
+        print("✅ Nenhuma taxa com jank acima do limite.")
@@ -0,0 +1,96 @@
+import json
+import os
+import re
+import shlex
+import threading
+
+from .adb_client import current_serial
+from .adb_utils import run_adb_command
+
+PALETTE_CACHE_PATH = "data/palette_coords.json"
+INSTAGRAM_PACKAGE = "com.instagram.android"
+VERIFY_EVERY = 25  # Cached taps between two checks of the palette against a fresh UI dump
+
+_file_lock = threading.Lock()  # Sessions of different devices share the cache file
+
+
+class PaletteCoordinateCache:
+    """
+    Palette button coordinates per page and index, persisted per device (serial, screen
+    size and Instagram versionName) so color changes can tap directly without a UI dump.
+    """
+
+    def __init__(self, path=PALETTE_CACHE_PATH, serial=None):
+        self.path = path
+        self.serial = serial
+        self._device_key = None
+        self._entries = None  # All devices, as stored in the file
+        self.taps_since_verify = 0
+
+    @property
+    def device_key(self):
+        """serial|screen size|versionName; parts adb cannot read (e.g. server down) are "?"."""
+        if self._device_key is None:
+            adb = f"adb -s {shlex.quote(self.serial)} shell" if self.serial else "adb shell"
+            serial = self.serial or current_serial() or run_adb_command(f"{adb} getprop ro.serialno")
+            size = re.findall(r"size: (\d+x\d+)", run_adb_command(f"{adb} wm size") or "")
+            version = re.search(
+                r"versionName=(\S+)", run_adb_command(f"{adb} dumpsys package {INSTAGRAM_PACKAGE} | grep versionName") or ""
+            )
+            self._device_key = "|".join(
+                (serial or "?", size[-1] if size else "?", version.group(1) if version else "?")
+            )
+        return self._device_key
+
+    def _pages(self):
+        if self._entries is None:
+            with _file_lock:
+                self._entries = self._read()
+        return self._entries.setdefault(self.device_key, {})
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Cache da paleta ignorado ({self.path}): {e}")
+            return {}
+
+    def lookup(self, page, index, content_desc):
+        """Cached (x, y) of a color button, or None if unknown or stored under another name."""
+        button = self._pages().get(str(page), {}).get(str(index))
+        if button is None or button["content_desc"] != content_desc:
+            return None
+        return button["x"], button["y"]
+
+    def verification_due(self):
+        return self.taps_since_verify >= VERIFY_EVERY
+
+    def store_page(self, page, buttons):
+        """
+        Records every button of a palette page ({index: (content-desc, (x, y))}).
+        Returns True if the stored geometry changed.
+        """
+        stored = {
+            str(index): {"content_desc": desc, "x": x, "y": y} for index, (desc, (x, y)) in buttons.items()
+        }
+        pages = self._pages()
+        changed = pages.get(str(page)) != stored
+        self.taps_since_verify = 0
+        if changed:
+            pages[str(page)] = stored
+            self._save()
+        return changed
+
+    def _save(self):
+        pages = self._pages()
+        # Re-read so entries written meanwhile by other devices' sessions are kept
+        with _file_lock:
+            entries = self._read()
+            entries[self.device_key] = pages
+            self._entries = entries
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(entries, f, indent=4)
@@ -0,0 +1,229 @@
+import os
+import random
+import socket
+import struct
+import time
+
+from src.automation.adb_automation import select_color
+from src.automation.adb_client import AdbError, get_client
+from src.automation.adb_draw import find_drawing_area, fit_to_area, get_screen_size, stroke_to_device_points
+from src.automation.adb_utils import get_ui_snapshot
+from src.automation.draw_journal import DrawJournal
+from src.automation.stroke_verifier import verify_and_redraw
+
+# scrcpy-server.jar shipped with the desktop scrcpy; its version must match SCRCPY_SERVER_VERSION
+SCRCPY_SERVER_PATH = os.environ.get("SCRCPY_SERVER_PATH", "/usr/share/scrcpy/scrcpy-server")
+SCRCPY_SERVER_VERSION = os.environ.get("SCRCPY_SERVER_VERSION", "2.4")
+DEVICE_SERVER_PATH = "/data/local/tmp/insta_draw_scrcpy.jar"
+CONNECT_TIMEOUT_S = 5.0
+EVENTS_PER_SECOND = 240  # Default touch event rate
+
+# Control message INJECT_TOUCH_EVENT (scrcpy 2.x control protocol)
+TYPE_INJECT_TOUCH_EVENT = 2
+ACTION_DOWN, ACTION_UP, ACTION_MOVE = 0, 1, 2
+POINTER_ID_FINGER = -2  # scrcpy's generic finger pointer
+PRESSURE_MAX = 0xFFFF  # u16 fixed point 1.0
+BUTTON_PRIMARY = 1
+TOUCH_EVENT_FORMAT = ">BBqiiHHHii"
+TOUCH_EVENT_SIZE = struct.calcsize(TOUCH_EVENT_FORMAT)  # 32 bytes
+
+
+def encode_touch_event(action, x, y, screen_size, pressure=PRESSURE_MAX):
+    """One INJECT_TOUCH_EVENT message: position tagged with the screen size it refers to."""
+    return struct.pack(
+        TOUCH_EVENT_FORMAT,
+        TYPE_INJECT_TOUCH_EVENT,
+        action,
+        POINTER_ID_FINGER,
+        x,
+        y,
+        screen_size[0],
+        screen_size[1],
+        0 if action == ACTION_UP else pressure,
+        BUTTON_PRIMARY if action != ACTION_MOVE else 0,  # Action button
+        0 if action == ACTION_UP else BUTTON_PRIMARY,  # Buttons held
+    )
+
+
+def decode_touch_event(message):
+    """Inverse of encode_touch_event: a dict with the action, position and screen size of the event."""
+    type_, action, pointer_id, x, y, width, height, pressure, action_button, buttons = struct.unpack(
+        TOUCH_EVENT_FORMAT, message
+    )
+    if type_ != TYPE_INJECT_TOUCH_EVENT:
+        raise ValueError(f"Mensagem de controle inesperada: tipo {type_}")
+    return {
+        "action": action,
+        "pointer_id": pointer_id,
+        "x": x,
+        "y": y,
+        "screen_size": (width, height),
+        "pressure": pressure,
+        "action_button": action_button,
+        "buttons": buttons,
+    }
+
+
+def video_size(screen_size):
+    """scrcpy rounds the device size down to multiples of 8 and drops events tagged otherwise."""
+    return screen_size[0] & ~7, screen_size[1] & ~7
+
+
+class ScrcpyControl:
+    """Control socket of a scrcpy server: streams touch strokes at a fixed event rate."""
+
+    def __init__(self, sock, screen_size, events_per_second=EVENTS_PER_SECOND):
+        self.sock = sock
+        self.screen_size = video_size(screen_size)
+        self._scale = (self.screen_size[0] / screen_size[0], self.screen_size[1] / screen_size[1])
+        self.interval = 1.0 / events_per_second
+        self.events_sent = 0
+
+    @classmethod
+    def connect(cls, address, screen_size, events_per_second=EVENTS_PER_SECOND, timeout=CONNECT_TIMEOUT_S):
+        """
+        Connects to a forwarded control socket. adb accepts the TCP connection even before
+        the server listens, so retry until the server's first (dummy) byte arrives.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            sock = socket.create_connection(address, timeout=timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            try:
+                if sock.recv(1):
+                    return cls(sock, screen_size, events_per_second)
+            except OSError:
+                pass
+            sock.close()
+            if time.monotonic() > deadline:
+                raise AdbError("O servidor scrcpy não respondeu no socket de controle.")
+            time.sleep(0.1)
+
+    def draw_stroke(self, points):
+        """Sends DOWN, MOVEs and UP for one stroke, paced to the configured event rate."""
+        actions = [ACTION_DOWN] + [ACTION_MOVE] * (len(points) - 1) + [ACTION_UP]
+        next_time = time.perf_counter()
+        for action, point in zip(actions, points + points[-1:]):
+            x, y = round(point[0] * self._scale[0]), round(point[1] * self._scale[1])
+            self.sock.sendall(encode_touch_event(action, x, y, self.screen_size))
+            self.events_sent += 1
+            next_time += self.interval
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def close(self):
+        self.sock.close()
+
+
+def _free_local_port():
+    """A free TCP port, so each device (and a running scrcpy mirror) gets its own forward."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_scrcpy_server(client, local_port):
+    """
+    Pushes scrcpy-server, forwards `local_port` to its control socket and starts it with
+    video and audio off. Returns (server shell socket, scid) — closing the socket stops it.
+    """
+    if not os.path.exists(SCRCPY_SERVER_PATH):
+        raise AdbError(f"scrcpy-server não encontrado em {SCRCPY_SERVER_PATH} (defina SCRCPY_SERVER_PATH).")
+    client.push(SCRCPY_SERVER_PATH, DEVICE_SERVER_PATH)
+    scid = f"{random.getrandbits(31):08x}"
+    client.forward(f"tcp:{local_port}", f"localabstract:scrcpy_{scid}")
+    server = client.open_shell(
+        f"CLASSPATH={DEVICE_SERVER_PATH} app_process / com.genymobile.scrcpy.Server {SCRCPY_SERVER_VERSION} "
+        f"scid={scid} tunnel_forward=true video=false audio=false control=true "
+        f"send_device_meta=false cleanup=true log_level=warn"
+    )
+    return server, scid
+
+
+def draw_strokes_with_scrcpy(
+    traces_data,
+    is_cancelled=lambda: False,
+    num_segments=5,
+    events_per_second=EVENTS_PER_SECOND,
+    serial=None,
+    control_address=None,
+    verify=True,
+    journal=None,
+):
+    """
+    Desenha os traços enviando INJECT_TOUCH_EVENT pelo socket de controle do scrcpy,
+    sem mouse do desktop, pyautogui ou xinput.
+
+    Args:
+        traces_data (dict): Dicionário com 'raw_bbox_width', 'raw_bbox_height' e 'grouped_traces'.
+        is_cancelled (callable): Retorna True quando o desenho deve parar (ex: ESC).
+        num_segments (int): Segmentos da spline Catmull-Rom entre pontos.
+        events_per_second (int): Taxa de eventos de toque enviados.
+        serial (str): Dispositivo a usar (padrão: ANDROID_SERIAL ou o único conectado).
+        control_address (tuple): (host, porta) de um socket de controle já aberto; sem ele,
+            um servidor scrcpy próprio é iniciado no dispositivo.
+        verify (bool): Confere cada cor na tela ao terminar e redesenha só os traços que faltaram.
+        journal (DrawJournal): Diário do progresso; traços já concluídos nele são pulados.
+    """
+    grouped_traces = traces_data["grouped_traces"]
+    if not grouped_traces:
+        print("Nenhum traço para desenhar.")
+        return
+
+    client = get_client(serial)
+    journal = journal or DrawJournal(path=None)
+    screen_size = get_screen_size(client)
+    area = find_drawing_area(get_ui_snapshot(), screen_size)
+    transform = fit_to_area(traces_data["raw_bbox_width"], traces_data["raw_bbox_height"], area)
+
+    server = None
+    if control_address is None:
+        local_port = _free_local_port()
+        server, _ = start_scrcpy_server(client, local_port)
+        control_address = ("127.0.0.1", local_port)
+    control = ScrcpyControl.connect(control_address, screen_size, events_per_second)
+
+    print(f"\n-------------------------------------------------")
+    print(f"🖌️ INICIANDO DESENHO VIA SCRCPY (socket de controle):")
+    print(f"  Tela do dispositivo: {screen_size[0]}x{screen_size[1]}")
+    print(f"  Área de desenho: X={area['x']}, Y={area['y']}, W={area['width']}, H={area['height']}")
+    print(f"  Taxa de eventos: {events_per_second}/s")
+    print(f"-------------------------------------------------")
+
+    start = time.perf_counter()
+    try:
+        for group_index, color_group in enumerate(grouped_traces):
+            if is_cancelled():
+                break
+            if journal.skip(group_index, len(color_group["paths"]) - 1):
+                continue  # Finished before the run was interrupted
+            palette_color_info = color_group["palette_color"]
+            select_color(palette_color_info["page_index"], palette_color_info["color_index"])
+            journal.color_selected(group_index, palette_color_info["page_index"], palette_color_info["color_index"])
+            group_strokes = []
+            for stroke_index, path in enumerate(color_group["paths"]):
+                if is_cancelled():
+                    break
+                if path and not journal.skip(group_index, stroke_index):
+                    points = stroke_to_device_points(path, transform, num_segments)
+                    journal.stroke_started(group_index, stroke_index)
+                    control.draw_stroke(points)
+                    journal.stroke_finished(len(points))
+                    group_strokes.append(points)
+            if verify and group_strokes and not is_cancelled():
+                verify_and_redraw(group_strokes, palette_color_info["rgb_value"], control.draw_stroke, serial)
+        if not is_cancelled():
+            journal.finish()
+    finally:
+        journal.close("ESC" if is_cancelled() else None)
+        control.close()
+        if server is not None:
+            server.close()
+            client.remove_forward(f"tcp:{control_address[1]}")
+
+    elapsed = time.perf_counter() - start
+    if elapsed > 0:
+        print(f"📊 {control.events_sent} eventos em {elapsed:.1f}s ({control.events_sent / elapsed:.0f} eventos/s)")
+    print("Desenho interrompido pelo usuário." if is_cancelled() else "Desenho concluído!")
+    print(f"-------------------------------------------------\n")
@@ -0,0 +1,68 @@
+import numpy as np
+
+from .adb_client import AdbError, get_client
+
+# android.graphics.PixelFormat values screencap can report
+PIXEL_FORMAT_RGBA_8888 = 1
+PIXEL_FORMAT_RGBX_8888 = 2
+
+_frame_sizes = {}  # Device serial -> (width, height) of its last full capture, to cut rows out on the device
+
+
+def capture_screen(serial=None):
+    """
+    Captures the screen with `exec-out screencap` (raw framebuffer, no PNG encoding and no
+    files) and returns it as an (height, width, 4) uint8 RGBA array.
+    """
+    client = get_client(serial)
+    frame = decode_screencap(client.exec_out("screencap"))
+    _frame_sizes[client.serial] = frame.shape[1], frame.shape[0]
+    return frame
+
+
+def capture_rows(y0, y1, serial=None):
+    """
+    Framebuffer rows y0..y1 as a (rows, width, 4) RGBA array. Only those rows are sent:
+    the device cuts them from the end of the raw screencap (its header size varies, the
+    pixel data does not), so polling a small region costs a fraction of a full capture.
+    Uses the screen size of the last full capture (one is taken first if there is none).
+    """
+    client = get_client(serial)
+    size = _frame_sizes.get(client.serial)
+    if size is None:
+        return capture_screen(serial)[y0:y1]
+    width, height = size
+    y1 = min(y1, height)
+    row_bytes = width * 4
+    expected = (y1 - y0) * row_bytes
+    raw = client.exec_out(f"screencap | tail -c {(height - y0) * row_bytes} | head -c {expected}")
+    if len(raw) != expected:  # e.g. no toybox tail/head: fall back to the whole frame
+        return capture_screen(serial)[y0:y1]
+    return np.frombuffer(raw, dtype=np.uint8).reshape(y1 - y0, width, 4)
+
+
+def decode_screencap(raw):
+    """Decodes raw `screencap` output: width, height, format (and dataspace on newer Android), pixels."""
+    if len(raw) < 12:
+        raise AdbError("Saída do screencap vazia ou truncada.")
+    width, height, pixel_format = (int(v) for v in np.frombuffer(raw, dtype="<u4", count=3))
+    if pixel_format not in (PIXEL_FORMAT_RGBA_8888, PIXEL_FORMAT_RGBX_8888):
+        raise AdbError(f"Formato de pixel do screencap não suportado: {pixel_format}")
+    size = width * height * 4
+    header = len(raw) - size
+    if header not in (12, 16):  # Android 9+ adds a 4-byte dataspace field
+        raise AdbError(f"Tamanho inesperado do screencap: {len(raw)} bytes para {width}x{height}")
+    return np.frombuffer(raw, dtype=np.uint8, count=size, offset=header).reshape(height, width, 4)
+
+
+def region_means(frame, centers, radius=4):
+    """
+    Mean RGB of the (2 * radius + 1)² square around each (x, y) center, for all centers
+    in one vectorized gather. Returns an (N, 3) float array.
+    """
+    centers = np.asarray(centers, dtype=np.intp).reshape(-1, 2)
+    offsets = np.arange(-radius, radius + 1)
+    xs = np.clip(centers[:, 0, None, None] + offsets[None, None, :], 0, frame.shape[1] - 1)
+    ys = np.clip(centers[:, 1, None, None] + offsets[None, :, None], 0, frame.shape[0] - 1)
+    patches = frame[ys, xs, :3]  # (N, size, size, 3)
+    return patches.reshape(len(centers), -1, 3).mean(axis=1)
@@ -0,0 +1,108 @@
+import time
+
+import numpy as np
+
+from .adb_client import AdbError
+from .screen_capture import capture_screen
+
+COVERAGE_THRESHOLD = 0.6  # Fraction of a stroke's samples that must show its color
+COLOR_TOLERANCE = 60.0  # Max RGB distance for a pixel to count as the stroke's ink
+SAMPLE_STEP = 2.0  # Device pixels between samples along a stroke
+SAMPLE_RADIUS = 1  # Pixels searched around each sample (brush and rounding jitter)
+RECHECK_DELAY_S = 0.1  # Second look before a stroke is declared missing (it may not be rendered yet)
+MAX_REDRAW_PASSES = 2
+
+
+def rasterize_strokes(strokes, step=SAMPLE_STEP):
+    """
+    Samples every stroke (list of device (x, y) points) every `step` pixels along its
+    segments, all strokes at once. Returns (samples (M, 2) int array, stroke ids (M,)).
+    """
+    starts, ends, owners = [], [], []
+    for stroke_id, points in enumerate(strokes):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points) == 0:
+            continue
+        if len(points) == 1:
+            points = np.vstack([points, points])  # A tap: one zero-length segment
+        starts.append(points[:-1])
+        ends.append(points[1:])
+        owners.append(np.full(len(points) - 1, stroke_id))
+    if not starts:
+        return np.empty((0, 2), dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    starts, ends, owners = np.concatenate(starts), np.concatenate(ends), np.concatenate(owners)
+    deltas = ends - starts
+    counts = np.maximum(1, np.ceil(np.hypot(deltas[:, 0], deltas[:, 1]) / step).astype(np.intp))
+    segment = np.repeat(np.arange(len(starts)), counts)
+    t = (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)) / counts[segment]
+    samples = starts[segment] + deltas[segment] * t[:, None]
+    return np.rint(samples).astype(np.intp), owners[segment]
+
+
+def stroke_coverage(frame, strokes, rgb, tolerance=COLOR_TOLERANCE, radius=SAMPLE_RADIUS):
+    """
+    Fraction of each stroke's samples with a pixel of color `rgb` within `radius` in
+    `frame` (an (H, W, 3+) screen capture). Returns an (N,) array, one value per stroke
+    (1.0 for empty strokes).
+    """
+    samples, owners = rasterize_strokes(strokes)
+    coverage = np.ones(len(strokes))
+    if len(samples) == 0:
+        return coverage
+
+    # Ink mask of the strokes' bounding box, grown by `radius`, then one lookup per sample
+    height, width = frame.shape[:2]
+    samples = np.clip(samples, 0, [width - 1, height - 1])
+    x0, y0 = samples.min(axis=0)
+    x1, y1 = samples.max(axis=0) + 1
+    pad_x0, pad_y0 = max(0, x0 - radius), max(0, y0 - radius)
+    region = frame[pad_y0 : min(height, y1 + radius), pad_x0 : min(width, x1 + radius), :3].astype(np.int32)
+    ink = ((region - np.asarray(rgb, dtype=np.int32)) ** 2).sum(axis=-1) <= tolerance**2
+    grown = np.zeros((ink.shape[0] + 2 * radius, ink.shape[1] + 2 * radius), dtype=bool)
+    for dy in range(2 * radius + 1):
+        for dx in range(2 * radius + 1):
+            grown[dy : dy + ink.shape[0], dx : dx + ink.shape[1]] |= ink
+    inked = grown[samples[:, 1] - pad_y0 + radius, samples[:, 0] - pad_x0 + radius]
+
+    totals = np.bincount(owners, minlength=len(strokes))
+    hits = np.bincount(owners, weights=inked, minlength=len(strokes))
+    drawn = totals > 0
+    coverage[drawn] = hits[drawn] / totals[drawn]
+    return coverage
+
+
+def find_missed_strokes(strokes, rgb, serial=None, threshold=COVERAGE_THRESHOLD):
+    """Indexes of the strokes that do not show up on screen in color `rgb`."""
+    missed = np.flatnonzero(stroke_coverage(capture_screen(serial), strokes, rgb) < threshold)
+    if len(missed):
+        # The last strokes may still be on their way to the screen: look again before redrawing
+        time.sleep(RECHECK_DELAY_S)
+        recheck = [strokes[i] for i in missed]
+        missed = missed[stroke_coverage(capture_screen(serial), recheck, rgb) < threshold]
+    return missed.tolist()
+
+
+def verify_and_redraw(strokes, rgb, draw_stroke, serial=None, passes=MAX_REDRAW_PASSES):
+    """
+    Checks a just-drawn color group against the screen and redraws (with `draw_stroke`)
+    only the strokes that went missing, up to `passes` times. Returns the number of
+    strokes still missing afterwards.
+    """
+    pending = list(range(len(strokes)))
+    for attempt in range(passes + 1):
+        try:
+            missed = find_missed_strokes([strokes[i] for i in pending], rgb, serial)
+        except (AdbError, OSError) as e:
+            # Verification is a safety net: without a screenshot the drawing just goes on
+            print(f"⚠️ Não foi possível conferir os traços na tela: {e}")
+            return 0
+        pending = [pending[i] for i in missed]
+        if not pending or attempt == passes:
+            break
+        print(f"🔁 {len(pending)} traço(s) não apareceram na tela; redesenhando...")
+        for i in pending:
+            draw_stroke(strokes[i])
+    if pending:
+        print(f"⚠️ {len(pending)} traço(s) continuam faltando após {passes} repasse(s).")
+    return len(pending)
@@ -0,0 +1,158 @@
+import json
+import os
+import re
+import time
+
+from .adb_client import AdbError, current_serial, get_client
+from .palette_cache import INSTAGRAM_PACKAGE
+
+THROTTLE_LOG_PATH = "data/throttle_log.jsonl"
+CHECK_EVERY_STROKES = 10  # Strokes drawn between two looks at the frame stats
+MIN_FRAMES = 30  # Fewer frames since the last look: not enough to judge, keep the pace
+MIN_SCALE, MAX_SCALE = 0.25, 4.0  # Bounds of the pause/duration multiplier
+SPEED_UP = 0.85  # Multiplier applied when the app keeps up easily
+SLOW_DOWN = 1.5  # ... and when it starts dropping frames
+HEALTHY_JANK, OVERLOADED_JANK, STALLED_JANK = 0.05, 0.20, 0.40  # Janky frame ratios
+HEALTHY_P90_MS, OVERLOADED_P90_MS, STALLED_P90_MS = 20, 34, 50  # 90th percentile frame times
+BREAK_MIN_S, BREAK_MAX_S = 0.5, 3.0  # Breaks only when stalled; longer the worse it is
+
+
+class FrameStats:
+    """Rendering stats of an app since the previous sample (`dumpsys gfxinfo <pkg> reset`)."""
+
+    def __init__(self, frames, janky, p50_ms, p90_ms, p99_ms):
+        self.frames = frames
+        self.janky = janky
+        self.p50_ms = p50_ms
+        self.p90_ms = p90_ms
+        self.p99_ms = p99_ms
+
+    @property
+    def jank_ratio(self):
+        return self.janky / self.frames if self.frames else 0.0
+
+    @classmethod
+    def parse(cls, output):
+        def number(pattern):
+            match = re.search(pattern, output)
+            return int(match.group(1)) if match else 0
+
+        return cls(
+            number(r"Total frames rendered: (\d+)"),
+            number(r"Janky frames: (\d+)"),
+            number(r"50th percentile: (\d+)ms"),
+            number(r"90th percentile: (\d+)ms"),
+            number(r"99th percentile: (\d+)ms"),
+        )
+
+
+def sample_frame_stats(package=INSTAGRAM_PACKAGE, serial=None):
+    """Frame stats of `package` since the last call (the counters are reset each time)."""
+    return FrameStats.parse(get_client(serial).shell(f"dumpsys gfxinfo {package} reset"))
+
+
+class AdaptiveThrottle:
+    """
+    Paces the drawing from the device's own rendering: every few strokes it reads the
+    app's frame stats and scales the per-point pause and move duration down while frames
+    stay smooth, up when they start to jank, and asks for a break only when rendering
+    stalls. Every decision is appended to a log so the bounds can be tuned per device.
+    `sample` returns the FrameStats since its previous call (default: sample_frame_stats,
+    which resets the app's counters, so pass another source when something else samples).
+    If the stats cannot be read at all, `available` is False and the caller should fall
+    back to its fixed breaks.
+    """
+
+    def __init__(
+        self,
+        base_pause,
+        base_duration,
+        serial=None,
+        log_path=THROTTLE_LOG_PATH,
+        check_every=CHECK_EVERY_STROKES,
+        sample=None,
+    ):
+        self.base_pause = base_pause
+        self.base_duration = base_duration
+        self.serial = serial or current_serial()
+        self.sample = sample or (lambda: sample_frame_stats(serial=self.serial))
+        self.log_path = log_path
+        self.check_every = check_every
+        self.scale = 1.0
+        self.available = True
+        self._strokes = 0
+        self._start()
+
+    @property
+    def pause(self):
+        return self.base_pause * self.scale
+
+    @property
+    def move_duration(self):
+        return self.base_duration * self.scale
+
+    def _start(self):
+        try:
+            self.sample()  # Only starts a new window
+        except (AdbError, OSError) as e:
+            print(f"⚠️ Estatísticas de quadros indisponíveis: {e}")
+            self.available = False
+
+    def next_stroke(self):
+        """Call before each stroke. Returns the break to take first, in seconds (usually 0)."""
+        self._strokes += 1
+        if not self.available or self._strokes % self.check_every:
+            return 0.0
+        try:
+            stats = self.sample()
+        except (AdbError, OSError) as e:
+            print(f"⚠️ Falha ao ler as estatísticas de quadros: {e}")
+            return 0.0
+        return self._adjust(stats)
+
+    def _adjust(self, stats):
+        pause_s = 0.0
+        if stats.frames < MIN_FRAMES:
+            decision = "manter"
+        elif stats.jank_ratio >= STALLED_JANK or stats.p90_ms >= STALLED_P90_MS:
+            decision = "pausar"
+            self.scale = min(MAX_SCALE, self.scale * SLOW_DOWN)
+            severity = max(stats.jank_ratio / STALLED_JANK, stats.p90_ms / STALLED_P90_MS)
+            pause_s = min(BREAK_MAX_S, BREAK_MIN_S * severity)
+        elif stats.jank_ratio >= OVERLOADED_JANK or stats.p90_ms >= OVERLOADED_P90_MS:
+            decision = "desacelerar"
+            self.scale = min(MAX_SCALE, self.scale * SLOW_DOWN)
+        elif stats.jank_ratio <= HEALTHY_JANK and stats.p90_ms <= HEALTHY_P90_MS:
+            decision = "acelerar"
+            self.scale = max(MIN_SCALE, self.scale * SPEED_UP)
+        else:
+            decision = "manter"
+
+        record = {
+            "time": round(time.time(), 3),
+            "serial": self.serial,
+            "stroke": self._strokes,
+            "frames": stats.frames,
+            "jank": round(stats.jank_ratio, 3),
+            "p90_ms": stats.p90_ms,
+            "decision": decision,
+            "scale": round(self.scale, 3),
+            "pause_s": round(pause_s, 2),
+        }
+        if decision != "manter":
+            print(
+                f"🎛️ Ritmo: {decision} (jank {stats.jank_ratio:.0%}, p90 {stats.p90_ms}ms) -> escala {self.scale:.2f}"
+                + (f", pausa de {pause_s:.1f}s" if pause_s else "")
+            )
+        self._log(record)
+        return pause_s
+
+    def _log(self, record):
+        if self.log_path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"⚠️ Não foi possível registrar a decisão do ritmo: {e}")
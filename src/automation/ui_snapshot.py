@@ -0,0 +1,120 @@
+import hashlib
+import io
+import re
+import threading
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+
+_BOUNDS_RE = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+
+class UiNode:
+    """One `node` of a uiautomator dump, with bounds parsed and parent/child links."""
+
+    __slots__ = ("attrib", "bounds", "parent", "children", "depth")
+
+    def __init__(self, attrib, parent):
+        self.attrib = attrib
+        match = _BOUNDS_RE.match(attrib.get("bounds", ""))
+        self.bounds = tuple(map(int, match.groups())) if match else None  # (x0, y0, x1, y1)
+        self.parent = parent
+        self.children = []
+        self.depth = parent.depth + 1 if parent is not None else 0
+
+    def get(self, key, default=None):
+        return self.attrib.get(key, default)
+
+    @property
+    def center(self):
+        if self.bounds is None:
+            return None
+        x0, y0, x1, y1 = self.bounds
+        return (x0 + x1) // 2, (y0 + y1) // 2
+
+    def is_descendant_of(self, ancestor):
+        node = self.parent
+        while node is not None and node.depth >= ancestor.depth:
+            if node is ancestor:
+                return True
+            node = node.parent
+        return False
+
+
+class UiSnapshot:
+    """
+    A parsed UI dump indexed once by resource-id, content-desc, text and class, so lookups
+    are dictionary hits instead of scans of the whole tree. Nodes keep document order.
+    """
+
+    def __init__(self, xml_data):
+        data = xml_data.encode("utf-8") if isinstance(xml_data, str) else xml_data
+        self.digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        self.nodes = []
+        self.roots = []
+        self.by_resource_id = defaultdict(list)
+        self.by_content_desc = defaultdict(list)
+        self.by_text = defaultdict(list)
+        self.by_class = defaultdict(list)
+        self.memo = {}  # Lookups derived from the tree (e.g. the palette buttons), per snapshot
+
+        # Build the index while streaming, without keeping an ElementTree around
+        stack = []
+        for event, element in ET.iterparse(io.BytesIO(data), events=("start", "end")):
+            if element.tag != "node":
+                continue
+            if event == "end":
+                stack.pop()
+                element.clear()
+                continue
+            parent = stack[-1] if stack else None
+            node = UiNode(dict(element.attrib), parent)
+            (parent.children if parent is not None else self.roots).append(node)
+            stack.append(node)
+            self.nodes.append(node)
+            for index, key in (
+                (self.by_resource_id, "resource-id"),
+                (self.by_content_desc, "content-desc"),
+                (self.by_text, "text"),
+                (self.by_class, "class"),
+            ):
+                value = node.attrib.get(key)
+                if value:
+                    index[value].append(node)
+
+    def find_all(self, resource_id=None, content_desc=None, text=None, class_name=None):
+        """Nodes matching every given attribute, in document order."""
+        criteria = [
+            (self.by_resource_id, "resource-id", resource_id),
+            (self.by_content_desc, "content-desc", content_desc),
+            (self.by_text, "text", text),
+            (self.by_class, "class", class_name),
+        ]
+        criteria = [c for c in criteria if c[2] is not None]
+        if not criteria:
+            return list(self.nodes)
+        # Start from the shortest index list and check the other attributes on it
+        criteria.sort(key=lambda c: len(c[0].get(c[2], ())))
+        index, _, value = criteria[0]
+        return [
+            node
+            for node in index.get(value, ())
+            if all(node.attrib.get(key) == wanted for _, key, wanted in criteria[1:])
+        ]
+
+    def find(self, resource_id=None, content_desc=None, text=None, class_name=None):
+        matches = self.find_all(resource_id, content_desc, text, class_name)
+        return matches[0] if matches else None
+
+
+_local = threading.local()  # Last snapshot per thread: each device is automated from its own thread
+
+
+def get_snapshot(xml_data):
+    """UiSnapshot of a dump (str); an existing snapshot is returned as is, the same screen is parsed once."""
+    if isinstance(xml_data, UiSnapshot):
+        return xml_data
+    digest = hashlib.blake2b(xml_data.encode("utf-8"), digest_size=16).hexdigest()
+    snapshot = getattr(_local, "snapshot", None)
+    if snapshot is None or snapshot.digest != digest:
+        snapshot = _local.snapshot = UiSnapshot(xml_data)
+    return snapshot
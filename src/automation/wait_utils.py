@@ -0,0 +1,101 @@
+import re
+import time
+
+import numpy as np
+
+from .adb_client import AdbError, get_client
+from .adb_utils import get_ui_snapshot
+from .screen_capture import capture_rows
+
+INITIAL_POLL_S = 0.05
+MAX_POLL_S = 0.5
+REGION_CHANGE_THRESHOLD = 2.0  # Mean absolute difference (0-255) that counts as a visible change
+SETTLE_INTERVAL_S = 0.1  # Captures this far apart must agree for an animation to count as finished (>= poll period)
+
+
+def wait_until(condition, timeout=5.0, initial_delay=INITIAL_POLL_S, max_delay=MAX_POLL_S, description=None):
+    """
+    Calls `condition()` until it returns something truthy, doubling the pause between
+    attempts up to `max_delay`. Returns that value, or None after `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        result = condition()
+        if result:
+            return result
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            if description:
+                print(f"⏱️ Tempo esgotado esperando: {description}")
+            return None
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+
+
+def get_focused_window():
+    """Package/activity of the focused window (from dumpsys), or None."""
+    output = get_client().shell("dumpsys window | grep mCurrentFocus")
+    match = re.search(r"mCurrentFocus=Window\{\S+ \S+ ([^}\s]+)\}", output)
+    return match.group(1) if match else None
+
+
+def wait_for_focus(package, timeout=5.0):
+    return wait_until(
+        lambda: (get_focused_window() or "").startswith(package), timeout, description=f"foco em {package}"
+    )
+
+
+def wait_for_element(timeout=5.0, **criteria):
+    """Dumps the UI until a node matching `criteria` (see UiSnapshot.find) shows up; returns the snapshot."""
+
+    def element_visible():
+        snapshot = get_ui_snapshot()
+        return snapshot if snapshot is not None and snapshot.find(**criteria) is not None else None
+
+    return wait_until(element_visible, timeout, description=f"elemento {criteria}")
+
+
+def wait_for_screen_change(previous_digest, timeout=2.0):
+    """Dumps the UI until its hash differs from `previous_digest`; returns the new snapshot."""
+
+    def changed():
+        snapshot = get_ui_snapshot()
+        return snapshot if snapshot is not None and snapshot.digest != previous_digest else None
+
+    return wait_until(changed, timeout, description="mudança na tela")
+
+
+def capture_region(rect):
+    """Framebuffer pixels (RGB) inside rect = (x0, y0, x1, y1); only its rows are transferred."""
+    x0, y0, x1, y1 = rect
+    return capture_rows(y0, y1)[:, x0:x1, :3].astype(np.int16)
+
+
+def regions_differ(a, b):
+    return a.shape != b.shape or float(np.abs(a - b).mean()) > REGION_CHANGE_THRESHOLD
+
+
+def wait_for_region_settled(rect, timeout=3.0):
+    """Polls a framebuffer region until two captures in a row agree. Returns True, or False on timeout."""
+    deadline = time.monotonic() + timeout
+    previous = capture_region(rect)
+    while time.monotonic() < deadline:
+        time.sleep(SETTLE_INTERVAL_S)
+        current = capture_region(rect)
+        if not regions_differ(current, previous):
+            return True
+        previous = current
+    return False
+
+
+def wait_for_device(timeout=10.0):
+    """Waits until the adb server lists a device in the 'device' state."""
+
+    def device_ready():
+        try:
+            return any(state == "device" for _, state in get_client().devices())
+        except (AdbError, OSError):
+            return False
+
+    return wait_until(device_ready, timeout, description="dispositivo ADB")
@@ -0,0 +1,166 @@
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+DEFAULT_TILE_SIZE = 128  # Edge map pixels per tile side
+
+
+class TiledContourIndex:
+    """
+    Contours of an edge map, indexed by the tiles their bounding boxes overlap.
+    After an edit only the tiles around the changed region are traced again and the
+    new contours replace the old ones there; contours keep their id while untouched,
+    so per-contour results (colors, splines) can be cached by id in `derived`.
+    """
+
+    def __init__(self, edges, tile_size=DEFAULT_TILE_SIZE):
+        self.tile_size = tile_size
+        self.shape = edges.shape[:2]
+        self.contours = {}  # id -> contour (Nx1x2 int32, edge map coordinates)
+        self.bboxes = {}  # id -> (x0, y0, x1, y1)
+        self.derived = {}  # id -> dict of cached per-contour data, dropped with the contour
+        self._tiles = defaultdict(set)  # (tx, ty) -> ids of contours overlapping the tile
+        self._next_id = 0
+        h, w = self.shape
+        self._extract(edges, (0, 0, w, h))
+
+    def __len__(self):
+        return len(self.contours)
+
+    def items(self):
+        """Returns (id, contour) pairs in a stable order (oldest first)."""
+        return sorted(self.contours.items())
+
+    def update(self, edges, dirty_rect):
+        """
+        Re-traces the contours affected by a change of `edges` inside `dirty_rect`
+        (x0, y0, x1, y1). Returns (removed_ids, added_ids).
+        """
+        region = self._expand_region(edges, self._align(dirty_rect))
+        old = {self.contours[contour_id].tobytes(): contour_id for contour_id in self._query(region)}
+        for contour_id in old.values():
+            self._remove(contour_id)
+
+        removed, added = [], []
+        for contour in self._trace(edges, region):
+            # A contour the edit did not change keeps its id (and its cached data)
+            contour_id = old.pop(contour.tobytes(), None)
+            if contour_id is None:
+                contour_id = self._next_id
+                self._next_id += 1
+                added.append(contour_id)
+            self._add(contour_id, contour)
+        for contour_id in old.values():
+            self.derived.pop(contour_id, None)
+            removed.append(contour_id)
+        return removed, added
+
+    # ---------- internals ----------
+    def _align(self, rect):
+        """Grows `rect` to whole tiles, clipped to the edge map."""
+        h, w = self.shape
+        t = self.tile_size
+        x0, y0, x1, y1 = rect
+        x0, y0 = max(0, x0 // t * t), max(0, y0 // t * t)
+        x1, y1 = min(w, -(-x1 // t) * t), min(h, -(-y1 // t) * t)
+        return x0, y0, x1, y1
+
+    def _expand_region(self, edges, region):
+        """
+        Grows the region until it fully contains every contour it overlaps and no edge
+        pixel inside it touches one outside it, so tracing the region alone yields the
+        same contours as tracing the whole edge map (contours crossing tile borders
+        are re-traced whole).
+        """
+        t = self.tile_size
+        h, w = self.shape
+        while region != (0, 0, w, h):
+            x0, y0, x1, y1 = region
+            for contour_id in self._query(region):
+                bx0, by0, bx1, by1 = self.bboxes[contour_id]
+                x0, y0, x1, y1 = min(x0, bx0), min(y0, by0), max(x1, bx1), max(y1, by1)
+            left, top, right, bottom = self._border_links(edges, (x0, y0, x1, y1))
+            grown = self._align((x0 - t * left, y0 - t * top, x1 + t * right, y1 + t * bottom))
+            if grown == region:
+                break
+            region = grown
+        return region
+
+    @staticmethod
+    def _border_links(edges, rect):
+        """Tells, per side (left, top, right, bottom), whether an edge pixel connects across it."""
+        h, w = edges.shape[:2]
+        x0, y0, x1, y1 = rect
+
+        def linked(inner, outer):
+            # 8-connectivity: an inner pixel touches the outer pixel beside it or diagonally
+            outer = outer > 0
+            near = outer[1:-1] | outer[:-2] | outer[2:]
+            return bool(np.any((inner > 0) & near))
+
+        def outer_line(line, start, end, size):
+            # The pixels beside the side plus one past each end (empty outside the edge map)
+            return np.pad(line[max(0, start - 1) : min(size, end + 1)], (int(start == 0), int(end == size)))
+
+        left = x0 > 0 and linked(edges[y0:y1, x0], outer_line(edges[:, x0 - 1], y0, y1, h))
+        right = x1 < w and linked(edges[y0:y1, x1 - 1], outer_line(edges[:, x1], y0, y1, h))
+        top = y0 > 0 and linked(edges[y0, x0:x1], outer_line(edges[y0 - 1], x0, x1, w))
+        bottom = y1 < h and linked(edges[y1 - 1, x0:x1], outer_line(edges[y1], x0, x1, w))
+        return left, top, right, bottom
+
+    def _tile_range(self, rect):
+        t = self.tile_size
+        x0, y0, x1, y1 = rect
+        return range(x0 // t, (x1 - 1) // t + 1), range(y0 // t, (y1 - 1) // t + 1)
+
+    def _query(self, rect):
+        """Returns the ids of the contours whose bounding box intersects `rect`."""
+        x0, y0, x1, y1 = rect
+        tiles_x, tiles_y = self._tile_range(rect)
+        candidates = set()
+        for ty in tiles_y:
+            for tx in tiles_x:
+                candidates |= self._tiles.get((tx, ty), set())
+        hits = []
+        for contour_id in candidates:
+            bx0, by0, bx1, by1 = self.bboxes[contour_id]
+            if bx0 < x1 and bx1 > x0 and by0 < y1 and by1 > y0:
+                hits.append(contour_id)
+        return hits
+
+    def _extract(self, edges, region):
+        added = []
+        for contour in self._trace(edges, region):
+            self._add(self._next_id, contour)
+            added.append(self._next_id)
+            self._next_id += 1
+        return added
+
+    @staticmethod
+    def _trace(edges, region):
+        x0, y0, x1, y1 = region
+        if x1 <= x0 or y1 <= y0:
+            return ()
+        # offset= returns the contours in edge map coordinates
+        contours, _ = cv2.findContours(
+            edges[y0:y1, x0:x1], cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE, offset=(x0, y0)
+        )
+        return contours
+
+    def _add(self, contour_id, contour):
+        bx, by, bw, bh = cv2.boundingRect(contour)
+        self.contours[contour_id] = contour
+        self.bboxes[contour_id] = (bx, by, bx + bw, by + bh)
+        tiles_x, tiles_y = self._tile_range(self.bboxes[contour_id])
+        for ty in tiles_y:
+            for tx in tiles_x:
+                self._tiles[(tx, ty)].add(contour_id)
+
+    def _remove(self, contour_id):
+        tiles_x, tiles_y = self._tile_range(self.bboxes[contour_id])
+        for ty in tiles_y:
+            for tx in tiles_x:
+                self._tiles[(tx, ty)].discard(contour_id)
+        del self.contours[contour_id]
+        del self.bboxes[contour_id]
@@ -0,0 +1,190 @@
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+MAX_CELLS_PER_STROKE = 64  # Strokes spanning more grid cells are kept in a short separate list
+
+
+class Stroke:
+    """
+    One trace: its points (Nx2 int32, source image coordinates) and palette color info.
+    Closed strokes (contours) also have a segment from the last point back to the first.
+    """
+
+    __slots__ = ("points", "color", "bbox", "closed")
+
+    def __init__(self, points, color, closed=False):
+        self.points = np.asarray(points, dtype=np.int32).reshape(-1, 2)
+        self.color = color
+        self.closed = closed
+        x, y, w, h = cv2.boundingRect(self.points)
+        self.bbox = (x, y, x + w, y + h)
+
+    def path(self):
+        """Points as [[x, y], ...] as the device draws them: closed strokes end back on their first point."""
+        coords = self.points.tolist()
+        if self.closed and len(coords) > 2:
+            coords.append(coords[0])
+        return coords
+
+
+class StrokeSet:
+    """
+    Editable set of strokes in drawing order, with a uniform grid over their bounding
+    boxes so click and lasso hit tests only look at the strokes near the cursor.
+    `version` changes with every edit so renderings can be cached.
+    """
+
+    def __init__(self, strokes, image_size):
+        self.strokes = {}  # id -> Stroke
+        self.order = []  # Stroke ids in drawing order
+        self.version = 0
+        self.image_size = image_size
+        w, h = image_size
+        # About one stroke per cell on average
+        self.cell_size = max(8, int(np.sqrt(w * h / max(1, len(strokes)))))
+        self._cells = defaultdict(set)  # (cx, cy) -> stroke ids
+        self._large = set()  # Ids of strokes too big to be put in every cell they touch
+        for stroke_id, stroke in enumerate(strokes):
+            self.strokes[stroke_id] = stroke
+            self.order.append(stroke_id)
+            self._index(stroke_id, stroke)
+
+    def __len__(self):
+        return len(self.order)
+
+    def ordered(self):
+        """Returns the strokes in drawing order."""
+        return [self.strokes[stroke_id] for stroke_id in self.order]
+
+    # ---------- hit testing ----------
+    def hit_test(self, x, y, tolerance):
+        """Returns the id of the stroke closest to (x, y) within `tolerance` pixels, or None."""
+        best_id, best_dist = None, tolerance
+        for stroke_id in self._candidates((x - tolerance, y - tolerance, x + tolerance + 1, y + tolerance + 1)):
+            bx0, by0, bx1, by1 = self.strokes[stroke_id].bbox
+            if not (bx0 - tolerance <= x <= bx1 + tolerance and by0 - tolerance <= y <= by1 + tolerance):
+                continue
+            stroke = self.strokes[stroke_id]
+            dist = self._distance(stroke.points, x, y, stroke.closed)
+            if dist <= best_dist:
+                best_id, best_dist = stroke_id, dist
+        return best_id
+
+    def lasso(self, polygon):
+        """Returns the ids of the strokes lying completely inside `polygon` (list of (x, y))."""
+        poly = np.asarray(polygon, dtype=np.int32).reshape(-1, 2)
+        if len(poly) < 3:
+            return set()
+        lx, ly, lw, lh = cv2.boundingRect(poly)
+        rect = (lx, ly, lx + lw, ly + lh)
+
+        # Only strokes whose bounding box fits inside the lasso's can be inside it
+        ids = [
+            stroke_id
+            for stroke_id in self._candidates(rect)
+            if self._contains(rect, self.strokes[stroke_id].bbox)
+        ]
+        if not ids:
+            return set()
+
+        inside = np.zeros((lh, lw), dtype=np.uint8)
+        cv2.fillPoly(inside, [poly - (lx, ly)], 1)
+        # Test the points of all candidates at once, then reduce per stroke
+        points = [self.strokes[stroke_id].points for stroke_id in ids]
+        starts = np.cumsum([0] + [len(p) for p in points[:-1]])
+        all_points = np.concatenate(points) - (lx, ly)
+        all_points[:, 0] = np.clip(all_points[:, 0], 0, lw - 1)
+        all_points[:, 1] = np.clip(all_points[:, 1], 0, lh - 1)
+        hit = inside[all_points[:, 1], all_points[:, 0]]
+        all_inside = np.minimum.reduceat(hit, starts)
+        return {stroke_id for stroke_id, ok in zip(ids, all_inside) if ok}
+
+    # ---------- edits ----------
+    def delete(self, ids):
+        ids = set(ids) & self.strokes.keys()
+        if not ids:
+            return
+        for stroke_id in ids:
+            self._unindex(stroke_id, self.strokes.pop(stroke_id))
+        self.order = [stroke_id for stroke_id in self.order if stroke_id not in ids]
+        self.version += 1
+
+    def recolor(self, ids, color):
+        for stroke_id in ids:
+            if stroke_id in self.strokes:
+                self.strokes[stroke_id].color = color
+        self.version += 1
+
+    def bring_to_front(self, ids):
+        """Moves the strokes to the end of the drawing order (drawn last)."""
+        ids = set(ids)
+        self.order = [i for i in self.order if i not in ids] + [i for i in self.order if i in ids]
+        self.version += 1
+
+    def send_to_back(self, ids):
+        """Moves the strokes to the start of the drawing order (drawn first)."""
+        ids = set(ids)
+        self.order = [i for i in self.order if i in ids] + [i for i in self.order if i not in ids]
+        self.version += 1
+
+    # ---------- internals ----------
+    def _cell_range(self, rect):
+        c = self.cell_size
+        x0, y0, x1, y1 = rect
+        return range(int(x0) // c, int(x1 - 1) // c + 1), range(int(y0) // c, int(y1 - 1) // c + 1)
+
+    def _index(self, stroke_id, stroke):
+        cells_x, cells_y = self._cell_range(stroke.bbox)
+        if len(cells_x) * len(cells_y) > MAX_CELLS_PER_STROKE:
+            self._large.add(stroke_id)
+            return
+        for cy in cells_y:
+            for cx in cells_x:
+                self._cells[(cx, cy)].add(stroke_id)
+
+    def _unindex(self, stroke_id, stroke):
+        if stroke_id in self._large:
+            self._large.discard(stroke_id)
+            return
+        cells_x, cells_y = self._cell_range(stroke.bbox)
+        for cy in cells_y:
+            for cx in cells_x:
+                self._cells[(cx, cy)].discard(stroke_id)
+
+    def _candidates(self, rect):
+        cells_x, cells_y = self._cell_range(rect)
+        if len(cells_x) * len(cells_y) > len(self._cells):
+            # Huge query: walking the occupied cells is cheaper than every cell in range
+            found = set()
+            for (cx, cy), ids in self._cells.items():
+                if cx in cells_x and cy in cells_y:
+                    found.update(ids)
+        else:
+            found = set()
+            for cy in cells_y:
+                for cx in cells_x:
+                    found.update(self._cells.get((cx, cy), ()))
+        found |= self._large
+        return found
+
+    @staticmethod
+    def _contains(outer, inner):
+        return outer[0] <= inner[0] and outer[1] <= inner[1] and inner[2] <= outer[2] and inner[3] <= outer[3]
+
+    @staticmethod
+    def _distance(points, x, y, closed=False):
+        """Distance from (x, y) to the polyline through `points` (closed: back to the first point)."""
+        pts = points.astype(np.float32)
+        q = np.array((x, y), dtype=np.float32)
+        if len(pts) == 1:
+            return float(np.hypot(*(pts[0] - q)))
+        if closed:
+            pts = np.concatenate([pts, pts[:1]])
+        a, b = pts[:-1], pts[1:]
+        ab = b - a
+        length_sq = np.maximum((ab * ab).sum(axis=1), 1e-6)
+        t = np.clip(((q - a) * ab).sum(axis=1) / length_sq, 0.0, 1.0)
+        closest = a + ab * t[:, None]
+        return float(np.sqrt(((closest - q) ** 2).sum(axis=1)).min())
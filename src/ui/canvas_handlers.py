@@ -4,9 +4,23 @@ import cv2
 import numpy as np
 from PIL import Image
 
+from src.utils.brush_utils import capsule_roi_mask, union_rect
+
+# Minimum interval between two brush updates (~60 fps); motion events arriving
+# in between are coalesced into a single segment.
+PAINT_FRAME_INTERVAL_MS = 16
+WHEEL_PAN_STEP = 60  # Canvas pixels panned per mouse wheel notch
+WHEEL_ZOOM_FACTOR = 1.1  # Zoom multiplier per mouse wheel notch (with Ctrl)
+
 class CanvasInteractionHandler:
     def __init__(self, app):
         self.app = app
+        self._paint_buffer = None
+        self._mask_buffer = None
+        self._pending_point = None
+        self._paint_after_id = None
+        self._stroke_rect = None
+        self._pan_anchor = None
 
     def toggle_eraser(self):
         self.app.erase_mode = not self.app.erase_mode
@@ -19,46 +33,131 @@ class CanvasInteractionHandler:
             return
         self.app.last_x = event.x
         self.app.last_y = event.y
+        # Copy-on-write: the stroke edits private copies of the edit mask (source
+        # resolution) and of the display layer, which only gives visual feedback until
+        # the preview is recomputed with the new mask
+        self._mask_buffer = self.app.image_state.mask_writable()
+        self._paint_buffer = self.app.image_state.layer("display").writable()
+        self._pending_point = None
+        self._stroke_rect = None
+        self._flush_paint((event.x, event.y))
 
     def _paint(self, event):
         if self.app.display_image is None or self.app.last_x is None or self.app.last_y is None:
             return
 
+        # Only remember the newest point; intermediate motion events are coalesced
+        # into a single segment stamped at most once per frame.
+        self._pending_point = (event.x, event.y)
+        if self._paint_after_id is None:
+            self._paint_after_id = self.app.after(PAINT_FRAME_INTERVAL_MS, self._flush_paint)
+
+    def _flush_paint(self, point=None):
+        self._paint_after_id = None
+        if point is None:
+            point = self._pending_point
+        self._pending_point = None
+        if point is None or self._paint_buffer is None or self.app.last_x is None:
+            return
+
         # map canvas coords to image coords, accounting for offset and scale
-        ix = int((event.x - self.app.x_offset) / self.app.scale)
-        iy = int((event.y - self.app.y_offset) / self.app.scale)
+        p0 = self._canvas_to_image(self.app.last_x, self.app.last_y)
+        p1 = self._canvas_to_image(*point)
         radius = self.app.eraser_var.get()
+        self.app.last_x, self.app.last_y = point
+
+        # The same stroke in source coordinates goes into the edit mask
+        disp_h, disp_w = self._paint_buffer.shape[:2]
+        mask_h, mask_w = self._mask_buffer.shape[:2]
+        sx, sy = mask_w / disp_w, mask_h / disp_h
+        mask_rect = self._stamp(
+            self._mask_buffer,
+            (int(p0[0] * sx), int(p0[1] * sy)),
+            (int(p1[0] * sx), int(p1[1] * sy)),
+            radius * (sx + sy) / 2,
+        )
+        if mask_rect is None:
+            return
+        self._stroke_rect = union_rect(self._stroke_rect, mask_rect)
+        self._stamp(self._paint_buffer, p0, p1, radius)
 
-        # ensure we operate on RGBA numpy array
-        img = np.array(self.app.display_image.convert("RGBA"))
-        h, w = img.shape[:2]
-
-        # Clamp drawing coordinates to image bounds
-        ix = max(0, min(w - 1, ix))
-        iy = max(0, min(h - 1, iy))
-
-        # Create a mask for the circular region
-        mask = np.zeros((h, w), dtype=np.uint8)
-        cv2.circle(mask, (ix, iy), radius, 255, -1)
+        # update display_image and redraw
+        self.app.image_state.set_array("display", self._paint_buffer)
+        self.app.show_image()
 
-        if self.app.erase_mode:
-            # set alpha in circular region to 0
-            img[..., 3] = np.where(mask == 255, 0, img[..., 3])
+    def _stamp(self, buffer, p0, p1, radius):
+        """Stamps a capsule from p0 to p1 into `buffer` (edit mask or RGBA); returns the touched rect."""
+        # A capsule from the previous point to the newest one so fast drags leave no gaps
+        rect, roi_mask = capsule_roi_mask(p0, p1, radius, buffer.shape)
+        if rect is None:
+            return None
+        x0, y0, x1, y1 = rect
+        roi = buffer[y0:y1, x0:x1]
+        hit = roi_mask == 255
+
+        if buffer.ndim == 2:
+            # edit mask: 0 = erased, 255 = kept
+            roi[hit] = 0 if self.app.erase_mode else 255
+        elif self.app.erase_mode:
+            # set alpha in capsule region to 0
+            roi[..., 3][hit] = 0
         else:
             # restore: paint white opaque on RGB and alpha=255 in region
-            for c in range(3):
-                img[..., c] = np.where(mask == 255, 255, img[..., c])
-            img[..., 3] = np.where(mask == 255, 255, img[..., 3])
+            roi[hit] = 255
+        return rect
 
-        # update display_image and redraw
-        self.app.display_image = Image.fromarray(img)
-        self.app.show_image()
-        self.app.last_x, self.app.last_y = event.x, event.y
+    def _canvas_to_image(self, x, y):
+        h, w = self._paint_buffer.shape[:2]
+        ix, iy = map(int, self.app.viewport.canvas_to_image(x, y))
+        # Clamp drawing coordinates to image bounds
+        return max(0, min(w - 1, ix)), max(0, min(h - 1, iy))
 
     def _end_paint(self, _=None):
+        if self._paint_after_id is not None:
+            self.app.after_cancel(self._paint_after_id)
+            self._paint_after_id = None
+        if self._pending_point is not None:
+            self._flush_paint()
         self.app.last_x = None
         self.app.last_y = None
-        self.app._save_state_for_undo()
+        mask, self._mask_buffer, self._paint_buffer = self._mask_buffer, None, None
+        if mask is None or self._stroke_rect is None:
+            return
+        # The mask copy becomes the edit mask itself; the preview is rebuilt from it
+        self.app.image_state.set_mask(mask)
+        self.app._save_state_for_undo("mask", self._stroke_rect)
+        self.app.update_preview()
+
+    # ---------- pan / zoom ----------
+    def _start_pan(self, event):
+        self._pan_anchor = (event.x, event.y)
+
+    def _pan(self, event):
+        if self.app.display_image is None or self._pan_anchor is None:
+            return
+        dx = event.x - self._pan_anchor[0]
+        dy = event.y - self._pan_anchor[1]
+        self._pan_anchor = (event.x, event.y)
+        self.app.viewport.pan(dx, dy)
+        self.app.show_image()
+
+    def _on_mouse_wheel(self, event):
+        if self.app.display_image is None:
+            return
+        # Windows/macOS report a signed delta, X11 sends Button-4 (up) / Button-5 (down)
+        direction = 1 if (event.num == 4 or getattr(event, "delta", 0) > 0) else -1
+
+        if event.state & 0x0004:  # Control: zoom around the cursor
+            low = float(self.app.slider_scale.cget("from"))
+            high = float(self.app.slider_scale.cget("to"))
+            zoom = max(low, min(high, self.app.scale_var.get() * WHEEL_ZOOM_FACTOR ** direction))
+            self.app.viewport.zoom_at(event.x, event.y, zoom)
+            self.app.scale_var.set(zoom)
+        elif event.state & 0x0001:  # Shift: horizontal scroll
+            self.app.viewport.pan(direction * WHEEL_PAN_STEP, 0)
+        else:
+            self.app.viewport.pan(0, direction * WHEEL_PAN_STEP)
+        self.app.show_image()
 
     def enable_crop(self):
         if self.app.display_image is None:
@@ -99,11 +198,9 @@ class CanvasInteractionHandler:
         x0, x1 = sorted((x0, x1))
         y0, y1 = sorted((y0, y1))
 
-        # convert canvas coords to image coords using scale and offset
-        ix0 = int((x0 - self.app.x_offset) / self.app.scale)
-        iy0 = int((y0 - self.app.y_offset) / self.app.scale)
-        ix1 = int((x1 - self.app.x_offset) / self.app.scale)
-        iy1 = int((y1 - self.app.y_offset) / self.app.scale)
+        # convert canvas coords to image coords through the viewport (zoom and pan)
+        ix0, iy0 = map(int, self.app.viewport.canvas_to_image(x0, y0))
+        ix1, iy1 = map(int, self.app.viewport.canvas_to_image(x1, y1))
 
         # clamp to image bounds
         if self.app.display_image is None:
@@ -125,21 +222,7 @@ class CanvasInteractionHandler:
             self._restore_paint_bindings()
             return
 
-        # crop the PIL image (display_image is PIL)
-        try:
-            cropped = self.app.display_image.crop((ix0, iy0, ix1, iy1))
-            self.app.display_image = cropped.copy()
-            self.app.processed_image = cropped.copy()
-            self.app.original_image = (
-                cropped.copy()
-            )  # make crop become new original for further ops
-            self.app.scale_var.set(1.0)  # Reset zoom slider
-            self.app.show_image()
-            self.app._save_state_for_undo()
-            self.app.status_label.config(text="Imagem cortada.")
-        except Exception as e:
-            messagebox.showerror("Erro crop", f"Falha no crop: {e}")
-            self.app.status_label.config(text="Crop falhou.")
+        self.app._apply_crop((ix0, iy0, ix1, iy1))
 
         # cleanup
         self.app.canvas.delete(self.app.crop_rect_id)
@@ -291,11 +291,10 @@ class MainUIBuilder:
         )
         self.app.check_traces_only.pack(pady=6, padx=12, fill="x")
 
-        self.app.check_paint_as_traces = tk.Checkbutton(
+        self.app.check_draw_on_device = tk.Checkbutton(
             self.app.left_controls_frame,
-            text="Pintar como Traços",
-            command=self.app.update_preview, # Re-render preview when this changes
-            variable=self.app.paint_as_traces_var,
+            text="Desenhar direto no celular (ADB)",
+            variable=self.app.draw_on_device_var,
             bg="#2b2b2b",
             fg="white",
             selectcolor="#3b8ed0",
@@ -304,7 +303,7 @@ class MainUIBuilder:
             relief="flat",
             highlightthickness=0,
         )
-        self.app.check_paint_as_traces.pack(pady=6, padx=12, fill="x")
+        self.app.check_draw_on_device.pack(pady=6, padx=12, fill="x")
 
         # Monochromatic Mode Checkbox
         self.app.check_monochromatic = tk.Checkbutton(
@@ -387,6 +386,16 @@ class MainUIBuilder:
             activebackground="#4a9cdb",
             activeforeground="white",
         ).pack(pady=6, padx=12, fill="x")
+        tk.Button(
+            self.app.right_controls_frame,
+            text="✏️ Editar Traços (selecionar)",
+            command=self.app.stroke_editor.toggle,
+            bg="#3b8ed0",
+            fg="white",
+            activebackground="#4a9cdb",
+            activeforeground="white",
+        ).pack(pady=6, padx=12, fill="x")
+        self._build_stroke_edit_tools()
         tk.Button(
             self.app.right_controls_frame,
             text="🎨 Converter em Traços (preview)",
@@ -424,7 +433,19 @@ class MainUIBuilder:
             bg="#2b2b2b",
             fg="white",
         )
-        self.app.status_label.pack(pady=(12, 12), padx=12, fill="x")
+        self.app.status_label.pack(pady=(12, 4), padx=12, fill="x")
+
+        # undo/redo history memory usage, below the status label
+        self.app.history_memory_label = tk.Label(
+            self.app.left_controls_frame,
+            text="Histórico: 0.0 MB",
+            anchor="w",
+            justify="left",
+            bg="#2b2b2b",
+            fg="#aaaaaa",
+            font=("Arial", 9),
+        )
+        self.app.history_memory_label.pack(pady=(0, 12), padx=12, fill="x")
 
         # PREVIEW PANEL (center)
         self.app.preview_frame = tk.Frame(self.app, bg="#111214")
@@ -438,7 +459,58 @@ class MainUIBuilder:
         self.app.canvas.bind("<ButtonPress-1>", self.app.canvas_handler._start_paint)
         self.app.canvas.bind("<B1-Motion>", self.app.canvas_handler._paint)
         self.app.canvas.bind("<ButtonRelease-1>", self.app.canvas_handler._end_paint)
+        # pan with middle/right button drag, scroll with the wheel (Shift: horizontal, Ctrl: zoom)
+        for button in (2, 3):
+            self.app.canvas.bind(f"<ButtonPress-{button}>", self.app.canvas_handler._start_pan)
+            self.app.canvas.bind(f"<B{button}-Motion>", self.app.canvas_handler._pan)
+        self.app.canvas.bind("<MouseWheel>", self.app.canvas_handler._on_mouse_wheel)
+        self.app.canvas.bind("<Button-4>", self.app.canvas_handler._on_mouse_wheel)
+        self.app.canvas.bind("<Button-5>", self.app.canvas_handler._on_mouse_wheel)
     
+    def _build_stroke_edit_tools(self):
+        """Delete/reorder buttons and recolor palette for the strokes selected in the stroke editor."""
+        editor = self.app.stroke_editor
+        tools_frame = tk.Frame(self.app.right_controls_frame, bg="#2b2b2b")
+        tools_frame.pack(pady=2, padx=12, fill="x")
+        for text, command in (
+            ("🗑️ Excluir", editor.delete_selected),
+            ("⬆️ Por último", editor.bring_to_front),
+            ("⬇️ Primeiro", editor.send_to_back),
+        ):
+            tk.Button(
+                tools_frame,
+                text=text,
+                command=command,
+                bg="#3b8ed0",
+                fg="white",
+                activebackground="#4a9cdb",
+                activeforeground="white",
+            ).pack(side="left", padx=2, expand=True, fill="x")
+
+        tk.Label(self.app.right_controls_frame, text="Recolorir Seleção:", bg="#2b2b2b", fg="white").pack(
+            anchor="w", padx=12, pady=(4, 0)
+        )
+        for page_index, colors in INSTAGRAM_PALETTE.items():
+            page_frame = tk.Frame(self.app.right_controls_frame, bg="#2b2b2b")
+            page_frame.pack(fill="x", padx=12, pady=1)
+            for color_index, color_info in enumerate(colors):
+                recolor_info = {
+                    "page_index": page_index,
+                    "color_index": color_index,
+                    "name": color_info["name"],
+                    "hex_value": color_info["hex"],
+                    "rgb_value": color_info["rgb"],
+                }
+                tk.Button(
+                    page_frame,
+                    bg=color_info["hex"],
+                    activebackground=color_info["hex"],
+                    width=1,
+                    height=1,
+                    relief="raised",
+                    command=lambda info=recolor_info: editor.recolor_selected(info),
+                ).pack(side="left", padx=1)
+
     def _toggle_monochromatic_mode(self):
         if self.app.monochromatic_var.get():
             self.monochromatic_color_frame.pack(pady=5, padx=12, fill="x")
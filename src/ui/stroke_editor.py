@@ -0,0 +1,218 @@
+import cv2
+import numpy as np
+from PIL import Image
+
+HIT_TOLERANCE_PX = 6  # Canvas pixels around the cursor that still hit a stroke
+LASSO_MIN_DRAG_PX = 4  # Shorter drags count as a click
+SELECTION_COLOR = (0, 200, 255, 255)  # RGBA highlight of selected strokes
+SELECTION_THICKNESS = 3
+
+
+class StrokeEditor:
+    """
+    Stroke-level editing on the canvas: click or lasso to select strokes of the current
+    trace set, then delete, recolor or reorder them before `save_traces` writes the file.
+    While active, the canvas shows the strokes instead of the preview.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.active = False
+        self.selected = set()
+        self._press = None
+        self._lasso_points = []
+        self._lasso_id = None
+        self._base_key = None
+        self._base = None  # Rendered strokes (RGBA array at display size) without the selection
+        self._scaled_key = None
+        self._scaled_points = {}  # Stroke id -> points at display scale, kept across edits
+
+    def toggle(self):
+        if self.active:
+            self.disable()
+        else:
+            self.enable()
+
+    def enable(self):
+        if self.app.original_image is None:
+            self.app.status_label.config(text="Carrega uma imagem primeiro.")
+            return
+        stroke_set = self.app._get_stroke_set()
+        if stroke_set is None:
+            return
+        self.active = True
+        self.selected = set()
+        canvas = self.app.canvas
+        canvas.bind("<ButtonPress-1>", self._select_start)
+        canvas.bind("<B1-Motion>", self._select_drag)
+        canvas.bind("<ButtonRelease-1>", self._select_end)
+        self.app.bind("<Delete>", self.delete_selected)
+        self.app.bind("<BackSpace>", self.delete_selected)
+        self.app.status_label.config(
+            text=f"Edição de traços: clique ou laço para selecionar (Shift adiciona). {len(stroke_set)} traços."
+        )
+        self.app.show_image()
+
+    def reset(self):
+        """Forgets the selection and cached renderings; call when the stroke set is replaced."""
+        self.selected = set()
+        self._base_key = None
+        self._base = None
+        self._scaled_key = None
+        self._scaled_points = {}
+
+    def disable(self):
+        self.active = False
+        self.selected = set()
+        self.app.unbind("<Delete>")
+        self.app.unbind("<BackSpace>")
+        self.app.canvas_handler._restore_paint_bindings()
+        self.app.show_image()
+
+    # ---------- selection ----------
+    def _select_start(self, event):
+        self._press = (event.x, event.y)
+        self._lasso_points = [(event.x, event.y)]
+
+    def _select_drag(self, event):
+        if self._press is None:
+            return
+        self._lasso_points.append((event.x, event.y))
+        if not self._is_lasso():
+            return
+        flat = [c for point in self._lasso_points for c in point]
+        if self._lasso_id is None:
+            self._lasso_id = self.app.canvas.create_line(*flat, fill="#00c8ff", width=1, dash=(4, 2))
+        else:
+            self.app.canvas.coords(self._lasso_id, *flat)
+
+    def _select_end(self, event):
+        if self._press is None or self.app.stroke_set is None:
+            return
+        stroke_set = self.app.stroke_set
+        if self._is_lasso():
+            polygon = [self._canvas_to_source(x, y) for x, y in self._lasso_points]
+            hits = stroke_set.lasso(polygon)
+        else:
+            x, y = self._canvas_to_source(event.x, event.y)
+            tolerance = HIT_TOLERANCE_PX * self._source_per_canvas_px()
+            hit = stroke_set.hit_test(x, y, tolerance)
+            hits = {hit} if hit is not None else set()
+
+        if event.state & 0x0001:  # Shift: add to / toggle in the selection
+            self.selected ^= hits
+        else:
+            self.selected = hits
+        if self._lasso_id is not None:
+            self.app.canvas.delete(self._lasso_id)
+            self._lasso_id = None
+        self._press = None
+        self._lasso_points = []
+        self.app.status_label.config(text=f"{len(self.selected)} traço(s) selecionado(s).")
+        self.app.show_image()
+
+    def _is_lasso(self):
+        x0, y0 = self._press
+        return len(self._lasso_points) > 2 and any(
+            abs(x - x0) > LASSO_MIN_DRAG_PX or abs(y - y0) > LASSO_MIN_DRAG_PX for x, y in self._lasso_points
+        )
+
+    def _source_per_canvas_px(self):
+        source_w = self.app.original_image.width
+        display_w = self.app.display_image.width
+        return source_w / display_w / self.app.viewport.scale
+
+    def _canvas_to_source(self, x, y):
+        ix, iy = self.app.viewport.canvas_to_image(x, y)
+        scale = self.app.original_image.width / self.app.display_image.width
+        return int(ix * scale), int(iy * scale)
+
+    # ---------- actions ----------
+    def delete_selected(self, _=None):
+        if not self._has_selection():
+            return
+        count = len(self.selected)
+        self.app.stroke_set.delete(self.selected)
+        self.selected = set()
+        self.app.status_label.config(text=f"{count} traço(s) excluído(s).")
+        self.app.show_image()
+
+    def recolor_selected(self, color_info):
+        if not self._has_selection():
+            return
+        self.app.stroke_set.recolor(self.selected, color_info)
+        self.app.status_label.config(text=f"{len(self.selected)} traço(s) recoloridos: {color_info['hex_value']}")
+        self.app.show_image()
+
+    def bring_to_front(self):
+        if not self._has_selection():
+            return
+        self.app.stroke_set.bring_to_front(self.selected)
+        self.app.status_label.config(text="Traços movidos para o fim da ordem de desenho.")
+        self.app.show_image()
+
+    def send_to_back(self):
+        if not self._has_selection():
+            return
+        self.app.stroke_set.send_to_back(self.selected)
+        self.app.status_label.config(text="Traços movidos para o início da ordem de desenho.")
+        self.app.show_image()
+
+    def _has_selection(self):
+        if not self.active or self.app.stroke_set is None:
+            self.app.status_label.config(text="Ative a edição de traços primeiro.")
+            return False
+        if not self.selected:
+            self.app.status_label.config(text="Nenhum traço selecionado.")
+            return False
+        return True
+
+    # ---------- rendering ----------
+    def view(self) -> Image.Image:
+        """Renders the strokes (selection highlighted) at the display image size."""
+        stroke_set = self.app.stroke_set
+        size = self.app.display_image.size
+        scale = size[0] / self.app.original_image.width
+        if self._scaled_key != (id(stroke_set), size):
+            self._scaled_points = {}
+            self._scaled_key = (id(stroke_set), size)
+        key = (id(stroke_set), stroke_set.version, size)
+        if self._base_key != key:
+            self._base = self._render(stroke_set, size, scale)
+            self._base_key = key
+
+        image = self._base
+        if self.selected:
+            image = image.copy()
+            for closed in (False, True):
+                points = [
+                    self._scaled(stroke_set, i, scale)
+                    for i in self.selected
+                    if i in stroke_set.strokes and stroke_set.strokes[i].closed == closed
+                ]
+                if points:
+                    cv2.polylines(image, points, closed, SELECTION_COLOR, SELECTION_THICKNESS)
+        return Image.fromarray(image)
+
+    def _render(self, stroke_set, size, scale):
+        image = np.full((size[1], size[0], 4), 255, dtype=np.uint8)  # White RGBA background
+        # Consecutive strokes of the same color (and closedness) are drawn in one call, keeping the drawing order
+        batch, batch_key = [], None
+        for stroke_id in stroke_set.order:
+            stroke = stroke_set.strokes[stroke_id]
+            key = (tuple(stroke.color["rgb_value"]), stroke.closed)
+            if key != batch_key and batch:
+                cv2.polylines(image, batch, batch_key[1], batch_key[0] + (255,), 1)
+                batch = []
+            batch_key = key
+            batch.append(self._scaled(stroke_set, stroke_id, scale))
+        if batch:
+            cv2.polylines(image, batch, batch_key[1], batch_key[0] + (255,), 1)
+        return image
+
+    def _scaled(self, stroke_set, stroke_id, scale):
+        points = self._scaled_points.get(stroke_id)
+        if points is None:
+            points = np.round(stroke_set.strokes[stroke_id].points * scale).astype(np.int32)
+            self._scaled_points[stroke_id] = points
+        return points
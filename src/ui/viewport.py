@@ -0,0 +1,91 @@
+from PIL import Image
+
+
+class Viewport:
+    """
+    Zoom/pan transform between canvas and image coordinates.
+    Only the part of the image that is visible on the canvas is ever resampled,
+    so rendering costs the same as the canvas size regardless of the zoom level.
+    """
+
+    def __init__(self):
+        # Pan position: image point shown at the canvas center, normalized to 0..1
+        self.center_u = 0.5
+        self.center_v = 0.5
+        self.base_scale = 1.0  # Scale that fits the whole image inside the canvas
+        self.scale = 1.0  # Effective scale (base scale * user zoom)
+        self.x_offset = 0.0  # Canvas position of the image origin
+        self.y_offset = 0.0
+        self.canvas_size = (1, 1)
+        self.image_size = (1, 1)
+
+    def reset(self):
+        """Centers the image again (used when a new image is loaded or cropped)."""
+        self.center_u = 0.5
+        self.center_v = 0.5
+
+    def update(self, canvas_w, canvas_h, img_w, img_h, zoom):
+        """Recomputes scale and offsets for the given canvas/image sizes and user zoom."""
+        self.canvas_size = (canvas_w, canvas_h)
+        self.image_size = (img_w, img_h)
+        self.base_scale = min(canvas_w / img_w, canvas_h / img_h)
+        self.scale = self.base_scale * zoom
+
+        self.x_offset, self.center_u = self._axis_offset(canvas_w, img_w * self.scale, self.center_u)
+        self.y_offset, self.center_v = self._axis_offset(canvas_h, img_h * self.scale, self.center_v)
+
+    @staticmethod
+    def _axis_offset(canvas_len, scaled_len, center):
+        if scaled_len <= canvas_len:
+            # The image fits: keep it centered on this axis
+            return (canvas_len - scaled_len) / 2, 0.5
+        # Keep the canvas covered by the image while panning
+        offset = canvas_len / 2 - center * scaled_len
+        offset = max(canvas_len - scaled_len, min(0.0, offset))
+        return offset, (canvas_len / 2 - offset) / scaled_len
+
+    def pan(self, dx, dy):
+        """Moves the view by (dx, dy) canvas pixels; call update() afterwards."""
+        img_w, img_h = self.image_size
+        self.center_u -= dx / (img_w * self.scale)
+        self.center_v -= dy / (img_h * self.scale)
+
+    def zoom_at(self, canvas_x, canvas_y, zoom):
+        """Adjusts the pan so the image point under (canvas_x, canvas_y) stays there at the new zoom."""
+        image_x, image_y = self.canvas_to_image(canvas_x, canvas_y)
+        img_w, img_h = self.image_size
+        canvas_w, canvas_h = self.canvas_size
+        new_scale = self.base_scale * zoom
+        self.center_u = (image_x * new_scale + canvas_w / 2 - canvas_x) / (img_w * new_scale)
+        self.center_v = (image_y * new_scale + canvas_h / 2 - canvas_y) / (img_h * new_scale)
+
+    def canvas_to_image(self, x, y):
+        """Maps canvas coordinates to (float) image coordinates."""
+        return (x - self.x_offset) / self.scale, (y - self.y_offset) / self.scale
+
+    def image_to_canvas(self, x, y):
+        """Maps image coordinates to canvas coordinates."""
+        return x * self.scale + self.x_offset, y * self.scale + self.y_offset
+
+    def render(self, image, resample=Image.Resampling.LANCZOS):
+        """
+        Resamples only the visible region of `image` to canvas resolution.
+        Returns (visible_image, (canvas_x, canvas_y)), or (None, None) if nothing is visible.
+        """
+        canvas_w, canvas_h = self.canvas_size
+        img_w, img_h = self.image_size
+
+        # Visible rect in whole canvas pixels
+        cx0 = max(0, round(self.x_offset))
+        cy0 = max(0, round(self.y_offset))
+        cx1 = min(canvas_w, round(self.x_offset + img_w * self.scale))
+        cy1 = min(canvas_h, round(self.y_offset + img_h * self.scale))
+        if cx1 <= cx0 or cy1 <= cy0:
+            return None, None
+
+        # Same rect in image coordinates; resize() with a box only reads that region
+        ix0, iy0 = self.canvas_to_image(cx0, cy0)
+        ix1, iy1 = self.canvas_to_image(cx1, cy1)
+        box = (max(0.0, ix0), max(0.0, iy0), min(float(img_w), ix1), min(float(img_h), iy1))
+        visible = image.resize((cx1 - cx0, cy1 - cy0), resample, box=box)
+        return visible, (cx0, cy0)
@@ -0,0 +1,51 @@
+import cv2
+import numpy as np
+
+
+def capsule_roi_mask(p0, p1, radius, shape):
+    """
+    Rasterizes a capsule (a thick segment with round caps) from p0 to p1 into a
+    mask that only covers the segment's bounding box.
+    Returns ((x0, y0, x1, y1), roi_mask) in image coordinates, or (None, None) if
+    the capsule falls completely outside an image of the given shape.
+    """
+    h, w = shape[:2]
+    radius = max(0, int(radius))
+    x0 = max(0, min(p0[0], p1[0]) - radius)
+    y0 = max(0, min(p0[1], p1[1]) - radius)
+    x1 = min(w, max(p0[0], p1[0]) + radius + 1)
+    y1 = min(h, max(p0[1], p1[1]) + radius + 1)
+    if x1 <= x0 or y1 <= y0:
+        return None, None
+
+    roi_mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+    start = (int(p0[0] - x0), int(p0[1] - y0))
+    end = (int(p1[0] - x0), int(p1[1] - y0))
+    if radius == 0:
+        cv2.line(roi_mask, start, end, 255, 1)
+    else:
+        # Thick OpenCV lines have round caps, so a single call covers the whole
+        # capsule, including the degenerate case where start == end.
+        cv2.line(roi_mask, start, end, 255, 2 * radius + 1)
+    return (x0, y0, x1, y1), roi_mask
+
+
+def union_rect(a, b):
+    """Returns the bounding rect (x0, y0, x1, y1) covering both rects (either may be None)."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def diff_rect(before, after):
+    """Returns the bounding rect (x0, y0, x1, y1) of the pixels that differ between two arrays, or None."""
+    changed = before != after
+    if changed.ndim == 3:
+        changed = changed.any(axis=2)
+    rows = np.flatnonzero(changed.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(changed.any(axis=0))
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
@@ -1,43 +1,338 @@
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 from PIL import Image
 
+from src.utils.brush_utils import diff_rect
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # History memory budget (compressed bytes)
+DEFAULT_KEYFRAME_INTERVAL = 10  # Store a full image every N states of a layer
+ASSUMED_COMPRESSION_RATIO = 0.25  # Compressed/raw size assumed for pending entries until one is measured
+
+
+class _HistoryEntry:
+    """
+    A single pixel state of one layer: either a full keyframe or the changed region
+    (delta) relative to the previous state of that layer. The pixels are compressed
+    in a background thread; until then the raw array is kept.
+    """
+
+    is_params = False
+
+    def __init__(self, layer, array, rect=None, joined=False):
+        self.layer = layer
+        self.rect = rect  # (x0, y0, x1, y1) for deltas, None for keyframes
+        self.joined = joined  # Undone/redone together with the previous entry
+        self.shape = array.shape
+        self.dtype = array.dtype
+        self.raw_nbytes = array.nbytes
+        self._raw = array
+        self._compressed = None
+
+    @property
+    def is_keyframe(self):
+        return self.rect is None
+
+    @property
+    def nbytes(self):
+        # Read the raw array first: compress() publishes the compressed data before dropping it.
+        raw = self._raw
+        compressed = self._compressed
+        return len(compressed) if compressed is not None else raw.nbytes
+
+    @property
+    def compressed_nbytes(self):
+        """Compressed size, or None while the entry is still waiting for the compressor."""
+        compressed = self._compressed
+        return len(compressed) if compressed is not None else None
+
+    def compress(self):
+        raw = self._raw
+        if raw is None:
+            return
+        self._compressed = zlib.compress(np.ascontiguousarray(raw).tobytes(), 1)
+        self._raw = None
+
+    def array(self):
+        raw = self._raw
+        compressed = self._compressed
+        if compressed is not None:
+            return np.frombuffer(zlib.decompress(compressed), dtype=self.dtype).reshape(self.shape)
+        return raw
+
+
+class _ParamsEntry:
+    """A parameter change (old/new values); the image is recomputed from the parameters."""
+
+    is_params = True
+    is_keyframe = False
+    layer = None
+    joined = False
+    nbytes = 0
+
+    def __init__(self, old_params, new_params):
+        self.old_params = dict(old_params)
+        self.new_params = dict(new_params)
+
+    def compress(self):
+        pass
+
+
 class HistoryManager:
-    def __init__(self):
+    """
+    Undo/redo history mixing pixel states of named layers (for real pixel edits) and
+    lightweight parameter commands. `undo` and `redo` return a dict with the restored
+    values: layer name -> array (None when the layer had no state yet) and/or
+    "params" -> dict of parameter values.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL):
+        self.max_bytes = max_bytes
+        self.keyframe_interval = max(1, keyframe_interval)
         self.history = []
         self.history_index = -1
+        self._current = {}  # Layer -> pixels of its latest state at or before history_index (read-only)
+        self._lock = threading.RLock()  # The compressor thread evicts too, once real sizes are known
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-compress")
 
-    def save_state(self, image: Image.Image | None):
-        """Saves the current state of the image to the history."""
+    def save_state(self, image: Image.Image | np.ndarray | None, dirty_rect=None, layer="image", joined=False):
+        """
+        Saves the current state of a layer to the history.
+        Only the region that changed since the previous state of the layer is stored;
+        pass `dirty_rect` (x0, y0, x1, y1) when the caller already knows it. With
+        `joined=True` the state is undone/redone together with the previous entry.
+        Arrays are kept by reference (no copy), so they must not be modified afterwards.
+        """
         if image is None:
             return
 
-        # if we are in the middle of history, clear future states
-        if self.history_index < len(self.history) - 1:
-            self.history = self.history[: self.history_index + 1]
+        if isinstance(image, np.ndarray):
+            # ROI views would keep their whole parent buffer alive
+            arr = np.ascontiguousarray(image)
+        else:
+            arr = np.array(image)
 
-        # add a copy of the current image
-        self.history.append(image.copy())
-        self.history_index += 1
+        with self._lock:
+            self._truncate_future()
+            if self._needs_keyframe(layer, arr):
+                entry = _HistoryEntry(layer, arr, joined=joined)
+            else:
+                current = self._current[layer]
+                rect = self._clip_rect(dirty_rect, arr.shape) if dirty_rect else diff_rect(current, arr)
+                if rect is None:
+                    return  # Nothing changed
+                x0, y0, x1, y1 = rect
+                entry = _HistoryEntry(layer, arr[y0:y1, x0:x1].copy(), rect, joined=joined)
+
+            self._append(entry)
+            self._current[layer] = arr
+            self._evict()  # Counts this entry at its expected compressed size, see _budget_usage
+        self._executor.submit(self._compress, entry)
 
-    def undo(self) -> Image.Image | None:
+    def save_params(self, old_params, new_params):
+        """Records a parameter change as a command instead of an image snapshot."""
+        if old_params == new_params:
+            return
+        with self._lock:
+            self._truncate_future()
+            self._append(_ParamsEntry(old_params, new_params))
+            self._evict()
+
+    def undo(self):
         """Goes back to the previous state in history."""
-        if self.history_index > 0:
-            self.history_index -= 1
-            return self.history[self.history_index].copy()
-        return None
+        with self._lock:
+            if not self.can_undo():
+                return None
+            start = self._group_start(self.history_index)
+            entries = self.history[start : self.history_index + 1]
+            self.history_index = start - 1
+
+            restored = {}
+            for entry in entries:
+                if entry.is_params:
+                    restored["params"] = dict(entry.old_params)
+                elif entry.layer not in restored:
+                    state = self._reconstruct(entry.layer, self.history_index)
+                    self._current[entry.layer] = state
+                    restored[entry.layer] = state
+            return restored
 
-    def redo(self) -> Image.Image | None:
+    def redo(self):
         """Redoes a previously undone action."""
-        if self.history_index < len(self.history) - 1:
-            self.history_index += 1
-            return self.history[self.history_index].copy()
-        return None
+        with self._lock:
+            if not self.can_redo():
+                return None
+            end = self.history_index + 1
+            while end + 1 < len(self.history) and self.history[end + 1].joined:
+                end += 1
+            entries = self.history[self.history_index + 1 : end + 1]
+            self.history_index = end
+
+            restored = {}
+            for entry in entries:
+                if entry.is_params:
+                    restored["params"] = dict(entry.new_params)
+                    continue
+                current = self._current.get(entry.layer)
+                if entry.is_keyframe:
+                    state = entry.array().copy()
+                elif current is not None:
+                    # The next state is just the current one with the delta applied
+                    state = current.copy()
+                    self._apply(state, entry)
+                else:
+                    state = self._reconstruct(entry.layer, end)
+                self._current[entry.layer] = state
+                restored[entry.layer] = state
+            return restored
 
     def can_undo(self) -> bool:
-        return self.history_index > 0
+        return self.history_index > 0 and self._group_start(self.history_index) > 0
 
     def can_redo(self) -> bool:
         return self.history_index < len(self.history) - 1
 
+    def memory_usage(self) -> int:
+        """Returns the number of bytes held by the stored history states."""
+        return sum(entry.nbytes for entry in self.history)
+
+    def _budget_usage(self):
+        """
+        Bytes counted against max_bytes: entries still being compressed are counted at
+        the compression ratio measured on the compressed ones, not at their raw size.
+        """
+        compressed_total = raw_total = pending_raw = 0
+        for entry in self.history:
+            if entry.is_params:
+                continue
+            compressed = entry.compressed_nbytes
+            if compressed is None:
+                pending_raw += entry.raw_nbytes
+            else:
+                compressed_total += compressed
+                raw_total += entry.raw_nbytes
+        ratio = compressed_total / raw_total if raw_total else ASSUMED_COMPRESSION_RATIO
+        return compressed_total + int(pending_raw * ratio)
+
     def clear(self):
-        self.history = []
-        self.history_index = -1
+        with self._lock:
+            self.history = []
+            self.history_index = -1
+            self._current = {}
+
+    # ---------- internals ----------
+    def _append(self, entry):
+        self.history.append(entry)
+        self.history_index += 1
+
+    def _truncate_future(self):
+        # if we are in the middle of history, clear future states
+        if self.history_index < len(self.history) - 1:
+            self.history = self.history[: self.history_index + 1]
+
+    def _group_start(self, index):
+        while index > 0 and self.history[index].joined:
+            index -= 1
+        return index
+
+    def _needs_keyframe(self, layer, arr):
+        current = self._current.get(layer)
+        if current is None or current.shape != arr.shape or current.dtype != arr.dtype:
+            return True
+        steps_since_keyframe = 0
+        for entry in reversed(self.history):
+            if entry.layer != layer:
+                continue
+            if entry.is_keyframe:
+                break
+            steps_since_keyframe += 1
+        return steps_since_keyframe + 1 >= self.keyframe_interval
+
+    def _reconstruct(self, layer, index):
+        """
+        Rebuilds the pixels of the latest state of `layer` at or before `index` from
+        the nearest keyframe. Returns None if the layer has no state up to there.
+        """
+        start = index
+        while start >= 0 and not (self.history[start].layer == layer and self.history[start].is_keyframe):
+            start -= 1
+        if start < 0:
+            return None
+        arr = self.history[start].array().copy()
+        for entry in self.history[start + 1 : index + 1]:
+            if entry.layer == layer:
+                self._apply(arr, entry)
+        return arr
+
+    def _compress(self, entry):
+        """Runs on the compressor thread: compresses `entry`, then evicts with its real size."""
+        entry.compress()
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        """
+        Brings the history within max_bytes: drops the oldest undo steps first, then the
+        newest redo steps, and as a last resort the remaining undo step too, so that only
+        the current state is left. The state of every layer at the cut is folded into
+        keyframes that form the new base step, so every remaining step stays undoable and
+        new deltas always have a keyframe to build on.
+        """
+        while self._budget_usage() > self.max_bytes:
+            # The first step (group) is the base state and is never undone; drop it
+            # together with the step after it, which becomes the new base.
+            cut = 1
+            while cut < len(self.history) and self.history[cut].joined:
+                cut += 1
+            cut += 1
+            while cut < len(self.history) and self.history[cut].joined:
+                cut += 1
+
+            if self.can_redo() and cut > self.history_index:
+                # Newest redo step: undone states are the least likely to be needed again
+                self.history = self.history[: max(self._group_start(len(self.history) - 1), self.history_index + 1)]
+                continue
+            if cut > self.history_index + 1:
+                return  # Only the current state is left
+
+            base = []
+            layers = {entry.layer: None for entry in self.history if not entry.is_params}
+            for layer in layers:
+                entry = self._base_entry(layer, cut - 1)
+                if entry is not None:
+                    base.append(entry)
+            for i, entry in enumerate(base):
+                entry.joined = i > 0
+
+            self.history = base + self.history[cut:]
+            self.history_index += len(base) - cut
+
+    def _base_entry(self, layer, index):
+        """Returns a keyframe entry holding the state of `layer` at `index` (None if it has none)."""
+        last = index
+        while last >= 0 and self.history[last].layer != layer:
+            last -= 1
+        if last < 0:
+            return None
+        if self.history[last].is_keyframe:
+            return self.history[last]  # Already a full state, reuse it as is
+        entry = _HistoryEntry(layer, self._reconstruct(layer, last))
+        entry.compress()
+        return entry
+
+    @staticmethod
+    def _apply(arr, entry):
+        x0, y0, x1, y1 = entry.rect
+        arr[y0:y1, x0:x1] = entry.array()
+
+    @staticmethod
+    def _clip_rect(rect, shape):
+        h, w = shape[:2]
+        x0, y0, x1, y1 = rect
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(w, x1), min(h, y1)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return x0, y0, x1, y1
@@ -0,0 +1,151 @@
+import numpy as np
+from PIL import Image
+
+
+class ImageLayer:
+    """
+    One canonical RGBA pixel buffer (H x W x 4, uint8), optionally restricted to a
+    region of interest. The buffer is treated as read-only: PIL images are zero-copy
+    views of it, and writers take their own copy with `writable()` (copy-on-write).
+    """
+
+    def __init__(self, buffer, rect=None):
+        self._buffer = buffer  # Full C-contiguous array
+        self._rect = rect  # (x0, y0, x1, y1) ROI inside the buffer, None for the whole buffer
+        self._view = None
+
+    @classmethod
+    def from_image(cls, image):
+        if image.mode != "RGBA":
+            image = image.convert("RGBA")
+        # np.asarray on a PIL image goes through a single tobytes() copy
+        return cls(np.asarray(image))
+
+    @property
+    def array(self):
+        if self._rect is None:
+            return self._buffer
+        x0, y0, x1, y1 = self._rect
+        return self._buffer[y0:y1, x0:x1]
+
+    @property
+    def size(self):
+        h, w = self.array.shape[:2]
+        return w, h
+
+    @property
+    def is_roi(self):
+        return self._rect is not None
+
+    def view(self) -> Image.Image:
+        """Returns a read-only PIL image sharing this layer's memory."""
+        if self._view is None:
+            self._view = self._make_view()
+        return self._view
+
+    def _make_view(self):
+        if self._rect is None:
+            return Image.frombuffer("RGBA", self.size, self._buffer, "raw", "RGBA", 0, 1)
+        x0, y0, _, _ = self._rect
+        buf_w = self._buffer.shape[1]
+        data = memoryview(self._buffer.reshape(-1))[(y0 * buf_w + x0) * 4 :]
+        try:
+            # Map the ROI in place using the parent's row stride
+            return Image.frombuffer("RGBA", self.size, data, "raw", "RGBA", buf_w * 4, 1)
+        except ValueError:
+            # The last ROI row ends before a full stride is left in the buffer
+            return Image.fromarray(np.ascontiguousarray(self.array))
+
+    def writable(self):
+        """Returns a private, writable copy of the pixels (copy-on-write)."""
+        return self.array.copy()
+
+    def crop(self, rect):
+        """Returns a layer for `rect` (relative to this layer) that shares this buffer."""
+        x0, y0, x1, y1 = rect
+        if self._rect is not None:
+            x0, y0, x1, y1 = x0 + self._rect[0], y0 + self._rect[1], x1 + self._rect[0], y1 + self._rect[1]
+        return ImageLayer(self._buffer, (x0, y0, x1, y1))
+
+    def committed(self):
+        """Returns a layer that owns exactly its pixels, releasing the parent buffer of an ROI."""
+        if self._rect is None:
+            return self
+        return ImageLayer(np.ascontiguousarray(self.array))
+
+
+class ImageState:
+    """
+    Named image layers of the editor ("source", "processed", "display"). Layers can share
+    the same buffer, so loading an image keeps a single copy of its pixels until
+    something actually writes to one of them.
+
+    User edits live in `mask`, a single-channel uint8 array at source resolution
+    (255 = keep, 0 = erased) that the pipeline applies to the edge map, so they survive
+    preview regeneration. It stays None until the first brush stroke.
+    """
+
+    def __init__(self):
+        self.layers = {}
+        self.mask = None
+
+    def layer(self, name):
+        return self.layers.get(name)
+
+    def view(self, name):
+        layer = self.layers.get(name)
+        return layer.view() if layer is not None else None
+
+    def load(self, image):
+        """Makes `image` the new source; every other layer starts out sharing its buffer."""
+        source = ImageLayer.from_image(image)
+        self.layers = {"source": source, "processed": source, "display": source}
+        self.mask = None
+
+    def mask_writable(self):
+        """Returns a private, writable copy of the edit mask (all 255 if there is none yet)."""
+        if self.mask is None:
+            w, h = self.layers["source"].size
+            return np.full((h, w), 255, dtype=np.uint8)
+        return self.mask.copy()
+
+    def set_mask(self, mask):
+        """Sets the edit mask without copying it (None clears all edits)."""
+        self.mask = mask
+
+    def set_array(self, name, array):
+        """Sets a layer from an RGBA array without copying it (the array becomes the layer's buffer)."""
+        self.layers[name] = ImageLayer(np.ascontiguousarray(array))
+
+    def set_image(self, name, image):
+        """Sets a layer from a PIL image, sharing memory when it is a view of another layer."""
+        if image is None:
+            self.layers.pop(name, None)
+            return
+        for layer in self.layers.values():
+            if layer._view is image:
+                self.layers[name] = layer
+                return
+        self.layers[name] = ImageLayer.from_image(image)
+
+    def share(self, name, other):
+        """Makes layer `name` share the buffer of layer `other`."""
+        self.layers[name] = self.layers[other]
+
+    def crop(self, rect):
+        """Crops the source to `rect` (source coordinates) as an ROI view; all layers follow it."""
+        source = self.layers["source"].crop(rect)
+        self.layers = {"source": source, "processed": source, "display": source}
+        if self.mask is not None:
+            x0, y0, x1, y1 = rect
+            self.mask = self.mask[y0:y1, x0:x1]
+
+    def commit(self):
+        """Turns ROI layers into standalone buffers so the uncropped pixels can be freed."""
+        committed = {}
+        for name, layer in list(self.layers.items()):
+            if id(layer) not in committed:
+                committed[id(layer)] = layer.committed()
+            self.layers[name] = committed[id(layer)]
+        if self.mask is not None:
+            self.mask = np.ascontiguousarray(self.mask)
@@ -0,0 +1,125 @@
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from logging.handlers import RotatingFileHandler
+
+HEARTBEAT_INTERVAL_MS = 100  # How often the Tk loop is asked to check in
+STALL_THRESHOLD_MS = 250  # Event-loop lag reported as a stall
+STALL_LOG_PATH = "data/ui_stalls.log"
+STALL_LOG_MAX_BYTES = 1024 * 1024
+STALL_LOG_BACKUPS = 3
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class MainLoopWatchdog:
+    """
+    Measures Tk event-loop lag with a periodic `after` heartbeat. A monitor thread
+    samples the main thread's stack while a heartbeat is overdue; when the loop comes
+    back, the stall duration and the function that was blocking it are logged to a
+    rotating file.
+    """
+
+    def __init__(
+        self,
+        root,
+        interval_ms=HEARTBEAT_INTERVAL_MS,
+        threshold_ms=STALL_THRESHOLD_MS,
+        log_path=STALL_LOG_PATH,
+    ):
+        self.root = root
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.max_lag = 0.0  # Worst lag seen, in seconds
+        self.stall_count = 0
+        self._main_thread_id = threading.get_ident()
+        self._last_beat = None  # Monotonic time of the last heartbeat, None until the loop runs
+        self._samples = []  # Main-thread stacks sampled during the current stall
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.logger = self._make_logger(log_path)
+
+    @staticmethod
+    def _make_logger(log_path):
+        logger = logging.getLogger("insta_draw.ui_watchdog")
+        if not logger.handlers:
+            os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+            handler = RotatingFileHandler(
+                log_path, maxBytes=STALL_LOG_MAX_BYTES, backupCount=STALL_LOG_BACKUPS, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+        return logger
+
+    def start(self):
+        """Starts the heartbeat (must be called from the Tk thread) and the monitor thread."""
+        self._main_thread_id = threading.get_ident()
+        self.root.after(int(self.interval * 1000), self._beat)
+        threading.Thread(target=self._monitor, name="ui-watchdog", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _beat(self):
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_beat
+            samples, self._samples = self._samples, []
+            self._last_beat = now
+        if last is not None:
+            lag = now - last - self.interval
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self._report(lag, samples)
+        if not self._stop.is_set():
+            self.root.after(int(self.interval * 1000), self._beat)
+
+    def _monitor(self):
+        # Sample often enough to catch the culprit of a stall just over the threshold
+        period = min(self.interval, self.threshold) / 2
+        while not self._stop.wait(period):
+            with self._lock:
+                last = self._last_beat
+            if last is None or time.monotonic() - last - self.interval < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._main_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            with self._lock:
+                if self._last_beat == last:  # Still the same stall
+                    self._samples.append(stack)
+
+    def _report(self, lag, samples):
+        self.stall_count += 1
+        if not samples:
+            self.logger.warning("Travamento da interface: %.0f ms (sem amostra de pilha)", lag * 1000)
+            return
+        # The culprit is the project function seen most often while the loop was blocked
+        culprits = Counter(self._culprit(stack) for stack in samples)
+        culprit, _ = culprits.most_common(1)[0]
+        stack_text = "".join(traceback.format_list(samples[-1]))
+        self.logger.warning(
+            "Travamento da interface: %.0f ms em %s (%d amostras)\n%s",
+            lag * 1000,
+            culprit,
+            len(samples),
+            stack_text,
+        )
+        print(f"⚠️ Interface travada por {lag * 1000:.0f} ms em {culprit}")
+
+    @staticmethod
+    def _culprit(stack):
+        """Innermost frame of project code (falls back to the innermost frame)."""
+        for frame in reversed(stack):
+            path = os.path.abspath(frame.filename)
+            if path.startswith(PROJECT_ROOT) and "site-packages" not in path and not path.endswith("ui_watchdog.py"):
+                return f"{frame.name} ({os.path.relpath(path, PROJECT_ROOT)}:{frame.lineno})"
+        frame = stack[-1]
+        return f"{frame.name} ({frame.filename}:{frame.lineno})"
@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from src.automation import adb_client
+from src.automation.fake_adb import FakeAdbServer, FakeDevice
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WINDOW_DUMP = os.path.join(REPO_ROOT, "window_dump.xml")
+
+
+@pytest.fixture
+def fake_device():
+    return FakeDevice("fake-1", draw_dump=WINDOW_DUMP, time_scale=0, seed=0)
+
+
+@pytest.fixture
+def fake_server(fake_device, monkeypatch):
+    """A FakeAdbServer on a free port; get_client() (no serial) talks to it."""
+    server = FakeAdbServer([fake_device], port=0).start()
+    port = server.server_address[1]
+    monkeypatch.setattr(adb_client, "_clients", {None: adb_client.AdbClient(None, port=port)})
+    monkeypatch.delenv("ANDROID_SERIAL", raising=False)
+    yield server
+    adb_client._clients[None].close()
+    server.stop()
+
+
+@pytest.fixture
+def device_session(fake_server, tmp_path):
+    """A fresh DeviceSession for the fake device, with its palette cache under tmp_path."""
+    from src.automation.device_session import DeviceSession, using_session
+
+    session = DeviceSession()
+    session.palette_cache.path = str(tmp_path / "palette_coords.json")
+    with using_session(session):
+        yield session
@@ -0,0 +1,72 @@
+import pytest
+
+from src.automation import adb_utils
+from src.automation.adb_client import AdbClient, AdbError
+
+
+def _client(server, serial=None):
+    return AdbClient(serial, port=server.server_address[1])
+
+
+def test_host_services(fake_server):
+    client = _client(fake_server)
+    assert client.version() == 0x29
+    assert client.devices() == [("fake-1", "device")]
+
+
+def test_transport_by_serial(fake_server):
+    assert _client(fake_server, "fake-1").shell("getprop ro.serialno").strip() == "fake-1"
+    with pytest.raises(AdbError, match="not found"):
+        _client(fake_server, "missing").shell("echo hi")
+
+
+def test_shell_and_exec(fake_server):
+    client = _client(fake_server)
+    assert client.shell("wm size").strip() == "Physical size: 1080x2340"
+    raw = client.exec_out("screencap")
+    assert raw[:8] == (1080).to_bytes(4, "little") + (2340).to_bytes(4, "little")
+    assert len(raw) == 16 + 1080 * 2340 * 4
+
+
+def test_sync_send_recv_stat(fake_server, tmp_path):
+    client = _client(fake_server)
+    data = bytes(range(256)) * 600  # More than one sync DATA chunk
+    client.write_file("/data/local/tmp/blob", data)
+    assert client.read_file("/data/local/tmp/blob") == data
+    assert client.stat("/data/local/tmp/blob")[1] == len(data)
+    assert client.stat("/data/local/tmp/missing")[:2] == (0, 0)
+    with pytest.raises(AdbError):
+        client.read_file("/data/local/tmp/missing")
+
+    local = tmp_path / "pulled.bin"
+    client.pull("/data/local/tmp/blob", str(local))
+    assert local.read_bytes() == data
+    client.close()
+
+
+def test_run_adb_command_native(fake_server):
+    assert adb_utils.run_adb_command("adb shell echo hello") == "hello"
+    assert adb_utils.run_adb_command("adb exec-out getprop ro.product.cpu.abi") == "arm64-v8a"
+
+
+def test_shell_with_status(fake_server):
+    client = _client(fake_server)
+    assert client.shell_with_status("echo hi") == ("hi\n", 0)
+    output, status = client.shell_with_status("cat /data/local/tmp/missing")
+    assert status == 1 and "No such file" in output
+
+
+def test_run_adb_command_reports_failing_device_commands(fake_server):
+    assert adb_utils.run_adb_command("adb shell cat /data/local/tmp/missing") is None
+    assert adb_utils.run_adb_command("adb shell input bogus 1 2") is None
+    assert adb_utils.run_adb_command("adb shell dumpsys window | grep mCurrentFocus").startswith("mCurrentFocus=")
+
+
+def test_run_adb_command_unbalanced_quotes(fake_server, monkeypatch):
+    # Not parsed natively: goes to the shell, which reports the error instead of raising
+    monkeypatch.setattr(adb_utils.subprocess, "run", _failing_run)
+    assert adb_utils.run_adb_command("adb shell echo 'unterminated") is None
+
+
+def _failing_run(command, **kwargs):
+    raise adb_utils.subprocess.CalledProcessError(2, command, stderr="Syntax error: Unterminated quoted string")
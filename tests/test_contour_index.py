@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+
+from src.processing.contour_index import TiledContourIndex
+
+
+def _draw(edges, rng, value):
+    """Short lines and small circles, so most edits only touch a few tiles."""
+    h, w = edges.shape
+    p0 = rng.integers(0, (w, h))
+    if rng.random() < 0.5:
+        p1 = p0 + rng.integers(-40, 41, size=2)
+        cv2.line(edges, tuple(map(int, p0)), tuple(map(int, p1)), value, int(rng.integers(1, 4)))
+    else:
+        cv2.circle(edges, tuple(map(int, p0)), int(rng.integers(3, 25)), value, int(rng.integers(1, 3)))
+
+
+def _signatures(contours):
+    return sorted(contour.tobytes() for contour in contours)
+
+
+def test_incremental_update_matches_full_trace():
+    rng = np.random.default_rng(0)
+    edges = np.zeros((512, 640), dtype=np.uint8)
+    for _ in range(40):
+        _draw(edges, rng, 255)
+    index = TiledContourIndex(edges, tile_size=64)
+
+    for _ in range(60):
+        before = edges.copy()
+        _draw(edges, rng, 255 if rng.random() < 0.6 else 0)  # Erasing can split or remove contours
+        changed = np.argwhere(before != edges)
+        if not len(changed):
+            continue
+        (y0, x0), (y1, x1) = changed.min(axis=0), changed.max(axis=0) + 1
+        index.update(edges, (int(x0), int(y0), int(x1), int(y1)))
+
+        full, _ = cv2.findContours(edges, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+        assert _signatures(contour for _, contour in index.items()) == _signatures(full)
+
+
+def test_untouched_contours_keep_their_ids():
+    edges = np.zeros((256, 256), dtype=np.uint8)
+    cv2.rectangle(edges, (10, 10), (40, 40), 255, 1)
+    cv2.rectangle(edges, (200, 200), (240, 240), 255, 1)
+    index = TiledContourIndex(edges, tile_size=64)
+    far_id = next(contour_id for contour_id, bbox in index.bboxes.items() if bbox[0] >= 200)
+    index.derived[far_id] = {"color": "Red"}
+
+    cv2.rectangle(edges, (10, 10), (40, 40), 0, 1)
+    removed, added = index.update(edges, (10, 10, 41, 41))
+    assert removed and not added
+    assert far_id in index.contours and index.derived[far_id] == {"color": "Red"}
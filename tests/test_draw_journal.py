@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from src.automation.draw_journal import DrawJournal, read_journal
+
+TRACES = {"grouped_traces": [{"paths": [[[0, 0], [1, 1]]] * 3}, {"paths": [[[5, 5], [6, 6]]] * 2}]}
+OTHER_TRACES = {"grouped_traces": [{"paths": [[[9, 9]]]}]}
+
+
+def _run(path, strokes, stop_in=None, resume=False):
+    """Journals `strokes` [(group, stroke)] as finished, then optionally stops inside one (group, stroke, point)."""
+    journal = DrawJournal(path=str(path)).begin(TRACES, resume=resume)
+    journal.color_selected(0, 1, 4)
+    for group, stroke in strokes:
+        journal.stroke_started(group, stroke)
+        journal.stroke_finished(2)
+    if stop_in:
+        journal.stroke_started(*stop_in[:2])
+        journal.point = stop_in[2]
+    journal.close("ESC")
+    return journal
+
+
+def test_resume_at_the_first_unfinished_stroke(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    _run(path, [(0, 0), (0, 1), (0, 2)])
+    journal = DrawJournal(path=str(path)).begin(TRACES, resume=True)
+    assert journal.resume_at == (0, 3) and journal.resume_palette == (1, 4)
+    assert journal.skip(0, 2) and not journal.skip(0, 3) and not journal.skip(1, 0)
+    assert journal.first_point(1, 0) == 0
+
+
+def test_resume_inside_the_stroke_that_was_interrupted(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    _run(path, [(0, 0), (0, 1), (0, 2)], stop_in=(1, 0, 7))
+    journal = DrawJournal(path=str(path)).begin(TRACES, resume=True)
+    assert journal.resume_at == (1, 0)
+    assert journal.first_point(1, 0) == 7 and journal.first_point(1, 1) == 0
+    journal.close()
+
+    # The resumed run finishes that stroke: a later resume starts after it
+    _run(path, [(1, 0)], resume=True)
+    journal = DrawJournal(path=str(path)).begin(TRACES, resume=True)
+    assert journal.resume_at == (1, 1) and journal.first_point(1, 1) == 0
+
+
+def test_resume_refuses_another_drawing(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    _run(path, [(0, 0)])
+    with pytest.raises(ValueError):
+        DrawJournal(path=str(path)).begin(OTHER_TRACES, resume=True)
+
+
+def test_new_run_keeps_the_unfinished_journal_aside(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    _run(path, [(0, 0)])
+    DrawJournal(path=str(path)).begin(OTHER_TRACES).close()
+    assert os.path.exists(f"{path}.prev")
+    assert DrawJournal(path=f"{path}.prev").begin(TRACES, resume=True).resume_at == (0, 1)
+
+
+def test_line_cut_by_a_crash_is_ignored(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    _run(path, [(0, 0), (0, 1)])
+    with open(path, "a") as f:
+        f.write('{"event": "stroke", "gro')
+    assert read_journal(str(path))[-1]["event"] == "stop"
+    assert DrawJournal(path=str(path)).begin(TRACES, resume=True).resume_at == (0, 2)
+
+    # The cut line is dropped, so what the resumed run journals is read back
+    _run(path, [(0, 2)], resume=True)
+    assert DrawJournal(path=str(path)).begin(TRACES, resume=True).resume_at == (0, 3)
@@ -0,0 +1,81 @@
+import struct
+
+from src.automation.adb_client import get_client
+from src.automation.evdev_draw import (
+    ABS_MT_POSITION_X,
+    ABS_MT_POSITION_Y,
+    ABS_MT_PRESSURE,
+    ABS_MT_TRACKING_ID,
+    BTN_TOUCH,
+    EV_ABS,
+    EV_KEY,
+    EV_SYN,
+    TouchDevice,
+    encode_stroke,
+    find_touch_device,
+    parse_getevent,
+)
+
+GETEVENT = """add device 1: /dev/input/event0
+  name:     "gpio-keys"
+  events:
+    KEY (0001): 0072  0073  0074
+  input props:
+    <none>
+add device 2: /dev/input/event3
+  name:     "sec_touchscreen"
+  events:
+    KEY (0001): 014a
+    ABS (0003): 002f  : value 0, min 0, max 9, fuzz 0, flat 0, resolution 0
+                0035  : value 0, min 0, max 4095, fuzz 0, flat 0, resolution 0
+                0036  : value 0, min 0, max 4095, fuzz 0, flat 0, resolution 0
+                0039  : value 0, min 0, max 65535, fuzz 0, flat 0, resolution 0
+                003a  : value 0, min 0, max 255, fuzz 0, flat 0, resolution 0
+  input props:
+    INPUT_PROP_DIRECT
+"""
+
+
+def _decode(device, data):
+    """input_event records -> (type, code, value) tuples."""
+    size = device.event_size
+    return [struct.unpack(device._format, data[i : i + size])[2:] for i in range(0, len(data), size)]
+
+
+def test_parse_getevent():
+    keys, touch = parse_getevent(GETEVENT)
+    assert keys == ("/dev/input/event0", "gpio-keys", {})
+    path, name, axes = touch
+    assert (path, name) == ("/dev/input/event3", "sec_touchscreen")
+    assert axes[ABS_MT_POSITION_X] == (0, 4095) and axes[ABS_MT_PRESSURE] == (0, 255)
+    assert sorted(axes) == [0x2F, 0x35, 0x36, 0x39, 0x3A]
+
+
+def test_find_touch_device(fake_server):
+    device = find_touch_device(get_client())
+    assert device.path == "/dev/input/event2" and device.name == "fake_touchscreen"
+    assert device.event_size in (16, 24)
+
+
+def test_axis_mapping_is_clamped():
+    device = TouchDevice("/dev/input/event3", "touch", parse_getevent(GETEVENT)[1][2], 24)
+    assert device.to_axis(0, 0, (1080, 2400)) == (0, 0)
+    assert device.to_axis(1079, 2399, (1080, 2400)) == (4095, 4095)
+    assert device.to_axis(5000, -10, (1080, 2400)) == (4095, 0)
+
+
+def test_encode_stroke():
+    for event_size in (16, 24):
+        device = TouchDevice("/dev/input/event3", "touch", parse_getevent(GETEVENT)[1][2], event_size)
+        down, moves, up = encode_stroke(device, [(0, 0), (540, 1200), (1079, 2399)], (1080, 2400), 7)
+
+        down_events = _decode(device, down)
+        assert (EV_ABS, ABS_MT_TRACKING_ID, 7) in down_events and (EV_KEY, BTN_TOUCH, 1) in down_events
+        assert down_events[-1] == (EV_SYN, 0, 0)
+        assert len(moves) == 2 * 3 * event_size  # Same-size MOVE reports, so frames can be cut by bytes
+        assert _decode(device, moves)[3:] == [
+            (EV_ABS, ABS_MT_POSITION_X, 4095),
+            (EV_ABS, ABS_MT_POSITION_Y, 4095),
+            (EV_SYN, 0, 0),
+        ]
+        assert _decode(device, up) == [(EV_ABS, ABS_MT_TRACKING_ID, -1), (EV_KEY, BTN_TOUCH, 0), (EV_SYN, 0, 0)]
@@ -0,0 +1,37 @@
+import numpy as np
+
+from src.automation.adb_automation import run_adb_automation, select_color
+from src.automation.adb_draw import draw_strokes_with_adb
+from src.automation.evdev_draw import DEVICE_PLAYER_PATH
+from src.utils.color_utils import INSTAGRAM_PALETTE
+
+
+def test_navigation_palette_and_stroke(fake_device, device_session):
+    assert run_adb_automation()
+    assert fake_device.screen == "draw" and fake_device.sharpie_selected
+
+    select_color(2, 3)
+    assert (fake_device.palette_page, fake_device.selected_color) == (2, (2, 3))
+    assert fake_device.color == tuple(INSTAGRAM_PALETTE[2][3]["rgb"])
+
+    blue = INSTAGRAM_PALETTE[1][1]
+    traces = {
+        "raw_bbox_width": 100,
+        "raw_bbox_height": 50,
+        "grouped_traces": [
+            {
+                "palette_color": {"page_index": 1, "color_index": 1, "name": blue["name"], "rgb_value": blue["rgb"]},
+                "paths": [[[10, 10], [50, 40], [90, 10]]],
+            }
+        ],
+    }
+    draw_strokes_with_adb(traces)
+    motions = [touch["action"] for touch in fake_device.touches if touch["action"] in ("DOWN", "MOVE", "UP")]
+    assert motions[0] == "DOWN" and motions[-1] == "UP" and "MOVE" in motions
+    assert np.all(fake_device.canvas == blue["rgb"], axis=2).any()
+
+
+def test_sh_only_replays_the_evdev_player(fake_device):
+    fake_device.write_file("/data/local/tmp/other.sh", b"echo hi\n")
+    assert fake_device.shell("sh /data/local/tmp/other.sh a b c d e f g") == b"hi\n"
+    assert fake_device.read_file(DEVICE_PLAYER_PATH) is None
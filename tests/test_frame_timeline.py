@@ -0,0 +1,39 @@
+import pytest
+
+from src.automation.frame_timeline import correlate, summarize
+
+
+def _sample(start, end, frames=60, janky=0):
+    return {"start": start, "end": end, "frames": frames, "janky": janky, "p50_ms": 8, "p90_ms": 12, "p99_ms": 16}
+
+
+def _stroke(index, start, end, points):
+    return {"group": 0, "stroke": index, "start": start, "end": end, "points": points}
+
+
+def test_correlate_splits_strokes_by_overlap():
+    samples = [_sample(0.0, 1.0, janky=6), _sample(1.0, 2.0), _sample(2.0, 3.0, frames=0)]
+    strokes = [_stroke(0, 0.5, 1.5, 100), _stroke(1, 1.2, 1.2, 10)]  # The second one took no time
+    first, second, idle = correlate(samples, strokes)
+
+    assert first["strokes"] == [[0, 0]] and first["rate"] == 50.0 and first["jank"] == 0.1
+    assert second["strokes"] == [[0, 0], [0, 1]] and second["rate"] == 60.0
+    assert idle["strokes"] == [] and idle["rate"] == 0.0 and idle["jank"] == 0.0
+
+
+def test_summarize_finds_the_lowest_rate_that_drops_frames():
+    samples = correlate(
+        [_sample(0, 1), _sample(1, 2, janky=5), _sample(2, 3, janky=30), _sample(3, 4, janky=60)],
+        [_stroke(0, 0, 1, 20), _stroke(1, 1, 2, 70), _stroke(2, 2, 3, 130), _stroke(3, 3, 4, 400)],
+    )
+    samples.append(dict(_sample(4, 5, janky=60), strokes=[], rate=0.0, jank=1.0))  # Idle: left out
+
+    summary = summarize(samples)
+    assert [row["rate"] for row in summary["by_rate"]] == [0, 50, 100, 400]
+    assert [row["jank"] for row in summary["by_rate"]] == [0.0, pytest.approx(5 / 60, abs=1e-3), 0.5, 1.0]
+    assert summary["drop_rate"] == 100
+
+
+def test_summarize_ignores_buckets_with_too_few_frames():
+    samples = correlate([_sample(0, 1, frames=10, janky=10)], [_stroke(0, 0, 1, 300)])
+    assert summarize(samples)["drop_rate"] is None
@@ -0,0 +1,74 @@
+import numpy as np
+
+from src.utils.history_manager import HistoryManager
+
+
+def _noise(rng, shape=(32, 32, 3)):
+    return rng.integers(0, 256, size=shape, dtype=np.uint8)  # Incompressible, so sizes are predictable
+
+
+def _settle(history):
+    history._executor.submit(int).result()  # Single worker: every earlier compression (and eviction) is done
+
+
+def test_undo_redo_return_the_exact_arrays():
+    rng = np.random.default_rng(0)
+    history = HistoryManager(keyframe_interval=3)
+    image = _noise(rng)
+    states = [image]
+    history.save_state(image)
+    for i in range(8):
+        image = image.copy()
+        x, y = rng.integers(0, 24, size=2)
+        image[y : y + 8, x : x + 8] = rng.integers(0, 256, size=(8, 8, 3))
+        states.append(image)
+        history.save_state(image, dirty_rect=(x, y, x + 8, y + 8) if i % 2 else None)
+    history.save_params({"blur": 1}, {"blur": 3})
+    _settle(history)
+
+    assert history.undo() == {"params": {"blur": 1}}
+    for expected in reversed(states[:-1]):
+        assert np.array_equal(history.undo()["image"], expected)
+    assert not history.can_undo()
+    for expected in states[1:]:
+        assert np.array_equal(history.redo()["image"], expected)
+    assert history.redo() == {"params": {"blur": 3}}
+    assert not history.can_redo()
+
+
+def test_budget_is_enforced_with_real_compressed_sizes():
+    rng = np.random.default_rng(1)
+    history = HistoryManager(max_bytes=20_000)
+    states = [_noise(rng) for _ in range(30)]
+    for state in states:
+        history.save_state(state)
+    _settle(history)
+
+    assert history.memory_usage() <= 20_000
+    assert history.can_undo()
+    while history.can_undo():
+        restored = history.undo()["image"]
+    assert any(np.array_equal(restored, state) for state in states[:-1])
+
+
+def test_eviction_drops_redo_steps_then_folds_into_the_current_state():
+    rng = np.random.default_rng(2)
+    history = HistoryManager()
+    states = [_noise(rng) for _ in range(6)]
+    for state in states:
+        history.save_state(state)
+    _settle(history)
+    history.undo()
+    history.undo()
+
+    history.max_bytes = 7_000  # Room for two states: the redo steps go before the last undo step
+    history._evict()
+    assert history.memory_usage() <= 7_000
+    assert history.can_undo() and not history.can_redo()
+
+    history.max_bytes = 5_000  # Room for a single state: only the current one is kept
+    history._evict()
+    assert history.memory_usage() <= 5_000
+    assert not history.can_undo()
+    history.save_state(states[0])  # New deltas still build on the folded keyframe
+    assert np.array_equal(history._current["image"], states[0])
@@ -0,0 +1,46 @@
+import numpy as np
+
+from src.automation.fake_adb import ScrcpyControlRecorder
+from src.automation.scrcpy_draw import (
+    ACTION_DOWN,
+    ACTION_MOVE,
+    ACTION_UP,
+    decode_touch_event,
+    draw_strokes_with_scrcpy,
+    encode_touch_event,
+)
+from src.utils.color_utils import INSTAGRAM_PALETTE
+
+
+def test_touch_event_round_trip():
+    message = encode_touch_event(ACTION_MOVE, 100, 200, (1080, 2336))
+    assert len(message) == 32
+    event = decode_touch_event(message)
+    assert (event["action"], event["x"], event["y"], event["screen_size"]) == (ACTION_MOVE, 100, 200, (1080, 2336))
+
+
+def test_draw_strokes_with_scrcpy_records_events(fake_device, device_session):
+    fake_device.screen = "draw"
+    recorder = ScrcpyControlRecorder(fake_device).start()
+    blue = INSTAGRAM_PALETTE[1][1]
+    traces = {
+        "raw_bbox_width": 100,
+        "raw_bbox_height": 50,
+        "grouped_traces": [
+            {
+                "palette_color": {"page_index": 1, "color_index": 1, "name": blue["name"], "rgb_value": blue["rgb"]},
+                "paths": [[[10, 10], [50, 40], [90, 10]], [[20, 45], [80, 45]]],
+            }
+        ],
+    }
+    try:
+        draw_strokes_with_scrcpy(traces, control_address=recorder.address, events_per_second=10000)
+    finally:
+        recorder.stop()
+
+    actions = [event["action"] for event in recorder.events]
+    assert actions.count(ACTION_DOWN) == actions.count(ACTION_UP) == 2
+    assert actions[0] == ACTION_DOWN and actions[-1] == ACTION_UP
+    assert {event["screen_size"] for event in recorder.events} == {(1080, 2336)}  # Multiples of 8
+    assert fake_device.color == tuple(blue["rgb"])
+    assert (np.abs(fake_device.canvas.astype(int) - blue["rgb"]).sum(axis=2) == 0).any()
@@ -0,0 +1,49 @@
+import numpy as np
+
+from src.processing.stroke_set import Stroke, StrokeSet
+
+RED = {"name": "Red", "rgb_value": (255, 0, 0)}
+BLUE = {"name": "Blue", "rgb_value": (0, 0, 255)}
+SQUARE = [[10, 10], [50, 10], [50, 50], [10, 50]]
+
+
+def _set():
+    rng = np.random.default_rng(0)
+    strokes = [Stroke(SQUARE, RED, closed=True), Stroke([[100, 100], [190, 100]], BLUE)]
+    for _ in range(50):  # Filler far from the strokes under test, so the grid has many cells
+        x, y = rng.integers(300, 900, size=2)
+        strokes.append(Stroke([[x, y], [x + 5, y + 5]], RED))
+    return StrokeSet(strokes, (1000, 1000))
+
+
+def test_path_closes_contours():
+    assert Stroke(SQUARE, RED, closed=True).path() == SQUARE + [SQUARE[0]]
+    assert Stroke(SQUARE, RED).path() == SQUARE
+
+
+def test_hit_test_includes_closing_segment():
+    strokes = _set()
+    assert strokes.hit_test(10, 30, tolerance=2) == 0  # On the segment from the last point to the first
+    assert strokes.hit_test(150, 102, tolerance=3) == 1
+    assert strokes.hit_test(250, 250, tolerance=3) is None
+
+
+def test_lasso_only_takes_strokes_fully_inside():
+    strokes = _set()
+    assert strokes.lasso([(0, 0), (60, 0), (60, 60), (0, 60)]) == {0}
+    assert strokes.lasso([(0, 0), (150, 0), (150, 150), (0, 150)]) == {0}  # Stroke 1 sticks out
+    assert strokes.lasso([(0, 0), (200, 0), (200, 200), (0, 200)]) == {0, 1}
+    assert strokes.lasso([(0, 0), (60, 0)]) == set()
+
+
+def test_edits_update_order_index_and_version():
+    strokes = _set()
+    strokes.bring_to_front({0})
+    assert strokes.order[-1] == 0
+    strokes.send_to_back({0})
+    assert strokes.order[0] == 0
+    strokes.recolor({1}, RED)
+    assert strokes.strokes[1].color is RED
+    strokes.delete({0})
+    assert 0 not in strokes.order and strokes.hit_test(10, 30, tolerance=2) is None
+    assert len(strokes) == 51 and strokes.version == 4
@@ -0,0 +1,54 @@
+import cv2
+import numpy as np
+
+from src.automation import stroke_verifier
+from src.automation.stroke_verifier import COVERAGE_THRESHOLD, rasterize_strokes, stroke_coverage, verify_and_redraw
+
+RED = (255, 0, 0)
+STROKES = [[(10, 10), (90, 10)], [(10, 50), (10, 90), (50, 90)], [(70, 70)], []]
+
+
+def _frame():
+    return np.full((120, 120, 4), 255, dtype=np.uint8)
+
+
+def _draw(frame, points, rgb=RED, offset=0):
+    points = np.asarray(points, dtype=np.int32).reshape(-1, 2) + offset
+    cv2.polylines(frame, [points], False, (*rgb, 255), 2)
+
+
+def test_rasterize_samples_every_step_along_each_stroke():
+    samples, owners = rasterize_strokes(STROKES, step=2.0)
+    assert np.bincount(owners).tolist() == [40, 40, 1]
+    assert samples[owners == 0].min(axis=0).tolist() == [10, 10]
+    assert np.all(np.diff(samples[owners == 0][:, 0]) == 2)
+    assert samples[owners == 2].tolist() == [[70, 70]]
+
+
+def test_coverage_per_stroke():
+    frame = _frame()
+    _draw(frame, STROKES[0], offset=1)  # Within SAMPLE_RADIUS of where it was sent
+    _draw(frame, STROKES[1], rgb=(0, 0, 255))  # Wrong color
+    coverage = stroke_coverage(frame, STROKES, RED)
+    assert coverage[0] == 1.0 and coverage[1] == 0.0 and coverage[2] == 0.0
+    assert coverage[3] == 1.0  # Nothing to check
+
+    _draw(frame, STROKES[1][:2])  # Only the first of its two equal segments: still missing
+    assert 0.5 <= stroke_coverage(frame, STROKES[1:2], RED)[0] < COVERAGE_THRESHOLD
+
+
+def test_verify_redraws_only_the_missing_strokes(monkeypatch):
+    frame = _frame()
+    _draw(frame, STROKES[0])
+    monkeypatch.setattr(stroke_verifier, "capture_screen", lambda serial=None: frame)
+    monkeypatch.setattr(stroke_verifier, "RECHECK_DELAY_S", 0)
+
+    redrawn = []
+
+    def draw_stroke(points):
+        redrawn.append(points)
+        _draw(frame, points)
+
+    assert verify_and_redraw(STROKES[:2], RED, draw_stroke) == 0
+    assert redrawn == [STROKES[1]]
+    assert verify_and_redraw([[(10, 110), (110, 110)]], RED, lambda points: None, passes=2) == 1
@@ -0,0 +1,45 @@
+from src.automation.adb_client import AdbError
+from src.automation.throttle import BREAK_MAX_S, MAX_SCALE, MIN_SCALE, AdaptiveThrottle, FrameStats
+
+SMOOTH = FrameStats(frames=120, janky=0, p50_ms=8, p90_ms=12, p99_ms=16)
+STALLED = FrameStats(frames=120, janky=100, p50_ms=40, p90_ms=120, p99_ms=200)
+
+
+def _throttle(stats):
+    return AdaptiveThrottle(0.01, 0.02, serial="fake-1", log_path=None, check_every=1, sample=lambda: stats)
+
+
+def test_scale_stays_within_bounds():
+    throttle = _throttle(SMOOTH)
+    for _ in range(50):
+        throttle.next_stroke()
+    assert throttle.scale == MIN_SCALE
+
+    throttle.sample = lambda: STALLED
+    breaks = [throttle.next_stroke() for _ in range(50)]
+    assert throttle.scale == MAX_SCALE
+    assert throttle.pause == 0.01 * MAX_SCALE and throttle.move_duration == 0.02 * MAX_SCALE
+    assert all(0 < pause_s <= BREAK_MAX_S for pause_s in breaks)
+
+
+def test_few_frames_keep_the_pace():
+    throttle = _throttle(FrameStats(frames=5, janky=5, p50_ms=100, p90_ms=100, p99_ms=100))
+    assert throttle.next_stroke() == 0.0 and throttle.scale == 1.0
+
+
+def test_unreadable_stats_mark_the_throttle_unavailable():
+    def fail():
+        raise AdbError("gfxinfo")
+
+    throttle = AdaptiveThrottle(0.01, 0.02, serial="fake-1", log_path=None, sample=fail)
+    assert not throttle.available
+    assert throttle.next_stroke() == 0.0
+
+
+def test_parse_gfxinfo():
+    stats = FrameStats.parse(
+        "Total frames rendered: 200\nJanky frames: 30 (15.00%)\n50th percentile: 9ms\n"
+        "90th percentile: 25ms\n99th percentile: 60ms\n"
+    )
+    assert (stats.frames, stats.janky, stats.p90_ms) == (200, 30, 25)
+    assert stats.jank_ratio == 0.15
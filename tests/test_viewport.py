@@ -0,0 +1,51 @@
+import pytest
+from PIL import Image
+
+from src.ui.viewport import Viewport
+
+
+def _viewport(zoom=1.0):
+    viewport = Viewport()
+    viewport.update(800, 600, 400, 400, zoom)
+    return viewport
+
+
+def test_fitted_image_is_centered():
+    viewport = _viewport()
+    assert viewport.scale == 1.5
+    assert (viewport.x_offset, viewport.y_offset) == (100.0, 0.0)
+    assert viewport.image_to_canvas(200, 200) == (400.0, 300.0)
+
+
+def test_canvas_and_image_coordinates_round_trip():
+    viewport = _viewport(zoom=3.0)
+    viewport.pan(-250, 120)
+    viewport.update(800, 600, 400, 400, 3.0)
+    for point in [(0, 0), (123.5, 77.25), (400, 400)]:
+        assert viewport.canvas_to_image(*viewport.image_to_canvas(*point)) == pytest.approx(point)
+
+
+def test_zoom_keeps_the_point_under_the_cursor():
+    viewport = _viewport(zoom=2.0)
+    before = viewport.canvas_to_image(500, 200)
+    viewport.zoom_at(500, 200, 4.0)
+    viewport.update(800, 600, 400, 400, 4.0)
+    assert viewport.canvas_to_image(500, 200) == pytest.approx(before)
+
+
+def test_pan_keeps_the_canvas_covered():
+    viewport = _viewport(zoom=2.0)
+    viewport.pan(10_000, 10_000)  # Far past the top left corner
+    viewport.update(800, 600, 400, 400, 2.0)
+    assert (viewport.x_offset, viewport.y_offset) == (0.0, 0.0)
+    viewport.pan(-10_000, -10_000)
+    viewport.update(800, 600, 400, 400, 2.0)
+    assert viewport.image_to_canvas(400, 400) == pytest.approx((800, 600))
+
+
+def test_render_only_resamples_the_visible_region():
+    image = Image.new("RGB", (400, 400), "white")
+    visible, origin = _viewport(zoom=4.0).render(image)
+    assert visible.size == (800, 600) and origin == (0, 0)
+    visible, origin = _viewport().render(image)
+    assert visible.size == (600, 600) and origin == (100, 0)